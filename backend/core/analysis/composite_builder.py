@@ -8,11 +8,18 @@
 # The composite timeseries is fed directly into trajectory_computer.compute_trajectory()
 # with synthetic zone_boundaries that make h(composite_h) = composite_h:
 #   healthy_min = 0, healthy_max = 2  →  mid=1, half_range=1  →  h(v) = v  for v∈[0,1]
+#
+# A marker config with a "zone_table" (age-aware analyses, see core/storage/zone_tables.py) is normalized
+# with the boundaries for the subject's age at each datapoint's measured_at instead of one fixed pair.
 
 from __future__ import annotations
 import logging
 import math
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from backend.core.storage.zone_tables import boundaries_at
 
 logger = logging.getLogger(__name__)
 
@@ -32,12 +39,14 @@ def composite_zone_boundaries(vulnerability_margin: float) -> dict:
 
 # ── Transforms ─────────────────────────────────────────────────────────────────
 
-def _normalize_h(raw: float, healthy_min: float, healthy_max: float) -> float:
+def _normalize_h(raw: np.ndarray, healthy_min, healthy_max) -> np.ndarray:
+    """h for an array of raw values; boundaries are scalars or per-value arrays. NaN stays NaN."""
     mid        = (healthy_min + healthy_max) / 2.0
     half_range = (healthy_max - healthy_min) / 2.0
-    if half_range == 0:
-        return 1.0
-    return 1.0 - abs(raw - mid) / half_range
+    with np.errstate(divide="ignore", invalid="ignore"):
+        h = 1.0 - np.abs(raw - mid) / half_range
+    h = np.where(half_range == 0, 1.0, h)
+    return np.where(np.isnan(raw), np.nan, h)
 
 
 def _apply_log(values: list[float]) -> list[float]:
@@ -114,6 +123,15 @@ def _fill_missing(
     return result
 
 
+def _marker_series(m: dict) -> tuple[list[datetime], list[float]]:
+    """(timestamps, values) for one marker entry, from columnar epochs/values or datapoint dicts."""
+    if "epochs" in m:
+        timestamps = [datetime.fromtimestamp(t / 1000.0, tz=timezone.utc) for t in m["epochs"].tolist()]
+        return timestamps, m["values"].tolist()
+    dps = m["datapoints"]
+    return [dp["parsed_timestamp"] for dp in dps], [float(dp["value"]) for dp in dps]
+
+
 # ── Main entry point ───────────────────────────────────────────────────────────
 
 def build_composite_timeseries(
@@ -127,6 +145,9 @@ def build_composite_timeseries(
             "config":          dict  (MarkerFeatureConfig-like with module_id, marker_id,
                                       weight, active, transform{type,window_hours,lag_hours},
                                       missing_data),
+            "epochs":          np.ndarray  (int64 epoch ms, from read_multi_marker_timeseries),
+            "values":          np.ndarray  (float64),
+              — or, instead of epochs/values —
             "datapoints":      list[dict]  (from read_timeseries; each has "value",
                                             "measured_at", "parsed_timestamp"),
             "zone_boundaries": dict  (healthy_min, healthy_max, vulnerability_margin),
@@ -145,18 +166,26 @@ def build_composite_timeseries(
 
     for m in active_markers:
         config   = m["config"]
-        dps      = m["datapoints"]
         zone_bnd = m["zone_boundaries"]
 
-        if not dps:
+        timestamps, raw_values = _marker_series(m)
+        if not timestamps:
             logger.warning(
                 "Marker %s/%s has no datapoints in the requested timeframe; skipping.",
                 config.get("module_id"), config.get("marker_id"),
             )
             continue
 
-        timestamps  = [dp["parsed_timestamp"] for dp in dps]
-        raw_values  = [float(dp["value"]) for dp in dps]
+        # Boundaries per datapoint, at the subject's age when it was measured (before any lag shift)
+        zone_table = config.get("zone_table")
+        if zone_table is not None:
+            epochs = m["epochs"] if "epochs" in m else np.array(
+                [int(ts.timestamp() * 1000) for ts in timestamps], dtype=np.int64
+            )
+            per_point = boundaries_at(zone_table, epochs)
+            h_min, h_max = per_point[:, 0], per_point[:, 1]
+        else:
+            h_min, h_max = zone_bnd["healthy_min"], zone_bnd["healthy_max"]
 
         # Apply transform
         transform      = config.get("transform") or {}
@@ -173,12 +202,7 @@ def build_composite_timeseries(
         # "none": pass through
 
         # Normalize raw → h score using marker-specific zone boundaries
-        h_min = zone_bnd["healthy_min"]
-        h_max = zone_bnd["healthy_max"]
-        h_values = [
-            _normalize_h(v, h_min, h_max) if not math.isnan(v) else float("nan")
-            for v in raw_values
-        ]
+        h_values = _normalize_h(np.asarray(raw_values, dtype=np.float64), h_min, h_max).tolist()
 
         # Handle missing h values
         h_values = _fill_missing(timestamps, h_values, config.get("missing_data", "interpolate"))
@@ -19,6 +19,12 @@
 
 # The 3 sign-classes combine into one of 27 discrete trajectory states. 
 
+# With point_boundaries (age-aware analyses), every datapoint carries its own healthy_min/healthy_max/vulnerability_margin
+# (the subject's reference values at the age it was measured); normalization and zone assignment use those per point.
+
+# A zero-width healthy range (healthy_min == healthy_max, for the whole analysis or any point) has no h-scale and
+# raises ValueError("healthy_min and healthy_max must differ."); the worker reports it as the job's failure message.
+
 
 import numpy as np
 from datetime import datetime
@@ -28,8 +34,9 @@ DERIVATIVE_ZERO_THRESHOLD = 0.001
 IMAGINARY_TOLERANCE = 1e-6
 
 
-# Normalization
-def _normalize(raw: float, mid: float, half_range: float) -> float:
+# Normalization — elementwise over arrays: raw values (n,) against per-point mid/half_range ((n,) or (1,)).
+# half_range must be non-zero; compute_trajectory rejects zero-width healthy ranges before calling this.
+def _normalize(raw: np.ndarray, mid: np.ndarray, half_range: np.ndarray) -> np.ndarray:
     return 1.0 - abs(raw - mid) / half_range
 
 
@@ -88,6 +95,7 @@ def compute_trajectory(
     data_points: list[dict],
     zone_boundaries: dict,
     polynomial_degree: int,
+    point_boundaries: np.ndarray | None = None,
 ) -> dict:
 
     # ── Guard: need enough points to fit the requested polynomial degree ─────
@@ -106,6 +114,15 @@ def compute_trajectory(
     mid        = (healthy_min + healthy_max) / 2.0
     half_range = (healthy_max - healthy_min) / 2.0
 
+    # Per-datapoint boundaries: (n, 3) rows of healthy_min, healthy_max, vulnerability_margin
+    if point_boundaries is None:
+        point_boundaries = np.array([[healthy_min, healthy_max, vulnerability_margin]], dtype=float)
+    point_mid     = (point_boundaries[:, 0] + point_boundaries[:, 1]) / 2.0
+    point_half    = (point_boundaries[:, 1] - point_boundaries[:, 0]) / 2.0
+    point_margins = np.broadcast_to(point_boundaries[:, 2], (len(data_points),)).tolist()
+    if np.any(point_half == 0):    # numpy would give inf/nan scores rather than fail
+        raise ValueError("healthy_min and healthy_max must differ.")
+
     # ── Step 2: Build x (time) and y (health score) arrays
     t0: datetime = data_points[0]["parsed_timestamp"]
 
@@ -113,13 +130,11 @@ def compute_trajectory(
         (dp["parsed_timestamp"] - t0).total_seconds() / 3600.0
         for dp in data_points
     ]
-    h_values: list[float] = [
-        _normalize(dp["value"], mid, half_range)
-        for dp in data_points
-    ]
+    raw_arr = np.array([dp["value"] for dp in data_points], dtype=float)
+    y_arr   = _normalize(raw_arr, point_mid, point_half)
+    h_values: list[float] = y_arr.tolist()
 
     x_arr = np.array(x_hours, dtype=float)
-    y_arr = np.array(h_values, dtype=float)
 
     # Step 3: Fit the polynomial
     coeffs = np.polyfit(x_arr, y_arr, polynomial_degree)
@@ -145,7 +160,7 @@ def compute_trajectory(
         f_double_prime = float(np.polyval(coeffs_p2, x))
 
         # Assign zone from the health score of the RAW measured value.
-        zone = _assign_zone_from_score(health_score, vulnerability_margin)
+        zone = _assign_zone_from_score(health_score, point_margins[i])
 
         # Classify derivative magnitudes into ternary sign classes.
         fp_sign  = _sign_class(f_prime)
@@ -155,7 +170,7 @@ def compute_trajectory(
         state = _trajectory_state(zone, fp_sign, fpp_sign)
 
         # Find the nearest future time at which the h-polynomial crosses a boundary.
-        transition = _time_to_transition(coeffs, vulnerability_margin, x)
+        transition = _time_to_transition(coeffs, point_margins[i], x)
 
         result_points.append({
             "timestamp":                dp["measured_at"],
@@ -18,14 +18,68 @@
 #   8. datapoints.append(datapoint): populates the datapoints dict with the updated entries that were filtered and have datetime objects as timestamps.
 #   9. sort: sorts the final list chronologically to make sure that they're in order.
 #   10. return: returns the final sorted list of filtered datapoints with the right datetime format
-
+#
+# Steps 2-5 are served from the process-wide index cache (index_cache.py): the parsed index is kept in memory with
+# its timestamps already converted to epoch milliseconds, so filtering is a binary search and index.json is only
+# reparsed when its mtime/size changes. Markers stored in the segment format (see segment_log.py) also skip step 6:
+# the cached index is the live record set itself. Segment markers too large for the cache are read with a range
+# seek through the segment footer index instead, as are markers with archived (gzip, per-month) cold-tier data,
+# where only the archived months overlapping the timeframe are decompressed. Either way the same datapoint dicts come back.
+#
+# read_timeseries_arrays() is the columnar variant used by the analysis workers: it returns (epochs_ms, values)
+# NumPy arrays, sliced zero-copy out of the memory-mapped .npy columns of a compacted segment base where possible.
+
+import contextvars
 import json
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import numpy as np
+
+from backend.core.storage import segment_log
+from backend.core.storage.index_cache import INDEX_CACHE
+from backend.core.telemetry import record_fs_read
+
 logger = logging.getLogger(__name__)
 
+READ_WORKERS = int(os.environ.get("ASHDT_READ_WORKERS", "8"))  # concurrent marker reads in read_multi_marker_timeseries()
+
+
+def has_marker_data(marker_dir: str) -> bool:
+    """True if marker_dir holds a dataset in either storage format (segments or legacy index.json)."""
+    return segment_log.is_segment_marker(marker_dir) or os.path.isfile(os.path.join(marker_dir, "index.json"))
+
+
+def _segment_datapoints(records: list[dict], subject_id: str, module_id: str, marker_id: str) -> list[dict]:
+    datapoints = []
+    for rec in records:
+        datapoint = {
+            "subject_id": subject_id,
+            "module_id":  module_id,
+            "marker_id":  marker_id,
+            **{k: v for k, v in rec.items() if k != "t"},
+        }
+        datapoint["parsed_timestamp"] = datetime.fromisoformat(rec["measured_at"].replace("Z", "+00:00"))
+        datapoints.append(datapoint)
+    return datapoints
+
+
+def _read_segment_timeseries(
+    marker_folder: str,
+    subject_id:    str,
+    module_id:     str,
+    marker_id:     str,
+    from_time:     datetime,
+    to_time:       datetime,
+) -> list[dict]:
+    records = segment_log.read_records(
+        marker_folder, segment_log.to_epoch_ms(from_time), segment_log.to_epoch_ms(to_time)
+    )
+    return _segment_datapoints(records, subject_id, module_id, marker_id)
+
+
 def read_timeseries(
     archive_root: str,
     subject_id: str,
@@ -36,29 +90,21 @@ def read_timeseries(
 ) -> list[dict]:
     
     marker_folder = os.path.join(archive_root, subject_id, module_id, marker_id)
-    index_path = os.path.join(marker_folder, "index.json")
-
-    if not os.path.exists(index_path):
+    if not has_marker_data(marker_folder):
         raise FileNotFoundError(
-            f"No index.json found at {index_path}. "
+            f"No segments/ or index.json found in {marker_folder}. "
             f"Check that subject_id='{subject_id}', module_id='{module_id}', "
             f"and marker_id='{marker_id}' are correct and that data exists in the archive."
         )
+    if not INDEX_CACHE.worth_caching(marker_folder):
+        return _read_segment_timeseries(marker_folder, subject_id, module_id, marker_id, from_time, to_time)
 
-    with open(index_path, encoding="utf-8") as f:
-        index = json.load(f)
-
-    entries = index["entries"]
+    index  = INDEX_CACHE.get(marker_folder)
+    lo, hi = index.range(segment_log.to_epoch_ms(from_time), segment_log.to_epoch_ms(to_time))
+    if index.records is not None:
+        return _segment_datapoints(index.records[lo:hi], subject_id, module_id, marker_id)
 
-    filtered_entries = []
-    for entry in entries:
-
-        entry_time = datetime.fromisoformat(
-            entry["measured_at"].replace("Z", "+00:00")
-        )
-
-        if from_time <= entry_time <= to_time:
-            filtered_entries.append(entry)
+    filtered_entries = [{"measured_at": index.keys[i], "file": index.files[i]} for i in range(lo, hi)]
 
     datapoints = []
     for entry in filtered_entries:
@@ -66,6 +112,7 @@ def read_timeseries(
 
         try:
             with open(file_path, encoding="utf-8") as f:
+                record_fs_read(os.fstat(f.fileno()).st_size)
                 datapoint = json.load(f)
         except (FileNotFoundError, json.JSONDecodeError) as e:
             logger.warning(
@@ -84,6 +131,35 @@ def read_timeseries(
     return datapoints
 
 
+def read_timeseries_arrays(
+    archive_root: str,
+    subject_id:   str,
+    module_id:    str,
+    marker_id:    str,
+    from_time:    datetime,
+    to_time:      datetime,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns (epochs, values): int64 epoch milliseconds and float64 values within [from_time, to_time],
+    sorted by time. For compacted segment markers these are read-only views into memory-mapped files;
+    otherwise (legacy markers, or uncompacted appends in the range) they are built from read_timeseries().
+    Raises FileNotFoundError like read_timeseries().
+    """
+    marker_folder = os.path.join(archive_root, subject_id, module_id, marker_id)
+    from_t, to_t  = segment_log.to_epoch_ms(from_time), segment_log.to_epoch_ms(to_time)
+    if segment_log.is_segment_marker(marker_folder):
+        columns = segment_log.read_range_columns(marker_folder, from_t, to_t)
+        if columns is not None:
+            return columns
+
+    datapoints = read_timeseries(archive_root, subject_id, module_id, marker_id, from_time, to_time)
+    epochs = np.fromiter(
+        (segment_log.to_epoch_ms(dp["parsed_timestamp"]) for dp in datapoints), dtype=np.int64, count=len(datapoints)
+    )
+    values = np.fromiter((float(dp["value"]) for dp in datapoints), dtype=np.float64, count=len(datapoints))
+    return epochs, values
+
+
 def read_multi_marker_timeseries(
     rawdata_root: str,
     subject_id:   str,
@@ -92,34 +168,49 @@ def read_multi_marker_timeseries(
     to_time:      datetime,
 ) -> list[dict]:
     """
-    Reads timeseries for multiple markers.
+    Reads timeseries for multiple markers in columnar form (see read_timeseries_arrays()),
+    up to READ_WORKERS markers at a time on a thread pool.
 
     Returns a list of dicts, one per active marker:
         {
-            "config":          dict   (the full marker_ref entry, including feature config),
-            "datapoints":      list[dict],
+            "config":          dict        (the full marker_ref entry, including feature config),
+            "epochs":          np.ndarray  (int64 epoch milliseconds, sorted),
+            "values":          np.ndarray  (float64),
             "zone_boundaries": dict,
         }
 
-    Markers with no data in the timeframe are included with an empty datapoints list
+    Markers with no data in the timeframe are included with empty arrays
     (composite_builder will skip them with a warning rather than raising).
     """
-    result = []
-    for marker in marker_refs:
-        if not marker.get("active", True):
-            continue
+    active = [m for m in marker_refs if m.get("active", True)]
+
+    def read_one(marker: dict) -> tuple[np.ndarray, np.ndarray]:
         module_id = marker["module_id"]
         marker_id = marker["marker_id"]
         try:
-            dps = read_timeseries(rawdata_root, subject_id, module_id, marker_id, from_time, to_time)
+            return read_timeseries_arrays(rawdata_root, subject_id, module_id, marker_id, from_time, to_time)
         except FileNotFoundError:
             logger.warning(
-                "No index.json for %s/%s/%s — skipping this marker.", subject_id, module_id, marker_id
+                "No data for %s/%s/%s — skipping this marker.", subject_id, module_id, marker_id
             )
-            dps = []
-        result.append({
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+    # Marker reads are independent file I/O; overlapping them hides per-file latency on network storage.
+    # pool.map keeps marker_refs order, and any error other than missing data still propagates.
+    # Each read runs in a copy of the caller's context so reads are counted against its trace (telemetry.py).
+    if len(active) > 1 and READ_WORKERS > 1:
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=min(READ_WORKERS, len(active))) as pool:
+            arrays = list(pool.map(lambda m: context.copy().run(read_one, m), active))
+    else:
+        arrays = [read_one(m) for m in active]
+
+    return [
+        {
             "config":          marker,
-            "datapoints":      dps,
+            "epochs":          epochs,
+            "values":          values,
             "zone_boundaries": marker.get("zone_boundaries", {}),
-        })
-    return result
\ No newline at end of file
+        }
+        for marker, (epochs, values) in zip(active, arrays)
+    ]
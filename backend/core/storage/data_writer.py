@@ -0,0 +1,416 @@
+# Write-side counterpart of data_reader.py: everything that creates, rewrites or soft-deletes datapoints
+# goes through here, so the datapoint mutations and bulk ingest share one implementation of the on-disk
+# layout. A marker directory is stored in one of two formats:
+#
+#   segments (default for new markers) — an append-only log, see segment_log.py:
+#     raw_data/{subject_id}/{module_id}/{marker_id}/segments/{base.jsonl, base.idx.json, tail.jsonl}
+#   legacy — one file per datapoint plus a sorted index:
+#     raw_data/{subject_id}/{module_id}/{marker_id}/index.json          — sorted list of {measured_at, file}
+#     raw_data/{subject_id}/{module_id}/{marker_id}/{safe_ts}.json      — one file per datapoint
+#
+# Existing legacy markers stay legacy until `python -m backend.core.storage.segment_log migrate` converts
+# them. ASHDT_STORAGE_FORMAT=legacy makes new markers use the legacy layout as well.
+#
+# add_datapoint() / update_datapoint() / delete_datapoint() handle the single-datapoint mutations and
+# raise ValueError with a user-facing message; the caller mirrors the change into SQLite.
+# Existence checks read the marker's index through index_cache.INDEX_CACHE, and every write invalidates it.
+# Each check-then-write runs under the marker's advisory lock (marker_lock.py), and index.json and
+# datapoint files are replaced atomically, so parallel writers and readers never see a torn or lost update.
+# Writes are registered with index_cache.MIRRORED, so the data-source watcher does not re-sync them.
+# When an append leaves a segment tail due for compaction, the marker is queued for the background
+# compactor thread below, which takes the lock and rewrites the base outside any request.
+# write_marker_batch() is the bulk path: it validates a whole batch against the marker in one pass,
+# writes it with one append (or one index rewrite) and upserts the SQLite rows with executemany
+# inside the caller's transaction.
+
+from __future__ import annotations
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator
+
+from backend.core.storage import segment_log
+from backend.core.storage.index_cache import INDEX_CACHE, MIRRORED
+from backend.core.storage.marker_lock import atomic_write, marker_lock
+from backend.startup.database_logistics import (
+    _datapoint_table,
+    _ensure_datapoint_table,
+    add_dataset_stats,
+    add_datapoint_rollups,
+)
+
+logger = logging.getLogger(__name__)
+
+STORAGE_FORMAT = os.environ.get("ASHDT_STORAGE_FORMAT", "segments").lower()  # format for new markers
+
+
+def utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def datapoint_filename(measured_at: str) -> str:
+    """File name for a datapoint, derived from its timestamp (colons are not portable in file names)."""
+    safe_ts = measured_at.replace(":", "-").replace("+", "").rstrip("Z") + "Z"
+    return f"{safe_ts}.json"
+
+
+def marker_dir_path(rawdata_root: str, subject_id: str, module_id: str, marker_id: str) -> str:
+    return os.path.join(rawdata_root, subject_id, module_id, marker_id)
+
+
+def uses_segments(marker_dir: str) -> bool:
+    """True if the marker is (or, being new, will be) stored as a segment log."""
+    if segment_log.is_segment_marker(marker_dir):
+        return True
+    if os.path.isfile(os.path.join(marker_dir, "index.json")):
+        return False
+    return STORAGE_FORMAT != "legacy"
+
+
+def load_index(marker_dir: str, subject_id: str, module_id: str, marker_id: str) -> dict:
+    """
+    A legacy marker's index.json contents (a fresh dict the caller may modify), rebuilt from the
+    index cache, or an empty index if the marker has no data yet.
+    """
+    entries = []
+    if os.path.isfile(os.path.join(marker_dir, "index.json")):
+        cached  = INDEX_CACHE.get(marker_dir)
+        entries = sorted(
+            ({"measured_at": k, "file": f} for k, f in zip(cached.keys, cached.files)),
+            key=lambda e: e["measured_at"],
+        )
+    return {
+        "subject_id": subject_id,
+        "module_id":  module_id,
+        "marker_id":  marker_id,
+        "entries":    entries,
+    }
+
+
+def save_index(index_path: str, data: dict) -> None:
+    """Replaces index.json atomically; call under the marker's lock."""
+    atomic_write(index_path, json.dumps(data, indent=2))
+    INDEX_CACHE.invalidate(os.path.dirname(index_path))
+
+
+@contextmanager
+def _locked_write(marker_dir: str) -> Iterator[None]:
+    """The marker's lock, with the write registered as mirrored by the caller (index_cache.MIRRORED)."""
+    with marker_lock(marker_dir), MIRRORED.writing(marker_dir):
+        yield
+
+
+def _append_segment_ops(marker_dir: str, ops: list[dict]) -> None:
+    if segment_log.append_ops(marker_dir, ops):
+        COMPACTOR.schedule(marker_dir)
+    INDEX_CACHE.invalidate(marker_dir)
+
+
+# ── Background compaction ──────────────────────────────────────────────────────
+
+class BackgroundCompactor:
+    """
+    Compacts segment markers on one daemon thread, each under its marker lock. A marker is queued
+    at most once at a time. Compaction is crash-safe (see segment_log.compact), so a process that
+    exits mid-run just leaves the marker for the next append or the CLI to compact.
+    """
+
+    def __init__(self) -> None:
+        self.compactions = 0
+        self._queue:     queue.Queue[str] = queue.Queue()
+        self._pending:   set[str]         = set()
+        self._lock       = threading.Lock()
+        self._thread:    threading.Thread | None = None
+
+    def schedule(self, marker_dir: str) -> None:
+        key = os.path.abspath(marker_dir)
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="segment-compactor", daemon=True)
+                self._thread.start()
+        self._queue.put(key)
+
+    def wait(self) -> None:
+        """Blocks until every queued marker has been compacted (CLI scripts and tests)."""
+        self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            marker_dir = self._queue.get()
+            with self._lock:
+                self._pending.discard(marker_dir)
+            try:
+                # The marker may have been moved away (deleteDataset) or compacted since it was queued;
+                # check before locking, as marker_lock() would recreate a missing directory.
+                if segment_log.is_segment_marker(marker_dir):
+                    with _locked_write(marker_dir):
+                        if segment_log.is_segment_marker(marker_dir) and segment_log.maybe_compact(marker_dir):
+                            self.compactions += 1
+                    INDEX_CACHE.invalidate(marker_dir)
+            except Exception:
+                logger.exception("Background compaction of %s failed", marker_dir)
+            finally:
+                self._queue.task_done()
+
+
+COMPACTOR = BackgroundCompactor()
+
+
+def _segment_record(marker_dir: str, measured_at: str) -> dict | None:
+    """Live record of a segment marker, through the index cache unless the marker is too large for it."""
+    if not segment_log.is_segment_marker(marker_dir):
+        return None
+    if INDEX_CACHE.worth_caching(marker_dir):
+        return INDEX_CACHE.get(marker_dir).record(measured_at)
+    return segment_log.lookup(marker_dir, measured_at)
+
+
+def _segment_keys(marker_dir: str, records: list[dict]) -> set[str]:
+    """Live keys of a segment marker, at least those within the time span of `records`."""
+    if not segment_log.is_segment_marker(marker_dir):
+        return set()
+    if INDEX_CACHE.worth_caching(marker_dir):
+        return set(INDEX_CACHE.get(marker_dir).keys)
+    # Bounding the scan to the batch's span keeps archived months the batch doesn't touch compressed.
+    epochs = [segment_log.to_epoch_ms(r["measured_at"]) for r in records]
+    return segment_log.live_keys(marker_dir, min(epochs), max(epochs)) if epochs else set()
+
+
+def _legacy_datapoint(subject_id: str, module_id: str, marker_id: str, rec: dict, created_at: str) -> dict:
+    return {
+        "schema_version": "1.0",
+        "module_id":      module_id,
+        "marker_id":      marker_id,
+        "subject_id":     subject_id,
+        "measured_at":    rec["measured_at"],
+        "value":          rec["value"],
+        "unit":           rec["unit"],
+        "data_quality":   rec["data_quality"],
+        "created_at":     created_at,
+    }
+
+
+def add_datapoint(
+    rawdata_root: str,
+    subject_id:   str,
+    module_id:    str,
+    marker_id:    str,
+    rec:          dict,
+    raw_content:  bytes | None = None,
+) -> str:
+    """
+    Stores one new datapoint (rec: measured_at, value, unit, data_quality). Legacy markers keep
+    raw_content verbatim as the datapoint file when given (uploadDatapoint). Returns created_at.
+    """
+    marker_dir = marker_dir_path(rawdata_root, subject_id, module_id, marker_id)
+    created_at = utc_now_iso()
+
+    with _locked_write(marker_dir):
+        if uses_segments(marker_dir):
+            if _segment_record(marker_dir, rec["measured_at"]) is not None:
+                raise ValueError("A datapoint with this timestamp already exists.")
+            _append_segment_ops(marker_dir, [segment_log.put_op(segment_log.make_record(
+                rec["measured_at"], rec["value"], rec["unit"], rec["data_quality"], created_at,
+            ))])
+            return created_at
+
+        index    = load_index(marker_dir, subject_id, module_id, marker_id)
+        filename = datapoint_filename(rec["measured_at"])
+        if any(e["file"] == filename for e in index["entries"]):
+            raise ValueError("A datapoint with this timestamp already exists.")
+
+        if raw_content is None:
+            raw_content = json.dumps(_legacy_datapoint(subject_id, module_id, marker_id, rec, created_at), indent=2)
+        atomic_write(os.path.join(marker_dir, filename), raw_content)
+
+        index["entries"].append({"measured_at": rec["measured_at"], "file": filename})
+        index["entries"].sort(key=lambda e: e["measured_at"])
+        save_index(os.path.join(marker_dir, "index.json"), index)
+        return created_at
+
+
+def update_datapoint(
+    rawdata_root:         str,
+    subject_id:           str,
+    module_id:            str,
+    marker_id:            str,
+    original_measured_at: str,
+    rec:                  dict,
+) -> None:
+    """Replaces the datapoint at original_measured_at with rec (which may move it to a new timestamp)."""
+    marker_dir = marker_dir_path(rawdata_root, subject_id, module_id, marker_id)
+    updated_at = utc_now_iso()
+    if not os.path.isdir(marker_dir):
+        raise ValueError("Dataset not found.")
+
+    with _locked_write(marker_dir):
+        if segment_log.is_segment_marker(marker_dir):
+            existing = _segment_record(marker_dir, original_measured_at)
+            if existing is None:
+                raise ValueError("Datapoint not found.")
+            moved = rec["measured_at"] != original_measured_at
+            if moved and _segment_record(marker_dir, rec["measured_at"]) is not None:
+                raise ValueError("A datapoint with the new timestamp already exists.")
+            ops = [segment_log.put_op(segment_log.make_record(
+                rec["measured_at"], rec["value"], rec["unit"], rec["data_quality"],
+                existing.get("created_at", ""), updated_at,
+            ))]
+            if moved:
+                ops.append(segment_log.del_op(original_measured_at))
+            _append_segment_ops(marker_dir, ops)
+            return
+
+        index_path = os.path.join(marker_dir, "index.json")
+        if not os.path.isfile(index_path):
+            raise ValueError("Dataset not found.")
+        index = load_index(marker_dir, subject_id, module_id, marker_id)
+
+        entry = next((e for e in index["entries"] if e["measured_at"] == original_measured_at), None)
+        if entry is None:
+            raise ValueError("Datapoint not found.")
+
+        new_filename = datapoint_filename(rec["measured_at"])
+        if rec["measured_at"] != original_measured_at:
+            if any(e["file"] == new_filename for e in index["entries"]):
+                raise ValueError("A datapoint with the new timestamp already exists.")
+
+        old_file_path = os.path.join(marker_dir, entry["file"])
+        with open(old_file_path, "r", encoding="utf-8") as f:
+            existing_dp = json.load(f)
+
+        new_dp = {
+            **existing_dp,
+            "measured_at":  rec["measured_at"],
+            "value":        rec["value"],
+            "unit":         rec["unit"],
+            "data_quality": rec["data_quality"],
+            "updated_at":   updated_at,
+        }
+        atomic_write(os.path.join(marker_dir, new_filename), json.dumps(new_dp, indent=2))
+
+        old_filename         = entry["file"]
+        entry["measured_at"] = rec["measured_at"]
+        entry["file"]        = new_filename
+        index["entries"].sort(key=lambda e: e["measured_at"])
+        save_index(index_path, index)
+        # Only once the index no longer points at it, so readers never follow an entry to a missing file.
+        if new_filename != old_filename:
+            os.remove(old_file_path)
+
+
+def delete_datapoint(rawdata_root: str, subject_id: str, module_id: str, marker_id: str, measured_at: str) -> None:
+    """
+    Soft-deletes one datapoint. Legacy files move to data/deleted_datapoints/ immediately; segment
+    markers record a tombstone and the record moves there at the next compaction.
+    """
+    marker_dir = marker_dir_path(rawdata_root, subject_id, module_id, marker_id)
+    if not os.path.isdir(marker_dir):
+        raise ValueError("Dataset not found.")
+
+    with _locked_write(marker_dir):
+        if segment_log.is_segment_marker(marker_dir):
+            if _segment_record(marker_dir, measured_at) is None:
+                raise ValueError("Datapoint not found.")
+            _append_segment_ops(marker_dir, [segment_log.del_op(measured_at)])
+            return
+
+        index_path = os.path.join(marker_dir, "index.json")
+        if not os.path.isfile(index_path):
+            raise ValueError("Dataset not found.")
+        index = load_index(marker_dir, subject_id, module_id, marker_id)
+
+        entry = next((e for e in index["entries"] if e["measured_at"] == measured_at), None)
+        if entry is None:
+            raise ValueError("Datapoint not found.")
+
+        file_path = os.path.join(marker_dir, entry["file"])
+        if os.path.isfile(file_path):
+            silo = segment_log.deleted_datapoints_dir(marker_dir)
+            os.makedirs(silo, exist_ok=True)
+            ts        = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+            silo_name = entry["file"].replace(".json", f"_{ts}.json")
+            shutil.move(file_path, os.path.join(silo, silo_name))
+
+        index["entries"] = [e for e in index["entries"] if e["measured_at"] != measured_at]
+        save_index(index_path, index)
+
+
+def write_marker_batch(
+    conn,
+    rawdata_root: str,
+    subject_id:   str,
+    module_id:    str,
+    marker_id:    str,
+    records:      list[dict],
+) -> tuple[list[dict], list[tuple[dict, str]]]:
+    """
+    Writes many datapoints for one marker: one duplicate scan, one tail append (or index rewrite
+    for legacy markers), one executemany.
+    Each record needs measured_at, value, unit and data_quality; an optional "row" key is passed
+    through untouched so callers can report errors against their input.
+
+    Duplicates (already stored, or repeated within the batch) are rejected, not overwritten.
+    The SQLite upsert and the dataset_stats / rollup updates run on `conn`; the caller commits.
+
+    Returns (written, rejected) where rejected is a list of (record, reason).
+    """
+    marker_dir = marker_dir_path(rawdata_root, subject_id, module_id, marker_id)
+    created_at = utc_now_iso()
+    written:  list[dict]             = []
+    rejected: list[tuple[dict, str]] = []
+
+    with _locked_write(marker_dir):
+        segments = uses_segments(marker_dir)
+        if segments:
+            existing = _segment_keys(marker_dir, records)
+        else:
+            index    = load_index(marker_dir, subject_id, module_id, marker_id)
+            existing = {e["file"] for e in index["entries"]}
+
+        for rec in records:
+            key = rec["measured_at"] if segments else datapoint_filename(rec["measured_at"])
+            if key in existing:
+                rejected.append((rec, "A datapoint with this timestamp already exists."))
+                continue
+            existing.add(key)
+            if not segments:
+                atomic_write(
+                    os.path.join(marker_dir, key),
+                    json.dumps(_legacy_datapoint(subject_id, module_id, marker_id, rec, created_at), indent=2),
+                )
+                index["entries"].append({"measured_at": rec["measured_at"], "file": key})
+            written.append(rec)
+
+        if written and segments:
+            _append_segment_ops(marker_dir, [
+                segment_log.put_op(segment_log.make_record(
+                    r["measured_at"], r["value"], r["unit"], r["data_quality"], created_at,
+                ))
+                for r in written
+            ])
+        elif written:
+            index["entries"].sort(key=lambda e: e["measured_at"])
+            save_index(os.path.join(marker_dir, "index.json"), index)
+
+    if written:
+        table = _datapoint_table(subject_id, module_id, marker_id)
+        _ensure_datapoint_table(conn, table)
+        conn.executemany(
+            f'INSERT INTO "{table}" (measured_at, value, unit, data_quality, created_at) '
+            f'VALUES (?, ?, ?, ?, ?) ON CONFLICT(measured_at) DO UPDATE SET '
+            f'value=excluded.value, unit=excluded.unit, data_quality=excluded.data_quality',
+            [(r["measured_at"], r["value"], r["unit"], r["data_quality"], created_at) for r in written],
+        )
+        stats_rows = [(r["measured_at"], r["value"]) for r in written]
+        add_dataset_stats(conn, subject_id, module_id, marker_id, stats_rows)
+        add_datapoint_rollups(conn, subject_id, module_id, marker_id, stats_rows)
+
+    return written, rejected
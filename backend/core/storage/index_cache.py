@@ -0,0 +1,291 @@
+# In-process LRU cache of parsed marker indexes, shared by the read path (read_timeseries) and the
+# write paths (duplicate / existence checks in data_writer).
+#
+# A cached MarkerIndex is the parsed form of whatever the marker's storage format uses as its index:
+#   legacy    — index.json entries: measured_at, datapoint file name
+#   segments  — the live records (base + folded tail), which are the index of a segment log
+# in both cases with epochs pre-parsed into a sorted int64 array, so time-range filtering is a
+# searchsorted instead of an ISO 8601 parse per entry.
+#
+# Entries are validated on every get() against the (mtime_ns, size) of the files they were parsed from,
+# so changes made by another process (an ARQ worker, an import script, a hand edit) are picked up.
+# Writers in this process also invalidate explicitly (data_writer, delete_dataset, fs_watcher) so a
+# rewrite inside the filesystem's timestamp granularity can never serve a stale index.
+#
+# Memory is capped by INDEX_CACHE_MAX_BYTES using a per-entry size estimate; least recently used
+# markers are evicted first. INDEX_CACHE.stats() reports hits, misses, evictions and current size.
+#
+# The same signatures tell the data-source watcher (startup/fs_watcher.py) which file changes are this
+# process's own writes: MIRRORED remembers, per marker, the signature at which the SQLite mirror is
+# known to match the files. Writers wrap their locked write in MIRRORED.writing() and the watcher
+# skips markers whose files still have that signature.
+
+from __future__ import annotations
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+import numpy as np
+
+from backend.core.storage import segment_log
+from backend.core.telemetry import record_fs_read
+
+INDEX_CACHE_MAX_BYTES = int(os.environ.get("ASHDT_INDEX_CACHE_MB", "128")) * 1024 * 1024
+
+_LEGACY_ENTRY_BYTES  = 200  # rough per-entry footprint of a parsed index.json entry
+_SEGMENT_ENTRY_BYTES = 600  # rough per-entry footprint of a parsed segment record
+_MIRRORED_LIMIT      = 10_000  # markers whose mirrored signature is remembered
+
+
+class MarkerIndex:
+    """Parsed index of one marker. Treat as immutable — it is shared between threads."""
+
+    def __init__(
+        self,
+        fmt:     str,
+        epochs:  np.ndarray,
+        keys:    list[str],
+        files:   list[str] | None  = None,
+        records: list[dict] | None = None,
+    ) -> None:
+        self.format   = fmt
+        self.epochs   = epochs
+        self.keys     = keys
+        self.files    = files
+        self.records  = records
+        self._pos:       dict[str, int] | None = None
+        self._file_set:  set[str] | None       = None
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def nbytes(self) -> int:
+        per_entry = _SEGMENT_ENTRY_BYTES if self.records is not None else _LEGACY_ENTRY_BYTES
+        return 256 + len(self.keys) * per_entry
+
+    def position(self, measured_at: str) -> int | None:
+        if self._pos is None:
+            self._pos = {k: i for i, k in enumerate(self.keys)}
+        return self._pos.get(measured_at)
+
+    def record(self, measured_at: str) -> dict | None:
+        """Segment markers only: the live record for measured_at."""
+        i = self.position(measured_at)
+        return None if i is None else self.records[i]
+
+    def has_file(self, filename: str) -> bool:
+        """Legacy markers only: whether a datapoint file name is already indexed."""
+        if self._file_set is None:
+            self._file_set = set(self.files or [])
+        return filename in self._file_set
+
+    def range(self, from_t: int, to_t: int) -> tuple[int, int]:
+        """[lo, hi) positions of entries with from_t <= epoch <= to_t."""
+        lo = int(np.searchsorted(self.epochs, from_t, side="left"))
+        hi = int(np.searchsorted(self.epochs, to_t,   side="right"))
+        return lo, hi
+
+
+# ── Loading ────────────────────────────────────────────────────────────────────
+
+def _stat(path: str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _source_files(marker_dir: str) -> list[str]:
+    if segment_log.is_segment_marker(marker_dir):
+        seg = segment_log.segments_dir(marker_dir)
+        return [os.path.join(seg, name) for name in (segment_log.BASE_FILE, segment_log.TAIL_FILE)]
+    return [os.path.join(marker_dir, "index.json")]
+
+
+def _signature(marker_dir: str) -> tuple:
+    return tuple((path, _stat(path)) for path in _source_files(marker_dir))
+
+
+def _load_legacy(marker_dir: str) -> MarkerIndex:
+    with open(os.path.join(marker_dir, "index.json"), "r", encoding="utf-8") as f:
+        record_fs_read(os.fstat(f.fileno()).st_size)
+        entries = json.load(f).get("entries", [])
+    epochs = np.fromiter(
+        (segment_log.to_epoch_ms(e["measured_at"]) for e in entries), dtype=np.int64, count=len(entries)
+    )
+    # index.json is sorted by measured_at string; sort by time so range() can bisect.
+    order   = np.argsort(epochs, kind="stable")
+    entries = [entries[i] for i in order]
+    return MarkerIndex(
+        "legacy",
+        epochs[order],
+        [e["measured_at"] for e in entries],
+        files=[e["file"] for e in entries],
+    )
+
+
+def _load_segments(marker_dir: str) -> MarkerIndex:
+    records = segment_log.read_records(marker_dir)
+    epochs  = np.fromiter((r["t"] for r in records), dtype=np.int64, count=len(records))
+    return MarkerIndex("segments", epochs, [r["measured_at"] for r in records], records=records)
+
+
+def load_marker_index(marker_dir: str) -> MarkerIndex:
+    """Parses a marker's index from disk (uncached). Raises FileNotFoundError if there is no dataset."""
+    if segment_log.is_segment_marker(marker_dir):
+        return _load_segments(marker_dir)
+    return _load_legacy(marker_dir)
+
+
+# ── Cache ──────────────────────────────────────────────────────────────────────
+
+class IndexCache:
+    """Thread-safe LRU of MarkerIndex objects keyed by absolute marker directory."""
+
+    def __init__(self, max_bytes: int = INDEX_CACHE_MAX_BYTES) -> None:
+        self.max_bytes  = max_bytes
+        self.bytes      = 0
+        self.hits       = 0
+        self.misses     = 0
+        self.evictions  = 0
+        self._entries:  OrderedDict[str, tuple[tuple, MarkerIndex]] = OrderedDict()
+        self._lock      = threading.Lock()
+
+    def get(self, marker_dir: str, loader: Callable[[str], MarkerIndex] = load_marker_index) -> MarkerIndex:
+        key       = os.path.abspath(marker_dir)
+        signature = _signature(key)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        # Parse outside the lock; concurrent misses on the same marker just parse twice.
+        index = loader(key)
+        # Re-stat after parsing: if a writer got in between, don't cache a possibly mixed view.
+        if _signature(key) != signature:
+            return index
+        with self._lock:
+            self._drop(key)
+            if index.nbytes <= self.max_bytes:
+                self._entries[key] = (signature, index)
+                self.bytes += index.nbytes
+                while self.bytes > self.max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self.bytes     -= evicted.nbytes
+                    self.evictions += 1
+        return index
+
+    def worth_caching(self, marker_dir: str) -> bool:
+        """
+        False for segment markers too large to take a fair share of the cache, and for markers with
+        archived months (whose point is to stay compressed until a read needs them); callers read those
+        with segment_log's footer-index seeks and per-month decompression instead.
+        """
+        if not segment_log.is_segment_marker(marker_dir):
+            return True
+        if segment_log.has_archive(marker_dir):
+            return False
+        footer = segment_log.read_footer(segment_log.segments_dir(marker_dir))
+        count  = footer["count"] if footer else 0
+        return count * _SEGMENT_ENTRY_BYTES <= self.max_bytes // 8
+
+    def _drop(self, key: str) -> None:
+        cached = self._entries.pop(key, None)
+        if cached is not None:
+            self.bytes -= cached[1].nbytes
+
+    def invalidate(self, marker_dir: str) -> None:
+        with self._lock:
+            self._drop(os.path.abspath(marker_dir))
+
+    def invalidate_prefix(self, directory: str) -> None:
+        """Drops every cached marker under directory (a subject or module dir)."""
+        prefix = os.path.abspath(directory) + os.sep
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries":   len(self._entries),
+                "bytes":     self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits":      self.hits,
+                "misses":    self.misses,
+                "evictions": self.evictions,
+            }
+
+
+INDEX_CACHE = IndexCache()
+
+
+# ── Mirrored signatures ────────────────────────────────────────────────────────
+
+class MirroredSignatures:
+    """Per-marker file signature at which the SQLite mirror matches disk. Thread-safe, LRU-bounded."""
+
+    def __init__(self, limit: int = _MIRRORED_LIMIT) -> None:
+        self.limit       = limit
+        self._signatures: OrderedDict[str, tuple] = OrderedDict()
+        self._lock       = threading.Lock()
+
+    def _set(self, key: str, signature: tuple | None) -> None:
+        with self._lock:
+            self._signatures.pop(key, None)
+            if signature is not None:
+                self._signatures[key] = signature
+                while len(self._signatures) > self.limit:
+                    self._signatures.popitem(last=False)
+
+    @contextmanager
+    def writing(self, marker_dir: str) -> Iterator[None]:
+        """
+        Wraps a write the caller mirrors into SQLite itself; run it under the marker's lock. If the
+        mirror matched the files before the write, it is taken to match them after it as well. If the
+        files had changed in between (an external writer), the marker is forgotten, so the watcher
+        still reconciles it.
+        """
+        key    = os.path.abspath(marker_dir)
+        before = _signature(key)
+        try:
+            yield
+        except BaseException:
+            # A rejected write changed nothing; a failed one may have left changes nobody mirrored.
+            if _signature(key) != before:
+                self._set(key, None)
+            raise
+        with self._lock:
+            known = self._signatures.get(key)
+        self._set(key, _signature(key) if known == before else None)
+
+    def reconciled(self, marker_dir: str, signature: tuple) -> None:
+        """Records that the mirror was rebuilt from the files as they were at `signature`."""
+        self._set(os.path.abspath(marker_dir), signature)
+
+    def in_sync(self, marker_dir: str) -> bool:
+        key = os.path.abspath(marker_dir)
+        with self._lock:
+            known = self._signatures.get(key)
+        return known is not None and known == _signature(key)
+
+
+def marker_signature(marker_dir: str) -> tuple:
+    """(path, (mtime_ns, size)) of the files a marker's index is read from."""
+    return _signature(os.path.abspath(marker_dir))
+
+
+MIRRORED = MirroredSignatures()
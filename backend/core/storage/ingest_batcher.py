@@ -0,0 +1,142 @@
+# Optional group commit for single-datapoint ingest (addDatapoint).
+#
+# By default every addDatapoint appends (and fsyncs) its own record and commits its own SQLite
+# transaction, so when many devices sync at once the ingest rate is capped by fsync latency.
+# With ASHDT_GROUP_COMMIT=1 the mutation instead hands its record to the app's IngestBatcher and
+# awaits the result. The batcher collects records for up to GROUP_COMMIT_MS after the first one
+# arrives (or until GROUP_COMMIT_MAX records are queued), then writes the whole batch in a worker
+# thread: records are coalesced per marker and written with data_writer.write_marker_batch — one
+# locked append + fsync per marker, whose SQLite rows are committed right after. Every caller is
+# answered only after its marker's transaction commits, so an acknowledged datapoint is durable.
+# A marker that fails (I/O or database error) fails only its own callers; the markers written
+# before it stay committed, so nobody is told a stored datapoint was lost.
+#
+# Semantics match the direct path: a timestamp that already exists (on disk or earlier in the same
+# batch) fails with the usual "already exists" error. While one batch is being written the next one
+# is already filling up. The batcher lives on app.state.ingest_batcher (None when disabled) and is
+# flushed on shutdown.
+
+from __future__ import annotations
+import asyncio
+import logging
+import os
+
+from backend.core.storage.data_writer import write_marker_batch
+from backend.startup.database_logistics import get_connection
+
+logger = logging.getLogger(__name__)
+
+GROUP_COMMIT_ENABLED = os.environ.get("ASHDT_GROUP_COMMIT", "").lower() in ("1", "true", "yes")
+GROUP_COMMIT_MS      = float(os.environ.get("ASHDT_GROUP_COMMIT_MS", "50"))    # max wait after the first queued record
+GROUP_COMMIT_MAX     = int(os.environ.get("ASHDT_GROUP_COMMIT_MAX", "1000"))   # flush early once this many are queued
+
+
+class IngestBatcher:
+    """Queues single-datapoint writes and flushes them in batches. Only used from the event loop."""
+
+    def __init__(
+        self,
+        db_path:      str,
+        rawdata_root: str,
+        max_delay_ms: float = GROUP_COMMIT_MS,
+        max_records:  int   = GROUP_COMMIT_MAX,
+    ) -> None:
+        self.db_path      = db_path
+        self.rawdata_root = rawdata_root
+        self.max_delay    = max_delay_ms / 1000
+        self.max_records  = max_records
+        self.batches      = 0
+        self.records      = 0
+        self._pending:  list[tuple[tuple[str, str, str], dict, asyncio.Future]] = []
+        self._queued    = asyncio.Event()
+        self._full      = asyncio.Event()
+        self._closing   = False
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stops accepting records and waits until everything queued has been written."""
+        self._closing = True
+        self._full.set()
+        self._queued.set()
+        if self._task is not None:
+            await self._task
+
+    async def submit(self, subject_id: str, module_id: str, marker_id: str, rec: dict) -> None:
+        """
+        Queues one datapoint (rec: measured_at, value, unit, data_quality) and returns once its
+        batch has been committed. Raises ValueError with a user-facing message if it was rejected.
+        """
+        if self._closing:
+            raise RuntimeError("Ingest batcher is shut down.")
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(((subject_id, module_id, marker_id), dict(rec), future))
+        self._queued.set()
+        if len(self._pending) >= self.max_records:
+            self._full.set()
+        await future
+
+    async def _run(self) -> None:
+        while True:
+            await self._queued.wait()
+            if not self._closing:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            batch, self._pending = self._pending, []
+            self._queued.clear()
+            self._full.clear()
+            if batch:
+                await self._flush(batch)
+            if self._closing and not self._pending:
+                return
+
+    async def _flush(self, batch: list) -> None:
+        try:
+            errors = await asyncio.to_thread(self._write, [(key, rec) for key, rec, _ in batch])
+        except Exception as exc:
+            logger.exception("Group-commit batch of %d datapoints failed", len(batch))
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        self.batches += 1
+        self.records += len(batch)
+        for i, (_, _, future) in enumerate(batch):
+            if future.done():
+                continue  # caller went away (request cancelled)
+            if i in errors:
+                future.set_exception(errors[i])
+            else:
+                future.set_result(None)
+
+    def _write(self, batch: list[tuple[tuple[str, str, str], dict]]) -> dict[int, Exception]:
+        """
+        Writes one batch (runs in a worker thread), committing each marker on its own.
+        Returns {batch position: error} — ValueError for rejected records, or the exception that
+        failed the record's marker.
+        """
+        by_marker: dict[tuple[str, str, str], list[dict]] = {}
+        for i, (key, rec) in enumerate(batch):
+            rec["row"] = i
+            by_marker.setdefault(key, []).append(rec)
+
+        errors: dict[int, Exception] = {}
+        with get_connection(self.db_path) as conn:
+            for (subject_id, module_id, marker_id), records in by_marker.items():
+                try:
+                    _, rejected = write_marker_batch(conn, self.rawdata_root, subject_id, module_id, marker_id, records)
+                    conn.commit()
+                except Exception as exc:
+                    logger.exception("Group-commit write of %d datapoints to %s/%s/%s failed",
+                                     len(records), subject_id, module_id, marker_id)
+                    conn.rollback()
+                    for rec in records:
+                        errors[rec["row"]] = exc
+                    continue
+                for rec, reason in rejected:
+                    errors[rec["row"]] = ValueError(reason)
+        return errors
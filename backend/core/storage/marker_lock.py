@@ -0,0 +1,81 @@
+# Per-marker write locking and atomic file replacement for the raw_data archive.
+#
+# Every read-modify-write of a marker (existence check + append for segment logs, index.json rewrite
+# for legacy markers, compaction, migration, moving the dataset away) runs under marker_lock(), an
+# exclusive advisory flock on raw_data/{subject}/{module}/{marker}/.lock. The lock is per marker, so
+# any number of API workers, ARQ workers and import scripts can ingest in parallel as long as they
+# write to different markers, and writers to the same marker queue up instead of losing updates.
+# Readers never lock: everything a reader opens is either append-only (tail.jsonl) or replaced with
+# atomic_write() / os.replace(), so it sees the old version or the new one, never a torn file.
+#
+# flock is POSIX-only. Where fcntl is unavailable (Windows) the lock degrades to a per-process
+# threading lock, which still serializes threads but not separate processes.
+
+from __future__ import annotations
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None
+
+LOCK_FILE = ".lock"
+
+_fallback_locks: dict[str, threading.Lock] = {}
+_fallback_guard = threading.Lock()
+
+
+@contextmanager
+def marker_lock(marker_dir: str) -> Iterator[None]:
+    """
+    Holds the marker's exclusive write lock for the duration of the block, creating marker_dir if
+    needed. Not reentrant: code running under the lock must not take it again.
+    """
+    os.makedirs(marker_dir, exist_ok=True)
+    if fcntl is None:
+        with _fallback_guard:
+            lock = _fallback_locks.setdefault(os.path.abspath(marker_dir), threading.Lock())
+        with lock:
+            yield
+        return
+
+    lock_path = os.path.join(marker_dir, LOCK_FILE)
+    while True:
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        # If the marker directory was moved away (deleteDataset) while we waited, the lock we hold
+        # belongs to the old dataset; start over on the directory now at marker_dir.
+        try:
+            if os.path.samestat(os.fstat(fd), os.stat(lock_path)):
+                break
+        except FileNotFoundError:
+            os.makedirs(marker_dir, exist_ok=True)
+        os.close(fd)
+    try:
+        yield
+    finally:
+        os.close(fd)  # closing the descriptor releases the flock
+
+
+def atomic_write(path: str, data: str | bytes) -> None:
+    """
+    Replaces path with data via a temp file in the same directory, fsync and os.replace, so readers
+    see either the previous contents or the new ones in full.
+    """
+    # Unique per writer thread; created like any other file, so it keeps the usual permissions.
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data.encode("utf-8") if isinstance(data, str) else data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -1,95 +1,214 @@
 # Loads a markerset instance from the DB and resolves its full marker configuration,
 # including per-marker zone boundaries derived from the subject's demographics.
 # For template-based instances, sparse overrides are merged onto the template base.
+# Zone boundaries for all active markers are resolved in one batch: one subjects lookup, then one
+# array lookup per marker in the pre-interpolated zone tables (core/storage/zone_tables.py).
+#
+# Merged instances (template + overrides, JSON already parsed) are kept in MARKERSET_CACHE, which both
+# this module and the markersetInstances listing read from. A subject's instances are loaded with one
+# JOIN against their templates, parsing each template's markers_json once. The cache is validated
+# against the "markersets" counter in catalog_versions (bumped by triggers on markerset_templates and
+# markerset_instances), and MarkersetMutations also invalidate it explicitly.
 
 from __future__ import annotations
 import json
 import logging
-from datetime import date
+import os
+import threading
+from collections import OrderedDict
 
-from backend.startup.database_logistics import get_connection
+from backend.core.storage.zone_tables import BOUNDARY_FIELDS, ZONE_TABLES, age_in_years
+from backend.startup.database_logistics import catalog_version, get_connection
 
 logger = logging.getLogger(__name__)
 
+MARKERSET_CACHE_SUBJECTS = int(os.environ.get("ASHDT_MARKERSET_CACHE_SUBJECTS", "1024"))
 
-def _zone_boundaries_for_marker(
-    conn,
-    subject_id: str,
-    module_id:  str,
-    marker_id:  str,
-) -> dict:
+
+# ── Resolved instances ─────────────────────────────────────────────────────────
+
+_INSTANCE_QUERY = (
+    "SELECT i.instance_id, i.subject_id, i.markerset_id, i.name, i.overrides_json, i.created_at, "
+    "t.markerset_id AS template_id, t.markers_json "
+    "FROM markerset_instances i "
+    "LEFT JOIN markerset_templates t ON t.markerset_id = i.markerset_id "
+)
+
+
+def _merge_markers(base_markers: list[dict], overrides: list[dict]) -> list[dict]:
+    """Applies sparse overrides onto a template's markers by (module_id, marker_id) key."""
+    override_map = {
+        f"{o['module_id']}/{o['marker_id']}": o for o in overrides
+    }
+    merged = []
+    for m in base_markers:
+        key = f"{m['module_id']}/{m['marker_id']}"
+        merged.append({**m, **override_map[key]} if key in override_map else m)
+    return merged
+
+
+def _resolve_rows(rows) -> list[dict]:
+    """
+    Turns instance rows from _INSTANCE_QUERY into resolved instances:
+        {instance_id, subject_id, markerset_id, name, created_at,
+         markers: merged marker list, template_missing: bool}
     """
-    Returns age/sex-interpolated zone boundaries for one subject+marker pair.
-    Falls back to generic (sex=NULL, age=NULL) row if no demographic data is available.
-    Raises ValueError if no zone reference exists at all.
+    templates: dict[str, list[dict]] = {}
+    resolved = []
+    for r in rows:
+        overrides = json.loads(r["overrides_json"])
+        missing   = False
+        if r["markerset_id"]:
+            # Custom instances use overrides as the full list; template-based ones merge onto the base
+            missing = r["template_id"] is None
+            if not missing and r["template_id"] not in templates:
+                templates[r["template_id"]] = json.loads(r["markers_json"])
+            markers = _merge_markers(templates.get(r["template_id"], []), overrides)
+        else:
+            markers = overrides
+        resolved.append({
+            "instance_id":      r["instance_id"],
+            "subject_id":       r["subject_id"],
+            "markerset_id":     r["markerset_id"],
+            "name":             r["name"],
+            "created_at":       r["created_at"],
+            "markers":          markers,
+            "template_missing": missing,
+        })
+    return resolved
+
+
+class MarkersetCache:
+    """
+    Resolved markerset instances per subject, LRU-bounded by subject count. Entries are shared —
+    callers must not mutate them.
     """
+
+    def __init__(self, max_subjects: int = MARKERSET_CACHE_SUBJECTS) -> None:
+        self.max_subjects = max_subjects
+        self.hits         = 0
+        self.misses       = 0
+        self._version:    int | None = None
+        self._subjects:   OrderedDict[str, list[dict]] = OrderedDict()
+        self._lock        = threading.Lock()
+
+    def _check_version(self, conn) -> int:
+        version = catalog_version(conn, "markersets")
+        if version != self._version:
+            self._subjects.clear()
+            self._version = version
+        return version
+
+    def subject_instances(self, conn, subject_id: str) -> list[dict]:
+        """A subject's resolved instances, newest first."""
+        with self._lock:
+            version = self._check_version(conn)
+            cached  = self._subjects.get(subject_id)
+            if cached is not None:
+                self._subjects.move_to_end(subject_id)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        rows = conn.execute(
+            _INSTANCE_QUERY + "WHERE i.subject_id = ? ORDER BY i.created_at DESC", (subject_id,)
+        ).fetchall()
+        instances = _resolve_rows(rows)
+        with self._lock:
+            # Only cache if nothing changed while we were reading.
+            if self._version == version == catalog_version(conn, "markersets"):
+                self._subjects[subject_id] = instances
+                while len(self._subjects) > self.max_subjects:
+                    self._subjects.popitem(last=False)
+        return instances
+
+    def instance(self, conn, instance_id: str) -> dict | None:
+        """One resolved instance, or None if it does not exist."""
+        row = conn.execute(
+            "SELECT subject_id FROM markerset_instances WHERE instance_id = ?", (instance_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        for inst in self.subject_instances(conn, row["subject_id"]):
+            if inst["instance_id"] == instance_id:
+                return inst
+        return None
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._subjects.clear()
+            self._version = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"subjects": len(self._subjects), "hits": self.hits, "misses": self.misses}
+
+
+MARKERSET_CACHE = MarkersetCache()
+
+
+# ── Zone boundaries ────────────────────────────────────────────────────────────
+
+
+def _subject_demographics(conn, subject_id: str) -> tuple[str | None, str | None]:
+    """Returns (sex, dob) for a subject. Raises ValueError if it does not exist."""
     row = conn.execute(
         "SELECT sex, dob FROM subjects WHERE subject_id = ?", (subject_id,)
     ).fetchone()
     if row is None:
         raise ValueError(f"Subject '{subject_id}' not found.")
+    return row["sex"], row["dob"]
 
-    sex = row["sex"]
-    dob = row["dob"]
-    age = None
-    if dob:
-        try:
-            birth = date.fromisoformat(dob[:10])
-            today = date.today()
-            age   = today.year - birth.year - (
-                (today.month, today.day) < (birth.month, birth.day)
-            )
-        except ValueError:
-            pass
-
-    rows = conn.execute(
-        "SELECT age, healthy_min, healthy_max, vulnerability_margin "
-        "FROM zone_references "
-        "WHERE module_id = ? AND marker_id = ? AND sex = ? AND age IS NOT NULL "
-        "ORDER BY age",
-        (module_id, marker_id, sex),
-    ).fetchall()
-
-    result = None
-    if rows and age is not None:
-        ages = [r["age"] for r in rows]
-        if age <= ages[0]:
-            r      = rows[0]
-            result = (r["healthy_min"], r["healthy_max"], r["vulnerability_margin"])
-        elif age >= ages[-1]:
-            r      = rows[-1]
-            result = (r["healthy_min"], r["healthy_max"], r["vulnerability_margin"])
-        else:
-            for i in range(len(rows) - 1):
-                if ages[i] <= age <= ages[i + 1]:
-                    lo, hi = rows[i], rows[i + 1]
-                    t      = (age - ages[i]) / (ages[i + 1] - ages[i])
-                    result = (
-                        lo["healthy_min"]          + t * (hi["healthy_min"]          - lo["healthy_min"]),
-                        lo["healthy_max"]          + t * (hi["healthy_max"]          - lo["healthy_max"]),
-                        lo["vulnerability_margin"] + t * (hi["vulnerability_margin"] - lo["vulnerability_margin"]),
-                    )
-                    break
-
-    if result is None:
-        generic = conn.execute(
-            "SELECT healthy_min, healthy_max, vulnerability_margin "
-            "FROM zone_references "
-            "WHERE module_id = ? AND marker_id = ? AND sex IS NULL AND age IS NULL",
-            (module_id, marker_id),
-        ).fetchone()
-        if generic is None:
+
+def _zone_boundaries_for_markers(
+    conn,
+    subject_id: str,
+    pairs:      list[tuple[str, str]],
+    age_aware:  bool = False,
+) -> dict[tuple[str, str], dict]:
+    """
+    Returns the zone fields to attach to each of many (module_id, marker_id) pairs for one subject,
+    keyed by pair: {"zone_boundaries": {...}} interpolated at the subject's current age (clamped to
+    the nearest tabulated age, generic row without demographic data). The subject is read once and
+    boundaries come from the in-memory ZONE_TABLES. With age_aware, pairs that have a sex-specific
+    age table also get it as "zone_table" (see zone_tables.boundaries_at).
+    Raises ValueError if a pair has no zone reference at all.
+    """
+    pairs = list(dict.fromkeys(pairs))
+    if not pairs:
+        return {}
+    sex, dob = _subject_demographics(conn, subject_id)
+    age      = age_in_years(dob)
+    tables   = ZONE_TABLES.get(conn)
+
+    result: dict[tuple[str, str], dict] = {}
+    for module_id, marker_id in pairs:
+        resolved = tables.resolve(module_id, marker_id, sex, age)
+        if resolved is None:
             raise ValueError(
                 f"No zone reference found for {module_id}/{marker_id}. "
                 "Add zone boundaries before running composite analysis."
             )
-        result = (generic["healthy_min"], generic["healthy_max"], generic["vulnerability_margin"])
+        boundaries, is_generic = resolved
+        entry = {"zone_boundaries": dict(zip(BOUNDARY_FIELDS, boundaries))}
+        if age_aware and not is_generic:
+            entry["zone_table"] = {
+                "dob":  dob[:10],
+                "rows": tables.age_table(module_id, marker_id, sex).tolist(),
+            }
+        result[(module_id, marker_id)] = entry
+    return result
 
-    return {
-        "healthy_min":          result[0],
-        "healthy_max":          result[1],
-        "vulnerability_margin": result[2],
-    }
+
+def _zone_boundaries_for_marker(
+    conn,
+    subject_id: str,
+    module_id:  str,
+    marker_id:  str,
+) -> dict:
+    """Zone boundaries for a single marker (see _zone_boundaries_for_markers)."""
+    pair = (module_id, marker_id)
+    return _zone_boundaries_for_markers(conn, subject_id, [pair])[pair]["zone_boundaries"]
 
 
 def resolve_markerset_markers(
@@ -97,12 +216,15 @@ def resolve_markerset_markers(
     subject_id:       str,
     instance_id:      str | None         = None,
     raw_marker_refs:  list[dict] | None  = None,
+    age_aware:        bool               = False,
 ) -> list[dict]:
     """
     Resolves a markerset instance or ad-hoc marker_refs into a fully-configured
     marker list, adding per-marker zone_boundaries from the DB.
 
     Exactly one of instance_id / raw_marker_refs must be provided.
+    With age_aware, markers with sex/age-specific references also get a "zone_table" with the
+    boundaries for every age, used to normalize each datapoint at the subject's age at that time.
 
     Returns:
         list of dicts (one per active marker):
@@ -114,6 +236,7 @@ def resolve_markerset_markers(
                 "transform":    dict,   # {type, window_hours, lag_hours}
                 "missing_data": str,
                 "zone_boundaries": {healthy_min, healthy_max, vulnerability_margin},
+                "zone_table":   {dob, rows},   # age_aware only, when available
             }
     """
     if (instance_id is None) == (raw_marker_refs is None):
@@ -122,36 +245,12 @@ def resolve_markerset_markers(
     with get_connection(db_path) as conn:
 
         if instance_id is not None:
-            inst = conn.execute(
-                "SELECT markerset_id, overrides_json FROM markerset_instances "
-                "WHERE instance_id = ?",
-                (instance_id,),
-            ).fetchone()
+            inst = MARKERSET_CACHE.instance(conn, instance_id)
             if inst is None:
                 raise ValueError(f"Markerset instance '{instance_id}' not found.")
-
-            overrides = json.loads(inst["overrides_json"])
-
-            if inst["markerset_id"]:
-                tmpl = conn.execute(
-                    "SELECT markers_json FROM markerset_templates WHERE markerset_id = ?",
-                    (inst["markerset_id"],),
-                ).fetchone()
-                if tmpl is None:
-                    raise ValueError(f"Markerset template '{inst['markerset_id']}' not found.")
-                base_markers = json.loads(tmpl["markers_json"])
-
-                # Merge: overrides are applied by (module_id, marker_id) key
-                override_map = {
-                    f"{o['module_id']}/{o['marker_id']}": o for o in overrides
-                }
-                merged = []
-                for m in base_markers:
-                    key    = f"{m['module_id']}/{m['marker_id']}"
-                    merged.append({**m, **override_map[key]} if key in override_map else m)
-            else:
-                # Custom instance — overrides IS the full marker list
-                merged = overrides
+            if inst["template_missing"]:
+                raise ValueError(f"Markerset template '{inst['markerset_id']}' not found.")
+            merged = inst["markers"]
 
         else:
             # Ad-hoc multi-marker: apply default feature config
@@ -167,14 +266,11 @@ def resolve_markerset_markers(
                 for r in raw_marker_refs  # type: ignore[union-attr]
             ]
 
-        # Attach per-marker zone boundaries (active markers only)
-        result = []
-        for m in merged:
-            if not m.get("active", True):
-                continue
-            zone_bnd = _zone_boundaries_for_marker(
-                conn, subject_id, m["module_id"], m["marker_id"]
-            )
-            result.append({**m, "zone_boundaries": zone_bnd})
+        # Attach per-marker zone boundaries (active markers only), resolved in one batch
+        active = [m for m in merged if m.get("active", True)]
+        zones  = _zone_boundaries_for_markers(
+            conn, subject_id, [(m["module_id"], m["marker_id"]) for m in active], age_aware
+        )
+        result = [{**m, **zones[(m["module_id"], m["marker_id"])]} for m in active]
 
     return result
@@ -0,0 +1,745 @@
+# Append-only segment log: the per-marker storage format that replaces one JSON file per datapoint
+# plus an index.json rewritten on every change. A marker stored this way looks like:
+#
+#   raw_data/{subject}/{module}/{marker}/segments/base.jsonl     — compacted records, sorted by time, live only
+#   raw_data/{subject}/{module}/{marker}/segments/base.idx.json  — small footer index for base.jsonl
+#   raw_data/{subject}/{module}/{marker}/segments/tail.jsonl     — append-only op log since the last compaction
+#   raw_data/{subject}/{module}/{marker}/segments/base.{gen}.epochs.npy / .values.npy
+#                                                                 — columnar copy of the base (int64 ms, float64)
+#   raw_data/{subject}/{module}/{marker}/segments/archive/{YYYY-MM}.jsonl.gz
+#                                                                 — cold tier: one gzip file per archived month
+#
+# Every line is one JSON object. Records carry "t" (epoch milliseconds, UTC) next to the original
+# measured_at string, so range filtering never parses timestamps. A datapoint is identified by its
+# measured_at string, exactly like the SQLite mirror (measured_at UNIQUE).
+#
+#   base record:  {"t", "measured_at", "value", "unit", "data_quality", "created_at", ["updated_at"]}
+#   tail op:      {"op": "put", ...record fields...}  |  {"op": "del", "t", "measured_at", "deleted_at"}
+#
+# Reads fold the tail over the base (the last op per measured_at wins). The footer holds the record
+# count, first/last time and a sparse [t, byte_offset] entry every SPARSE_EVERY records, so a time-range
+# read or a point lookup seeks straight to the right block of base.jsonl instead of scanning it all.
+#
+# The columnar copy is what the analysis path reads: read_range_columns() memory-maps the two .npy files
+# and slices a time range with searchsorted, so workers get NumPy views without parsing any JSON, and
+# several worker processes reading the same marker share the OS page cache instead of private copies.
+#
+# Compaction folds the tail into a new base (temp file + rename), dropping superseded versions and
+# tombstoned records. Tombstoned records are appended to data/deleted_datapoints/{subject}/{module}/{marker}/,
+# so deletes stay soft as they are for the legacy layout. append_ops() only reports when the tail has
+# outgrown a fraction of the base; data_writer then compacts the marker on a background thread, so no
+# write waits for the rewrite. It also runs on demand from the CLI:
+#
+#   python -m backend.core.storage.segment_log migrate [--subject ID] [--keep-legacy]
+#   python -m backend.core.storage.segment_log compact [--subject ID]
+#
+# `migrate` converts legacy markers (index.json + per-datapoint files) into segments. Markers that have
+# not been migrated keep working through the legacy paths in data_reader / data_writer.
+#
+# Cold tier: `archive` moves every whole calendar month (UTC) older than ARCHIVE_AFTER_DAYS out of the base
+# into segments/archive/{YYYY-MM}.jsonl.gz, same record format, gzip-compressed:
+#
+#   python -m backend.core.storage.segment_log archive [--subject ID] [--older-than-days N]
+#
+# An archived month lives only in its archive file: reads merge the archive months that overlap the
+# requested range with the base (decompressing nothing else), and compaction folds tail ops for an archived
+# month back into that month's file rather than the base. Legacy markers are migrated before archiving.
+#
+# Writers (append_ops, compact, migrate_marker) expect the caller to hold the marker's lock
+# (marker_lock.py); data_writer and the CLI below take it. Readers don't lock. The footer records the
+# inode of the base it describes, so a reader that opened the base before a compaction replaced it
+# never applies the new footer's offsets to the old file (or the other way round).
+
+from __future__ import annotations
+import argparse
+import bisect
+import gzip
+import heapq
+import json
+import logging
+import math
+import os
+import shutil
+from array import array
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from backend.core.storage.marker_lock import marker_lock
+from backend.core.telemetry import record_fs_read
+
+logger = logging.getLogger(__name__)
+
+SEGMENTS_DIR   = "segments"
+BASE_FILE      = "base.jsonl"
+FOOTER_FILE    = "base.idx.json"
+TAIL_FILE      = "tail.jsonl"
+ARCHIVE_DIR    = "archive"
+FOOTER_VERSION = 1
+
+SPARSE_EVERY          = 128              # base records per sparse footer entry
+COMPACT_MIN_TAIL      = 256 * 1024       # never compact a tail smaller than this (bytes)
+COMPACT_MAX_TAIL      = 8 * 1024 * 1024  # always compact a tail larger than this (bytes)
+COMPACT_TAIL_FRACTION = 8                # in between, compact once tail > base / COMPACT_TAIL_FRACTION
+
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ASHDT_ARCHIVE_AFTER_DAYS", "365"))  # default age for `archive`
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_RECORD_FIELDS = ("t", "measured_at", "value", "unit", "data_quality", "created_at", "updated_at")
+
+
+# ── Helpers ────────────────────────────────────────────────────────────────────
+
+def to_epoch_ms(value: str | datetime) -> int:
+    """ISO 8601 string or datetime → epoch milliseconds. Naive timestamps are taken as UTC."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(round(value.timestamp() * 1000))
+
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def segments_dir(marker_dir: str) -> str:
+    return os.path.join(marker_dir, SEGMENTS_DIR)
+
+
+def is_segment_marker(marker_dir: str) -> bool:
+    return os.path.isdir(segments_dir(marker_dir))
+
+
+def _paths(seg_dir: str) -> tuple[str, str, str]:
+    return os.path.join(seg_dir, BASE_FILE), os.path.join(seg_dir, FOOTER_FILE), os.path.join(seg_dir, TAIL_FILE)
+
+
+def make_record(
+    measured_at:  str,
+    value:        float,
+    unit:         str | None,
+    data_quality: str | None,
+    created_at:   str,
+    updated_at:   str | None = None,
+) -> dict:
+    rec = {
+        "t":            to_epoch_ms(measured_at),
+        "measured_at":  measured_at,
+        "value":        value,
+        "unit":         unit,
+        "data_quality": data_quality,
+        "created_at":   created_at,
+    }
+    if updated_at:
+        rec["updated_at"] = updated_at
+    return rec
+
+
+def put_op(rec: dict) -> dict:
+    return {"op": "put", **rec}
+
+
+def del_op(measured_at: str) -> dict:
+    return {"op": "del", "t": to_epoch_ms(measured_at), "measured_at": measured_at, "deleted_at": _utc_now_iso()}
+
+
+def _sort_key(rec: dict) -> tuple:
+    return rec["t"], rec["measured_at"]
+
+
+def _strip_op(op: dict) -> dict:
+    return {k: op[k] for k in _RECORD_FIELDS if k in op}
+
+
+def _dumps(obj: dict) -> str:
+    return json.dumps(obj, separators=(",", ":")) + "\n"
+
+
+def _iter_jsonl(path: str, start: int = 0):
+    """Yields parsed lines from a byte offset. A torn last line (crash mid-append) is skipped."""
+    if not os.path.isfile(path):
+        return
+    with open(path, "rb") as f:
+        yield from _iter_lines(f, path, start)
+
+
+def _iter_lines(f, path: str, start: int):
+    f.seek(start)
+    try:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning("Skipping unreadable segment line in %s", path)
+    finally:
+        record_fs_read(f.tell() - start)
+
+
+def _read_footer_raw(footer_path: str) -> dict | None:
+    try:
+        with open(footer_path, "r", encoding="utf-8") as f:
+            record_fs_read(os.fstat(f.fileno()).st_size)
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _describes(footer: dict | None, base_stat: os.stat_result) -> bool:
+    """Whether footer belongs to the base file with this stat (footers written before "inode" was recorded: by size)."""
+    if footer is None or footer.get("version") != FOOTER_VERSION or footer.get("bytes") != base_stat.st_size:
+        return False
+    return footer.get("inode") in (None, base_stat.st_ino)
+
+
+def read_footer(seg_dir: str) -> dict | None:
+    """The footer, if it describes the current base file; None otherwise (readers then scan from 0)."""
+    base_path, footer_path, _ = _paths(seg_dir)
+    footer = _read_footer_raw(footer_path)
+    try:
+        base_stat = os.stat(base_path)
+    except FileNotFoundError:
+        return None
+    return footer if _describes(footer, base_stat) else None
+
+
+def _fold_tail(seg_dir: str) -> dict[str, dict]:
+    """measured_at → last tail op for that key (a "put" record or a "del" tombstone)."""
+    ops: dict[str, dict] = {}
+    for op in _iter_jsonl(_paths(seg_dir)[2]):
+        ops[op["measured_at"]] = op
+    return ops
+
+
+# ── Cold tier ──────────────────────────────────────────────────────────────────
+
+def _month_of(t: int) -> str:
+    return (_EPOCH + timedelta(milliseconds=t)).strftime("%Y-%m")
+
+
+def _month_start(t: int) -> int:
+    """Epoch ms of the first instant of the UTC month containing t."""
+    d = _EPOCH + timedelta(milliseconds=t)
+    return to_epoch_ms(datetime(d.year, d.month, 1, tzinfo=timezone.utc))
+
+
+def _month_path(seg_dir: str, month: str) -> str:
+    return os.path.join(seg_dir, ARCHIVE_DIR, f"{month}.jsonl.gz")
+
+
+class _ArchivedMonths:
+    """The months a marker has archived, with their [start, end] epoch ranges for range checks."""
+
+    def __init__(self, seg_dir: str) -> None:
+        archive_dir = os.path.join(seg_dir, ARCHIVE_DIR)
+        names       = os.listdir(archive_dir) if os.path.isdir(archive_dir) else []
+        self.months = sorted(n[:-len(".jsonl.gz")] for n in names if n.endswith(".jsonl.gz"))
+        self.starts = [to_epoch_ms(datetime.strptime(m, "%Y-%m").replace(tzinfo=timezone.utc)) for m in self.months]
+        self.ends   = [_month_start(start + 32 * 86_400_000) - 1 for start in self.starts]
+
+    def __bool__(self) -> bool:
+        return bool(self.months)
+
+    def covers(self, t: int) -> bool:
+        i = bisect.bisect_right(self.starts, t) - 1
+        return i >= 0 and t <= self.ends[i]
+
+    def overlapping(self, from_t: int | None, to_t: int | None) -> list[str]:
+        return [
+            m for m, start, end in zip(self.months, self.starts, self.ends)
+            if (from_t is None or end >= from_t) and (to_t is None or start <= to_t)
+        ]
+
+
+def has_archive(marker_dir: str) -> bool:
+    return bool(_ArchivedMonths(segments_dir(marker_dir)))
+
+
+def _read_month(seg_dir: str, month: str) -> list[dict]:
+    path = _month_path(seg_dir, month)
+    if not os.path.isfile(path):
+        return []
+    record_fs_read(os.path.getsize(path))
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _write_month(seg_dir: str, month: str, records: list[dict]) -> None:
+    """Replaces one month's archive (temp file + rename); removes it when no records are left."""
+    path = _month_path(seg_dir, month)
+    if not records:
+        if os.path.isfile(path):
+            os.remove(path)
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+            f.write("".join(_dumps(rec) for rec in sorted(records, key=_sort_key)).encode("utf-8"))
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+
+
+# ── Reads ──────────────────────────────────────────────────────────────────────
+
+def _iter_base(seg_dir: str, from_t: int | None = None, to_t: int | None = None):
+    """Base records in time order, limited to [from_t, to_t] with a sparse-index seek."""
+    base_path, footer_path, _ = _paths(seg_dir)
+    try:
+        f = open(base_path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        start = 0
+        if from_t is not None:
+            # Checked against the base we have open, not the path: a compaction may replace it meanwhile.
+            footer = _read_footer_raw(footer_path)
+            if _describes(footer, os.fstat(f.fileno())) and footer["sparse"]:
+                # Last sparse entry strictly before from_t — records equal to from_t may begin in that block.
+                i = bisect.bisect_left([t for t, _ in footer["sparse"]], from_t) - 1
+                if i >= 0:
+                    start = footer["sparse"][i][1]
+        for rec in _iter_lines(f, base_path, start):
+            if from_t is not None and rec["t"] < from_t:
+                continue
+            if to_t is not None and rec["t"] > to_t:
+                break
+            yield rec
+
+
+def _iter_stored(seg_dir: str, from_t: int | None = None, to_t: int | None = None):
+    """
+    Compacted records (archive + base, tail not folded) in time order within [from_t, to_t].
+    Only the archived months overlapping the range are decompressed.
+    """
+    archived = _ArchivedMonths(seg_dir)
+    if not archived:
+        yield from _iter_base(seg_dir, from_t, to_t)
+        return
+    # Base records inside an archived month are leftovers of an interrupted archive run; the archive wins.
+    hot  = (rec for rec in _iter_base(seg_dir, from_t, to_t) if not archived.covers(rec["t"]))
+    cold = (
+        rec
+        for month in archived.overlapping(from_t, to_t)
+        for rec in _read_month(seg_dir, month)
+        if (from_t is None or rec["t"] >= from_t) and (to_t is None or rec["t"] <= to_t)
+    )
+    yield from heapq.merge(cold, hot, key=_sort_key)
+
+
+def read_records(marker_dir: str, from_t: int | None = None, to_t: int | None = None) -> list[dict]:
+    """Live records (archive + base with the tail folded over it), sorted by time, optionally within [from_t, to_t]."""
+    seg_dir = segments_dir(marker_dir)
+    ops     = _fold_tail(seg_dir)
+    result  = [rec for rec in _iter_stored(seg_dir, from_t, to_t) if rec["measured_at"] not in ops]
+    for op in ops.values():
+        if op.get("op") != "put":
+            continue
+        if (from_t is not None and op["t"] < from_t) or (to_t is not None and op["t"] > to_t):
+            continue
+        result.append(_strip_op(op))
+    result.sort(key=_sort_key)
+    return result
+
+
+def lookup(marker_dir: str, measured_at: str) -> dict | None:
+    """Point lookup by measured_at: the tail first, then one sparse-index block of the base (or one archived month)."""
+    seg_dir = segments_dir(marker_dir)
+    op = _fold_tail(seg_dir).get(measured_at)
+    if op is not None:
+        return _strip_op(op) if op.get("op") == "put" else None
+    t = to_epoch_ms(measured_at)
+    return next((rec for rec in _iter_stored(seg_dir, t, t) if rec["measured_at"] == measured_at), None)
+
+
+def live_keys(marker_dir: str, from_t: int | None = None, to_t: int | None = None) -> set[str]:
+    """Every live measured_at (within [from_t, to_t] if given) in one pass; used for batch duplicate checks."""
+    seg_dir = segments_dir(marker_dir)
+    ops  = _fold_tail(seg_dir)
+    keys = {rec["measured_at"] for rec in _iter_stored(seg_dir, from_t, to_t)}
+    for key, op in ops.items():
+        if (from_t is not None and op["t"] < from_t) or (to_t is not None and op["t"] > to_t):
+            continue
+        if op.get("op") == "put":
+            keys.add(key)
+        else:
+            keys.discard(key)
+    return keys
+
+
+# ── Writes ─────────────────────────────────────────────────────────────────────
+
+def append_ops(marker_dir: str, ops: list[dict]) -> bool:
+    """
+    Appends put/del ops to the tail in a single write. Returns True if the tail has grown large
+    enough to need compaction; the caller schedules it (data_writer compacts in the background).
+    """
+    if not ops:
+        return False
+    seg_dir = segments_dir(marker_dir)
+    os.makedirs(seg_dir, exist_ok=True)
+    with open(_paths(seg_dir)[2], "a", encoding="utf-8") as f:
+        f.write("".join(_dumps(op) for op in ops))
+        f.flush()
+        os.fsync(f.fileno())
+    return needs_compaction(marker_dir)
+
+
+def _column_paths(seg_dir: str, generation: int) -> tuple[str, str]:
+    stem = os.path.join(seg_dir, f"base.{generation}")
+    return stem + ".epochs.npy", stem + ".values.npy"
+
+
+def _as_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _write_base(seg_dir: str, records) -> int:
+    """
+    Writes time-sorted records as the base, its columnar copy and the footer (temp files + renames).
+    Column files carry a generation number recorded in the footer, so readers that still have an
+    older generation mapped keep a consistent view. Returns the record count.
+    """
+    base_path, footer_path, _ = _paths(seg_dir)
+    tmp_base, tmp_footer      = base_path + ".tmp", footer_path + ".tmp"
+    sparse: list[list[int]]   = []
+    epochs, values             = array("q"), array("d")
+    count, offset              = 0, 0
+    with open(tmp_base, "wb") as f:
+        for rec in records:
+            if count % SPARSE_EVERY == 0:
+                sparse.append([rec["t"], offset])
+            line    = _dumps(rec).encode("utf-8")
+            offset += len(line)
+            f.write(line)
+            epochs.append(rec["t"])
+            values.append(_as_float(rec["value"]))
+            count  += 1
+        f.flush()
+        os.fsync(f.fileno())
+
+    previous   = _read_footer_raw(footer_path)
+    old_gen    = (previous or {}).get("columns")
+    generation = (old_gen or 0) + 1
+    epochs_path, values_path = _column_paths(seg_dir, generation)
+    np.save(epochs_path, np.frombuffer(epochs, dtype=np.int64))
+    np.save(values_path, np.frombuffer(values, dtype=np.float64))
+
+    footer = {
+        "version": FOOTER_VERSION, "count": count,
+        "first_t": epochs[0] if count else None, "last_t": epochs[-1] if count else None,
+        "bytes": offset, "sparse_every": SPARSE_EVERY, "sparse": sparse, "columns": generation,
+        "inode": os.stat(tmp_base).st_ino,  # os.replace keeps it; identifies the base this footer describes
+    }
+    with open(tmp_footer, "w", encoding="utf-8") as f:
+        json.dump(footer, f)
+    # Base first: until the footer is replaced too, its byte count no longer matches and it is ignored.
+    os.replace(tmp_base, base_path)
+    os.replace(tmp_footer, footer_path)
+
+    if old_gen:
+        for path in _column_paths(seg_dir, old_gen):
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # still mapped elsewhere on platforms that forbid unlinking open files
+    return count
+
+
+def read_columns(marker_dir: str) -> tuple[np.ndarray, np.ndarray] | None:
+    """
+    Memory-mapped (epochs int64 ms, values float64) arrays of the compacted base, or None if the
+    base has no valid columnar copy. The tail is NOT folded in — see read_range_columns().
+    """
+    seg_dir = segments_dir(marker_dir)
+    footer  = read_footer(seg_dir)
+    if footer is None or not footer.get("columns"):
+        return None
+    if footer["count"] == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    epochs_path, values_path = _column_paths(seg_dir, footer["columns"])
+    try:
+        epochs = np.load(epochs_path, mmap_mode="r")
+        values = np.load(values_path, mmap_mode="r")
+    except (FileNotFoundError, ValueError):
+        return None
+    if len(epochs) != footer["count"] or len(values) != footer["count"]:
+        return None
+    return epochs, values
+
+
+def read_range_columns(marker_dir: str, from_t: int, to_t: int) -> tuple[np.ndarray, np.ndarray] | None:
+    """
+    Zero-copy (epochs, values) slices of the memory-mapped base for [from_t, to_t]. Returns None when
+    the range cannot be served from the columns alone — no columnar base yet, uncompacted tail ops
+    or archived months inside the range — and the caller should fall back to read_records().
+    """
+    cols = read_columns(marker_dir)
+    if cols is None:
+        return None
+    seg_dir = segments_dir(marker_dir)
+    if _ArchivedMonths(seg_dir).overlapping(from_t, to_t):
+        return None
+    if any(from_t <= op["t"] <= to_t for op in _fold_tail(seg_dir).values()):
+        return None
+    epochs, values = cols
+    lo = int(np.searchsorted(epochs, from_t, side="left"))
+    hi = int(np.searchsorted(epochs, to_t,   side="right"))
+    record_fs_read(epochs[lo:hi].nbytes + values[lo:hi].nbytes)  # mapped, paged in on access
+    return epochs[lo:hi], values[lo:hi]
+
+
+# ── Compaction ─────────────────────────────────────────────────────────────────
+
+def deleted_datapoints_dir(marker_dir: str) -> str:
+    """data/deleted_datapoints/{subject}/{module}/{marker} for a raw_data/{subject}/{module}/{marker} dir."""
+    module_dir, marker_id    = os.path.split(os.path.abspath(marker_dir))
+    subject_dir, module_id   = os.path.split(module_dir)
+    rawdata_root, subject_id = os.path.split(subject_dir)
+    return os.path.join(os.path.dirname(rawdata_root), "deleted_datapoints", subject_id, module_id, marker_id)
+
+
+def compact(marker_dir: str) -> int:
+    """
+    Folds the tail into a new base (and into the archive files of any archived months it touches) and
+    empties the tail. Replaying a tail over a base that already contains it gives the same result, so a
+    crash between the two steps loses nothing. Returns the live record count of the base.
+    """
+    seg_dir = segments_dir(marker_dir)
+
+    # Replay the tail in order. Besides the final op per key, note which version each tombstone
+    # deleted — the last put before it, or else the base record (archived during the merge below).
+    ops:          dict[str, dict] = {}
+    last_put:     dict[str, dict] = {}
+    base_deletes: dict[str, str]  = {}
+    dropped:      list[dict]      = []
+    for op in _iter_jsonl(_paths(seg_dir)[2]):
+        key      = op["measured_at"]
+        ops[key] = op
+        if op.get("op") == "put":
+            last_put[key] = op
+        elif key in last_put:
+            dropped.append({**_strip_op(last_put.pop(key)), "deleted_at": op.get("deleted_at")})
+        else:
+            base_deletes.setdefault(key, op.get("deleted_at"))
+
+    if not ops:
+        footer = read_footer(seg_dir)
+        if footer is not None and footer.get("columns"):
+            return footer["count"]
+
+    # Ops for archived months are folded into those months' archive files, not the base.
+    archived = _ArchivedMonths(seg_dir)
+    cold_ops: dict[str, dict[str, dict]] = {}
+    for key in [k for k, op in ops.items() if archived.covers(op["t"])]:
+        op = ops.pop(key)
+        cold_ops.setdefault(_month_of(op["t"]), {})[key] = op
+    for month, month_ops in cold_ops.items():
+        kept = []
+        for rec in _read_month(seg_dir, month):
+            key = rec["measured_at"]
+            if key in base_deletes:
+                dropped.append({**rec, "deleted_at": base_deletes[key]})
+            if key not in month_ops:
+                kept.append(rec)
+        kept.extend(_strip_op(op) for op in month_ops.values() if op.get("op") == "put")
+        _write_month(seg_dir, month, kept)
+
+    puts = sorted((_strip_op(op) for op in ops.values() if op.get("op") == "put"), key=_sort_key)
+
+    def merged():
+        i = 0
+        for rec in _iter_base(seg_dir):
+            if archived.covers(rec["t"]):
+                continue  # left over from an interrupted archive run; the archive file has it
+            key = rec["measured_at"]
+            if key in base_deletes:
+                dropped.append({**rec, "deleted_at": base_deletes[key]})
+            if key in ops:
+                continue  # replaced by a tail put (merged in below) or deleted
+            while i < len(puts) and _sort_key(puts[i]) <= _sort_key(rec):
+                yield puts[i]
+                i += 1
+            yield rec
+        yield from puts[i:]
+
+    os.makedirs(seg_dir, exist_ok=True)
+    count = _write_base(seg_dir, merged())
+
+    if dropped:
+        silo = deleted_datapoints_dir(marker_dir)
+        os.makedirs(silo, exist_ok=True)
+        ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        with open(os.path.join(silo, f"segments_{ts}.jsonl"), "a", encoding="utf-8") as f:
+            f.write("".join(_dumps(rec) for rec in dropped))
+
+    open(_paths(seg_dir)[2], "w").close()
+    return count
+
+
+def needs_compaction(marker_dir: str) -> bool:
+    """Whether the tail has outgrown its threshold (a fraction of the base, within fixed bounds)."""
+    base_path, _, tail_path = _paths(segments_dir(marker_dir))
+    tail_size = os.path.getsize(tail_path) if os.path.isfile(tail_path) else 0
+    base_size = os.path.getsize(base_path) if os.path.isfile(base_path) else 0
+    threshold = min(COMPACT_MAX_TAIL, max(COMPACT_MIN_TAIL, base_size // COMPACT_TAIL_FRACTION))
+    return tail_size > threshold
+
+
+def maybe_compact(marker_dir: str) -> bool:
+    """Compacts if needs_compaction(); call under the marker's lock. Returns whether it compacted."""
+    if not needs_compaction(marker_dir):
+        return False
+    compact(marker_dir)
+    return True
+
+
+def _merge_month(seg_dir: str, month: str, records: list[dict]) -> None:
+    """Adds base records to a month's archive; records the archive already holds keep the archived version."""
+    merged = {rec["measured_at"]: rec for rec in records}
+    merged.update((rec["measured_at"], rec) for rec in _read_month(seg_dir, month))
+    _write_month(seg_dir, month, list(merged.values()))
+
+
+def archive_marker(marker_dir: str, older_than_days: int = ARCHIVE_AFTER_DAYS) -> int:
+    """
+    Moves every whole UTC month that ended more than older_than_days ago from the base into the cold
+    tier (one gzip file per month). The tail is compacted first. Archive files are written before the
+    base is rewritten without those months, so a crash in between only leaves duplicates that reads
+    and the next compaction ignore. Returns the number of records archived.
+    """
+    seg_dir = segments_dir(marker_dir)
+    compact(marker_dir)
+    cutoff = _month_start(to_epoch_ms(datetime.now(timezone.utc) - timedelta(days=older_than_days)))
+
+    # The base is sorted by time, so the records to archive are a prefix of it.
+    moved = 0
+    month, batch = None, []
+    for rec in _iter_base(seg_dir):
+        if rec["t"] >= cutoff:
+            break
+        if _month_of(rec["t"]) != month:
+            if batch:
+                _merge_month(seg_dir, month, batch)
+            month, batch = _month_of(rec["t"]), []
+        batch.append(rec)
+        moved += 1
+    if batch:
+        _merge_month(seg_dir, month, batch)
+    if not moved:
+        return 0
+
+    archived = _ArchivedMonths(seg_dir)
+    _write_base(seg_dir, (rec for rec in _iter_base(seg_dir, cutoff) if not archived.covers(rec["t"])))
+    return moved
+
+
+# ── Migration from the legacy layout ───────────────────────────────────────────
+
+def migrate_marker(marker_dir: str, keep_legacy: bool = False) -> int:
+    """
+    Converts a legacy marker (index.json + one JSON file per datapoint) into a segment base.
+    The segments are built in a temp directory and swapped in, so a crash leaves the legacy layout
+    intact. Legacy files are then removed, or moved to legacy/ if keep_legacy is set.
+    Returns the number of migrated records (0 if there was nothing to migrate).
+    """
+    index_path = os.path.join(marker_dir, "index.json")
+    if is_segment_marker(marker_dir) or not os.path.isfile(index_path):
+        return 0
+    with open(index_path, "r", encoding="utf-8") as f:
+        index = json.load(f)
+
+    records: dict[str, dict] = {}
+    files:   list[str]       = []
+    for entry in index.get("entries", []):
+        file_path = os.path.join(marker_dir, entry["file"])
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                dp = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            logger.warning("Not migrating unreadable datapoint file '%s': %s", file_path, e)
+            continue
+        files.append(file_path)
+        records[dp["measured_at"]] = make_record(
+            dp["measured_at"], dp["value"], dp.get("unit"), dp.get("data_quality"),
+            dp.get("created_at", ""), dp.get("updated_at"),
+        )
+
+    tmp_dir = segments_dir(marker_dir) + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    count = _write_base(tmp_dir, sorted(records.values(), key=_sort_key))
+    os.replace(tmp_dir, segments_dir(marker_dir))
+
+    legacy_dir = os.path.join(marker_dir, "legacy")
+    if keep_legacy:
+        os.makedirs(legacy_dir, exist_ok=True)
+    for path in files + [index_path]:
+        if keep_legacy:
+            shutil.move(path, os.path.join(legacy_dir, os.path.basename(path)))
+        else:
+            os.remove(path)
+    return count
+
+
+# ── CLI ────────────────────────────────────────────────────────────────────────
+
+def _iter_marker_dirs(rawdata_root: str, subject_ids: list[str] | None):
+    if subject_ids is None:
+        subject_ids = sorted(os.listdir(rawdata_root)) if os.path.isdir(rawdata_root) else []
+    for subject_id in subject_ids:
+        subject_dir = os.path.join(rawdata_root, subject_id)
+        if not os.path.isdir(subject_dir):
+            continue
+        for module_id in sorted(os.listdir(subject_dir)):
+            module_dir = os.path.join(subject_dir, module_id)
+            if not os.path.isdir(module_dir):
+                continue
+            for marker_id in sorted(os.listdir(module_dir)):
+                marker_dir = os.path.join(module_dir, marker_id)
+                if os.path.isdir(marker_dir):
+                    yield marker_dir
+
+
+def main(argv: list[str] | None = None) -> None:
+    repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+    parser = argparse.ArgumentParser(description="Migrate, compact or archive per-marker segment logs.")
+    parser.add_argument("command", choices=("migrate", "compact", "archive"))
+    parser.add_argument("--raw-data", default=os.path.join(repo_root, "data", "raw_data"), help="raw_data archive root")
+    parser.add_argument("--subject",  action="append", dest="subjects",                   help="only this subject (repeatable)")
+    parser.add_argument("--keep-legacy", action="store_true", help="migrate: move legacy files to legacy/ instead of deleting them")
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS, help="archive: minimum age of archived months")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    markers, records = 0, 0
+    for marker_dir in _iter_marker_dirs(args.raw_data, args.subjects):
+        # Hold the marker's write lock so a running API or worker can't interleave writes.
+        with marker_lock(marker_dir):
+            if args.command == "migrate":
+                if is_segment_marker(marker_dir) or not os.path.isfile(os.path.join(marker_dir, "index.json")):
+                    continue
+                records += migrate_marker(marker_dir, args.keep_legacy)
+            elif args.command == "archive":
+                migrate_marker(marker_dir, args.keep_legacy)
+                if not is_segment_marker(marker_dir):
+                    continue
+                records += archive_marker(marker_dir, args.older_than_days)
+            else:
+                if not is_segment_marker(marker_dir):
+                    continue
+                records += compact(marker_dir)
+        markers += 1
+    print(json.dumps({"command": args.command, "markers": markers, "records": records}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
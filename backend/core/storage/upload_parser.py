@@ -0,0 +1,181 @@
+# Parses bulk datapoint uploads (CSV or NDJSON) into validated records for data_writer.write_marker_batch().
+#
+# Accepted columns / keys (one datapoint per row or line):
+#   measured_at   required, ISO 8601
+#   value         required, finite number
+#   module_id     optional if given as a mutation argument
+#   marker_id     optional if given as a mutation argument; the pair must be in the marker catalog
+#   unit          optional, default ""
+#   data_quality  optional, default "good"
+#   subject_id    optional; must match the subject the upload is for
+#
+# Parsing is a single pass: every row is either turned into a record or reported as (row, error).
+# That includes rows that are not valid UTF-8 and malformed CSV rows. They are reported, and parsing
+# carries on with the next row instead of aborting the upload.
+#
+# module_id and marker_id become path components and SQLite table names, so a row may only name a
+# catalogued marker (the `markers` table), and ids must be plain identifiers (letters, digits, _ and -)
+# even before the catalog is consulted — a row can never create an uncatalogued dataset or reach
+# outside the subject's directory.
+#
+# Uploads are never read into memory whole. Starlette spools multipart file parts to a temporary file
+# (in memory up to 1 MB, on disk beyond that) while receiving the request; upload_text_stream() wraps
+# that spool in an incrementally-decoding text stream, and iter_raw_rows() pulls one row at a time from
+# it, so the consumer's pace is the only thing driving reads.
+
+from __future__ import annotations
+import csv
+import io
+import json
+import math
+import re
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Container, Iterable, Iterator, Optional
+
+FORMATS = ("csv", "ndjson")
+
+MAX_DATAPOINT_BYTES = 64 * 1024  # single-datapoint JSON uploads (uploadDatapoint)
+
+_SAFE_ID = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]*")
+
+
+def detect_upload_format(filename: Optional[str], explicit: Optional[str] = None) -> str:
+    """Returns "csv" or "ndjson" from an explicit format argument or the file extension."""
+    if explicit:
+        fmt = explicit.lower()
+        if fmt == "jsonl":
+            fmt = "ndjson"
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported upload format '{explicit}'. Use one of: {', '.join(FORMATS)}.")
+        return fmt
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    raise ValueError("Cannot detect upload format from the file name; pass format explicitly (csv or ndjson).")
+
+
+@contextmanager
+def upload_text_stream(upload) -> Iterator[io.TextIOWrapper]:
+    """
+    Yields a UTF-8 text stream over an uploaded file's spooled body, decoded incrementally.
+    Invalid bytes are kept as surrogate escapes for iter_raw_rows() to report against their row.
+    The underlying file is detached (not closed) afterwards so Starlette can clean it up.
+    """
+    raw = upload.file
+    raw.seek(0)
+    stream = io.TextIOWrapper(raw, encoding="utf-8-sig", errors="surrogateescape", newline="")
+    try:
+        yield stream
+    finally:
+        stream.detach()
+
+
+_NOT_UTF8 = "Row is not valid UTF-8 text."
+
+
+def _undecodable(text: str) -> bool:
+    """True if text holds surrogate escapes, i.e. bytes that were not valid UTF-8."""
+    try:
+        text.encode("utf-8")
+    except UnicodeEncodeError:
+        return True
+    return False
+
+
+def iter_raw_rows(lines: Iterable[str], fmt: str) -> Iterator[tuple[int, Optional[dict], Optional[str]]]:
+    """Yields (row_number, raw_dict, None) or (row_number, None, error) for every non-blank input row."""
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        while True:
+            line_num = reader.reader.line_num
+            try:
+                raw = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                # DictReader.line_num only moves on success; its underlying reader's counts every line.
+                yield reader.reader.line_num, None, f"Invalid CSV: {e}."
+                if reader.reader.line_num == line_num:
+                    return  # nothing consumed; the reader cannot get past this point
+                continue
+            values = [v for v in raw.values() if isinstance(v, str)] + [k for k in raw if isinstance(k, str)]
+            if any(_undecodable(v) for v in values):
+                yield reader.line_num, None, _NOT_UTF8
+                continue
+            if not any((v or "").strip() for v in raw.values() if isinstance(v, str)):
+                continue
+            yield reader.line_num, raw, None
+
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        if _undecodable(line):
+            yield line_no, None, _NOT_UTF8
+            continue
+        try:
+            raw = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, None, f"Invalid JSON: {e.msg}."
+            continue
+        if not isinstance(raw, dict):
+            yield line_no, None, "Each line must be a JSON object."
+            continue
+        yield line_no, raw, None
+
+
+def validate_record(
+    raw:        dict,
+    subject_id: str,
+    module_id:  Optional[str],
+    marker_id:  Optional[str],
+    markers:    Optional[Container[tuple[str, str]]] = None,
+) -> dict:
+    """
+    Normalises one raw row into a writer record. markers is the catalog of (module_id, marker_id)
+    pairs a row may write to (None skips the catalog check, not the identifier check).
+    Raises ValueError with a user-facing message.
+    """
+    row_subject = str(raw.get("subject_id") or "").strip()
+    if row_subject and row_subject != subject_id:
+        raise ValueError(f"subject_id '{row_subject}' does not match '{subject_id}'.")
+
+    module = raw.get("module_id") or module_id
+    marker = raw.get("marker_id") or marker_id
+    if not module or not marker:
+        raise ValueError("module_id and marker_id are required (as columns or mutation arguments).")
+    module, marker = str(module).strip(), str(marker).strip()
+    for name, ident in (("module_id", module), ("marker_id", marker)):
+        if not _SAFE_ID.fullmatch(ident):
+            raise ValueError(f"{name} '{ident}' is not a valid id (letters, digits, '_' and '-' only).")
+    if markers is not None and (module, marker) not in markers:
+        raise ValueError(f"Unknown marker '{module}/{marker}'; add it to the module catalog first.")
+
+    measured_at = raw.get("measured_at")
+    if not measured_at or not isinstance(measured_at, str):
+        raise ValueError("Missing required field: measured_at")
+    measured_at = measured_at.strip()
+    try:
+        datetime.fromisoformat(measured_at.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"measured_at '{measured_at}' is not a valid ISO 8601 timestamp.")
+
+    if raw.get("value") in (None, ""):
+        raise ValueError("Missing required field: value")
+    try:
+        value = float(raw["value"])
+    except (TypeError, ValueError):
+        raise ValueError(f"value '{raw['value']}' is not a number.")
+    if not math.isfinite(value):
+        raise ValueError("value must be a finite number.")
+
+    return {
+        "module_id":    module,
+        "marker_id":    marker,
+        "measured_at":  measured_at,
+        "value":        value,
+        "unit":         raw.get("unit") or "",
+        "data_quality": raw.get("data_quality") or "good",
+    }
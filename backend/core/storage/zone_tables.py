@@ -0,0 +1,257 @@
+# In-memory, pre-interpolated copy of the zone_references table.
+#
+# zone_references holds, per marker, an optional generic row (sex=NULL, age=NULL) and any number of
+# sex/age-specific rows at tabulated ages. Zone boundaries for a subject are the sex-specific rows
+# linearly interpolated at the subject's age (clamped to the first/last tabulated age), or the generic
+# row when the subject's sex or age is unknown or no sex-specific rows exist.
+#
+# Instead of querying and interpolating on every lookup, ZoneTables expands each (module, marker, sex)
+# into a dense float64 array of shape (last tabulated age + 1, 3) — healthy_min, healthy_max,
+# vulnerability_margin for every integer age from 0 — so a lookup is a single array index. Ages past
+# the end use the last row; ages before the first tabulated age already hold the first row's values.
+# The whole table is small (a few hundred bytes per marker and sex), so it is loaded in full.
+#
+# ZONE_TABLES.get(conn) returns the current snapshot; it is built after the startup catalog sync. Snapshots are validated against the
+# zone_references counter in catalog_versions (bumped by triggers on every write, from any process),
+# so one indexed row read per request is all it costs to stay current — writers never need to
+# invalidate it.
+#
+# Age-aware analyses (AnalysisInput.age_aware_zones) ship a marker's age table to the worker as a
+# "zone table" — {"dob": ISO date, "rows": table.tolist()} — and boundaries_at() turns a timeseries into
+# per-datapoint boundaries with one searchsorted over the subject's birthdays plus one gather, so each
+# datapoint is normalized with the boundaries for the subject's age when it was measured.
+#
+# zone_boundary_matrix() resolves N subjects × M markers at once for cohort analyses and population
+# dashboards: one chunked subjects query, then per marker one vectorized gather per sex.
+
+from __future__ import annotations
+import threading
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+from backend.startup.database_logistics import catalog_version, get_connection
+
+BOUNDARY_FIELDS = ("healthy_min", "healthy_max", "vulnerability_margin")
+
+
+def age_in_years(dob: str | None, on: date | None = None) -> int | None:
+    """Whole years between an ISO dob and `on` (default today); None if dob is missing or malformed."""
+    if not dob:
+        return None
+    try:
+        birth = date.fromisoformat(dob[:10])
+    except ValueError:
+        return None
+    on = on or date.today()
+    return on.year - birth.year - ((on.month, on.day) < (birth.month, birth.day))
+
+
+def _birthday(birth: date, years: int) -> date:
+    try:
+        return birth.replace(year=birth.year + years)
+    except ValueError:  # 29 February in a non-leap year: age_in_years() counts it from 1 March
+        return date(birth.year + years, 3, 1)
+
+
+def age_indices(dob: str, epochs_ms: np.ndarray, n_ages: int) -> np.ndarray:
+    """
+    Row of an (n_ages, 3) age table for each timestamp: the subject's age in whole years at that
+    instant (UTC), clamped to [0, n_ages - 1]. Raises ValueError if dob is malformed.
+    """
+    birth     = date.fromisoformat(dob[:10])
+    birthdays = np.array(
+        [
+            int(datetime.combine(_birthday(birth, k), datetime.min.time(), timezone.utc).timestamp() * 1000)
+            for k in range(1, n_ages)
+        ],
+        dtype=np.int64,
+    )
+    return np.searchsorted(birthdays, np.asarray(epochs_ms, dtype=np.int64), side="right")
+
+
+def boundaries_at(zone_table: dict, epochs_ms: np.ndarray) -> np.ndarray:
+    """(len(epochs_ms), 3) healthy_min, healthy_max, vulnerability_margin per timestamp from a zone table."""
+    rows = np.asarray(zone_table["rows"], dtype=np.float64)
+    return rows[age_indices(zone_table["dob"], epochs_ms, len(rows))]
+
+
+class ZoneTables:
+    """Interpolated zone references at one catalog version. Immutable — shared between threads."""
+
+    def __init__(
+        self,
+        version: int,
+        by_age:  dict[tuple[str, str, str], np.ndarray],
+        generic: dict[tuple[str, str], tuple[float, float, float]],
+    ) -> None:
+        self.version = version
+        self.by_age  = by_age
+        self.generic = generic
+
+    def age_table(self, module_id: str, marker_id: str, sex: str | None) -> np.ndarray | None:
+        """(n_ages, 3) boundaries by integer age for one marker and sex, or None if none are tabulated."""
+        if sex is None:
+            return None
+        return self.by_age.get((module_id, marker_id, sex))
+
+    def resolve(
+        self,
+        module_id: str,
+        marker_id: str,
+        sex:       str | None,
+        age:       int | None,
+    ) -> tuple[tuple[float, float, float], bool] | None:
+        """
+        (healthy_min, healthy_max, vulnerability_margin) for a subject of this sex and age, and whether
+        the generic row was used. None if the marker has no usable zone reference at all.
+        """
+        table = self.age_table(module_id, marker_id, sex)
+        if table is not None and age is not None:
+            row = table[min(max(age, 0), len(table) - 1)]
+            return (float(row[0]), float(row[1]), float(row[2])), False
+        generic = self.generic.get((module_id, marker_id))
+        if generic is None:
+            return None
+        return generic, True
+
+
+def load_zone_tables(conn) -> ZoneTables:
+    """Reads zone_references in full and builds the dense per-age tables."""
+    version = catalog_version(conn, "zone_references")
+    rows    = conn.execute(
+        "SELECT module_id, marker_id, sex, age, healthy_min, healthy_max, vulnerability_margin "
+        "FROM zone_references ORDER BY module_id, marker_id, sex, age"
+    ).fetchall()
+
+    generic: dict[tuple[str, str], tuple[float, float, float]] = {}
+    grouped: dict[tuple[str, str, str], list] = {}
+    for r in rows:
+        values = (r["healthy_min"], r["healthy_max"], r["vulnerability_margin"])
+        if r["sex"] is None and r["age"] is None:
+            generic[(r["module_id"], r["marker_id"])] = values
+        elif r["sex"] is not None and r["age"] is not None:
+            grouped.setdefault((r["module_id"], r["marker_id"], r["sex"]), []).append((r["age"],) + values)
+
+    by_age: dict[tuple[str, str, str], np.ndarray] = {}
+    for key, tabulated in grouped.items():
+        tab   = np.array(tabulated, dtype=np.float64)
+        ages  = np.arange(max(int(tab[-1, 0]), 0) + 1, dtype=np.float64)
+        # np.interp clamps outside [first, last] tabulated age, matching the lookup rules.
+        dense = np.column_stack([np.interp(ages, tab[:, 0], tab[:, c]) for c in (1, 2, 3)])
+        dense.flags.writeable = False
+        by_age[key] = dense
+    return ZoneTables(version, by_age, generic)
+
+
+class ZoneTableCache:
+    """Holds the current ZoneTables snapshot and rebuilds it when zone_references has changed."""
+
+    def __init__(self) -> None:
+        self._tables: ZoneTables | None = None
+        self._lock    = threading.Lock()
+        self.loads    = 0
+
+    def get(self, conn) -> ZoneTables:
+        tables = self._tables
+        if tables is not None and tables.version == catalog_version(conn, "zone_references"):
+            return tables
+        with self._lock:
+            tables = self._tables
+            if tables is None or tables.version != catalog_version(conn, "zone_references"):
+                tables       = load_zone_tables(conn)
+                self._tables = tables
+                self.loads  += 1
+        return tables
+
+    def refresh(self, db_path: str) -> ZoneTables:
+        """Drops the current snapshot and builds a new one now (startup, after a sync)."""
+        self.invalidate()
+        with get_connection(db_path) as conn:
+            return self.get(conn)
+
+    def invalidate(self) -> None:
+        self._tables = None
+
+
+ZONE_TABLES = ZoneTableCache()
+
+
+# ── Cohorts ────────────────────────────────────────────────────────────────────
+
+# SQLite's default host-parameter limit is 999 on older builds.
+_SUBJECTS_PER_QUERY = 900
+
+
+def zone_boundary_matrix(
+    db_path:     str,
+    subject_ids: list[str],
+    pairs:       list[tuple[str, str]],
+    on:          date | None = None,
+) -> dict:
+    """
+    Zone boundaries for every subject × (module_id, marker_id) pair, at each subject's age on `on`
+    (default today), resolved by the same rules as ZoneTables.resolve.
+
+    Returns:
+        {
+            "subject_ids":          list[str],           # rows, in the order given
+            "markers":              list[tuple[str, str]],  # columns, in the order given
+            "healthy_min":          np.ndarray (N, M) float64,
+            "healthy_max":          np.ndarray (N, M) float64,
+            "vulnerability_margin": np.ndarray (N, M) float64,
+            "generic":              np.ndarray (N, M) bool,  # the generic row was used
+        }
+    Cells without any zone reference are NaN (and not generic).
+    Raises ValueError if a subject does not exist.
+    """
+    subject_ids = list(subject_ids)
+    pairs       = list(pairs)
+    unique      = list(dict.fromkeys(subject_ids))
+
+    demographics: dict[str, tuple[str | None, int | None]] = {}
+    with get_connection(db_path) as conn:
+        tables = ZONE_TABLES.get(conn)
+        for i in range(0, len(unique), _SUBJECTS_PER_QUERY):
+            chunk = unique[i:i + _SUBJECTS_PER_QUERY]
+            rows  = conn.execute(
+                f"SELECT subject_id, sex, dob FROM subjects WHERE subject_id IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            for r in rows:
+                demographics[r["subject_id"]] = (r["sex"], age_in_years(r["dob"], on))
+    missing = [s for s in unique if s not in demographics]
+    if missing:
+        raise ValueError(f"Subject '{missing[0]}' not found.")
+
+    n, m    = len(subject_ids), len(pairs)
+    has_age = np.array([demographics[s][1] is not None for s in subject_ids], dtype=bool)
+    ages    = np.array([max(demographics[s][1] or 0, 0) for s in subject_ids], dtype=np.int64)
+    # Subjects (rows) per sex, among those whose sex and age are both known
+    by_sex: dict[str, np.ndarray] = {}
+    for sex in {demographics[s][0] for s in unique} - {None}:
+        sexes       = np.array([demographics[s][0] == sex for s in subject_ids], dtype=bool)
+        by_sex[sex] = np.flatnonzero(sexes & has_age)
+
+    values  = np.full((3, n, m), np.nan)
+    generic = np.zeros((n, m), dtype=bool)
+    for j, (module_id, marker_id) in enumerate(pairs):
+        fallback = tables.generic.get((module_id, marker_id))
+        if fallback is not None:
+            values[:, :, j] = np.asarray(fallback)[:, None]
+            generic[:, j]   = True
+        for sex, rows in by_sex.items():
+            table = tables.by_age.get((module_id, marker_id, sex))
+            if table is None or not len(rows):
+                continue
+            values[:, rows, j] = table[np.minimum(ages[rows], len(table) - 1)].T
+            generic[rows, j]   = False
+
+    return {
+        "subject_ids":          subject_ids,
+        "markers":              pairs,
+        "healthy_min":          values[0],
+        "healthy_max":          values[1],
+        "vulnerability_margin": values[2],
+        "generic":              generic,
+    }
@@ -0,0 +1,408 @@
+# Request-scoped I/O accounting and in-process latency histograms.
+#
+# A RequestTrace collects what one unit of work (a GraphQL operation, see backend/graphql/timing.py)
+# spent on I/O:
+#   sqlite      — statements run, grouped by SQL text, with count and time (execute + fetch*()), plus commits
+#   filesystem  — raw_data files read and their size in bytes (segment logs, footers, archived months,
+#                 legacy index.json and datapoint files)
+#   resolvers   — per "Type.field" call count, total and max latency (filled in by the GraphQL extension)
+# The active trace is held in a ContextVar, so it follows the request into asyncio.to_thread workers and
+# DataLoader batches without being passed around. With no active trace the hooks reduce to a ContextVar
+# lookup.
+#
+# Every connection from get_connection() is a TimedConnection. Besides charging statements to the
+# current trace, it opens write transactions with an explicit BEGIN IMMEDIATE instead of sqlite3's
+# implicit deferred BEGIN. The database lock is then taken — and, under contention, waited for in the
+# busy handler — in that one statement, whose duration is recorded as the SQLite lock wait.
+#
+# Histograms and counters aggregate across requests (fixed buckets, optional label such as the
+# operation name). They are registered once with histogram() / counter(), read with snapshot(), and
+# rendered in the Prometheus text format by render_prometheus() (/metrics on the API, the worker
+# exporter in backend/workers/settings.py). Series are never removed, so label values must come from
+# a bounded set: GraphQL operation names go through OPERATION_LABELS, which only knows the names of
+# registered persisted queries (up to ASHDT_METRIC_OPERATIONS of them) plus any listed in
+# ASHDT_METRIC_OPERATION_NAMES; every other operation is counted as "other". cache_samples() and
+# queue_depth_sample() build the scrape-time series both exporters add; they live here so the workers
+# can export them without importing the GraphQL stack.
+
+from __future__ import annotations
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+# ── Request traces ─────────────────────────────────────────────────────────────
+
+class RequestTrace:
+    """I/O counters of one request. Updated from the event loop and worker threads alike."""
+
+    def __init__(self) -> None:
+        self.sql_queries  = 0
+        self.sql_ms       = 0.0
+        self.statements:  dict[str, list] = {}    # sql → [count, ms]
+        self.fs_reads     = 0
+        self.fs_bytes     = 0
+        self.resolvers:   dict[str, list] = {}    # "Type.field" → [count, total ms, max ms]
+        self._lock        = threading.Lock()
+
+    def add_sql(self, sql: str, ms: float, executed: bool = True) -> None:
+        """Adds time spent on one statement; executed=False for time spent fetching its rows."""
+        key = " ".join(sql.split())[:200]
+        with self._lock:
+            stat = self.statements.setdefault(key, [0, 0.0])
+            if executed:
+                stat[0]          += 1
+                self.sql_queries += 1
+            stat[1]     += ms
+            self.sql_ms += ms
+
+    def add_fs_read(self, nbytes: int) -> None:
+        with self._lock:
+            self.fs_reads += 1
+            self.fs_bytes += nbytes
+
+    def add_resolver(self, field: str, ms: float) -> None:
+        with self._lock:
+            stat = self.resolvers.get(field)
+            if stat is None:
+                self.resolvers[field] = [1, ms, ms]
+            else:
+                stat[0] += 1
+                stat[1] += ms
+                stat[2]  = max(stat[2], ms)
+
+
+_CURRENT: ContextVar[RequestTrace | None] = ContextVar("ashdt_request_trace", default=None)
+
+
+def current_trace() -> RequestTrace | None:
+    return _CURRENT.get()
+
+
+@contextmanager
+def trace_request() -> Iterator[RequestTrace]:
+    """Makes a fresh RequestTrace current for the duration of the block."""
+    trace = RequestTrace()
+    token = _CURRENT.set(trace)
+    try:
+        yield trace
+    finally:
+        _CURRENT.reset(token)
+
+
+def record_fs_read(nbytes: int) -> None:
+    """Counts one file read of nbytes against the current trace, if any."""
+    trace = _CURRENT.get()
+    if trace is not None:
+        trace.add_fs_read(nbytes)
+
+
+# ── Timed SQLite connections ───────────────────────────────────────────────────
+
+class TimedCursor(sqlite3.Cursor):
+    """
+    Cursor of a TimedConnection: charges execute and fetch time to the current trace, under the
+    statement's SQL, and lets the connection open write transactions.
+    """
+
+    _sql = ""
+
+    def execute(self, sql, parameters=(), /):
+        self.connection._begin_write(sql)
+        self._sql = sql
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _charge(sql, start)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        self.connection._begin_write(sql)
+        self._sql = sql
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _charge(sql, start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            _charge(self._sql, start, executed=False)
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            _charge(self._sql, start, executed=False)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            _charge(self._sql, start, executed=False)
+
+
+_WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection whose statements, commits and write-lock waits are timed (see get_connection)."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=(), /):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def _begin_write(self, sql: str) -> None:
+        # Same transaction the sqlite3 module would open implicitly, but taking the write lock up
+        # front, so the time spent waiting for it can be measured on its own.
+        if self.in_transaction or self.isolation_level is None:
+            return
+        if not sql.lstrip()[:7].upper().startswith(_WRITE_STATEMENTS):
+            return
+        start = time.perf_counter()
+        super().execute("BEGIN IMMEDIATE")
+        _charge("BEGIN IMMEDIATE", start)
+        SQLITE_LOCK_WAIT_MS.observe((time.perf_counter() - start) * 1000)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            _charge("COMMIT", start)
+
+
+def _charge(sql: str, start: float, executed: bool = True) -> None:
+    trace = _CURRENT.get()
+    if trace is not None:
+        trace.add_sql(sql, (time.perf_counter() - start) * 1000, executed)
+
+
+# ── Histograms ─────────────────────────────────────────────────────────────────
+
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+LOCK_BUCKETS_MS    = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000)
+JOB_BUCKETS_MS     = (10, 50, 100, 500, 1000, 5000, 10000, 30000, 60000, 300000, 600000)
+COUNT_BUCKETS      = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+ROWS_BUCKETS       = (0, 10, 100, 1000, 10000, 100000, 1000000)
+BYTES_BUCKETS      = (0, 1024, 16384, 131072, 1048576, 8388608, 67108864)
+
+
+class Histogram:
+    """Thread-safe fixed-bucket histogram, one series per label value."""
+
+    def __init__(self, name: str, description: str, buckets: tuple, label: str | None = None) -> None:
+        self.name        = name
+        self.description = description
+        self.buckets     = tuple(buckets)
+        self.label       = label
+        self._series:    dict[str, list] = {}    # label value → [bucket counts..., +Inf count, sum]
+        self._lock       = threading.Lock()
+
+    def observe(self, value: float, label: str = "") -> None:
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def snapshot(self) -> dict:
+        """{label value: {"buckets": [[upper bound, cumulative count], ..., ["+Inf", count]], "count", "sum"}}."""
+        with self._lock:
+            result = {}
+            for label, series in self._series.items():
+                cumulative, buckets = 0, []
+                for bound, n in zip(self.buckets + ("+Inf",), series[:-1]):
+                    cumulative += n
+                    buckets.append([bound, cumulative])
+                result[label] = {"buckets": buckets, "count": cumulative, "sum": series[-1]}
+            return result
+
+
+class Counter:
+    """Thread-safe monotonically increasing counter, one series per label value."""
+
+    def __init__(self, name: str, description: str, label: str | None = None) -> None:
+        self.name        = name
+        self.description = description
+        self.label       = label
+        self._series:    dict[str, float] = {}
+        self._lock       = threading.Lock()
+
+    def inc(self, label: str = "", amount: float = 1) -> None:
+        with self._lock:
+            self._series[label] = self._series.get(label, 0) + amount
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            return dict(self._series)
+
+
+HISTOGRAMS: dict[str, Histogram] = {}
+COUNTERS:   dict[str, Counter]   = {}
+_registry_lock = threading.Lock()
+
+
+def histogram(name: str, description: str, buckets: tuple = LATENCY_BUCKETS_MS, label: str | None = None) -> Histogram:
+    """The histogram registered under name, created on first use."""
+    with _registry_lock:
+        hist = HISTOGRAMS.get(name)
+        if hist is None:
+            hist = HISTOGRAMS[name] = Histogram(name, description, buckets, label)
+        return hist
+
+
+def counter(name: str, description: str, label: str | None = None) -> Counter:
+    """The counter registered under name, created on first use."""
+    with _registry_lock:
+        count = COUNTERS.get(name)
+        if count is None:
+            count = COUNTERS[name] = Counter(name, description, label)
+        return count
+
+
+def snapshot() -> dict:
+    """Every registered histogram and counter: {name: {"description", "label", "series": ...snapshot()}}."""
+    with _registry_lock:
+        metrics = [*HISTOGRAMS.values(), *COUNTERS.values()]
+    return {
+        m.name: {"description": m.description, "label": m.label, "series": m.snapshot()}
+        for m in metrics
+    }
+
+
+# ── Operation labels ───────────────────────────────────────────────────────────
+
+OPERATION_LABEL_LIMIT = int(os.environ.get("ASHDT_METRIC_OPERATIONS", "200"))   # names learned from persisted queries
+OTHER_OPERATION       = "other"
+
+
+class OperationLabels:
+    """Bounded allow-list of operation names that get their own metric series."""
+
+    def __init__(self, limit: int = OPERATION_LABEL_LIMIT, names: tuple[str, ...] = ()) -> None:
+        self.limit   = limit
+        self._fixed  = frozenset(names) | {"anonymous"}
+        self._names: set[str] = set()
+        self._lock   = threading.Lock()
+
+    def allow(self, name: str) -> None:
+        """Gives name its own series, unless `limit` names have been allowed already."""
+        with self._lock:
+            if name not in self._fixed and len(self._names) < self.limit:
+                self._names.add(name)
+
+    def label(self, name: str | None) -> str:
+        """The label to record an operation under: its name if allowed, "anonymous" or "other"."""
+        if name is None:
+            return "anonymous"
+        if name in self._fixed or name in self._names:
+            return name
+        return OTHER_OPERATION
+
+
+OPERATION_LABELS = OperationLabels(names=tuple(
+    n.strip() for n in os.environ.get("ASHDT_METRIC_OPERATION_NAMES", "").split(",") if n.strip()
+))
+
+
+SQLITE_LOCK_WAIT_MS = histogram("sqlite_lock_wait_ms", "Time to acquire the SQLite write lock (ms)", LOCK_BUCKETS_MS)
+
+
+# ── Prometheus exposition ──────────────────────────────────────────────────────
+
+METRIC_PREFIX = "ashdt_"
+CONTENT_TYPE  = "text/plain; version=0.0.4; charset=utf-8"
+
+# An extra metric for render_prometheus(): (name, "gauge" | "counter", description, [(labels, value), ...])
+Sample = tuple[str, str, str, list[tuple[dict[str, str], float]]]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs: dict[str, str]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs.items()) + "}"
+
+
+def _number(value) -> str:
+    return value if isinstance(value, str) else repr(float(value))
+
+
+def render_prometheus(samples: list[Sample] = ()) -> str:
+    """Every registered histogram and counter, plus `samples`, in the Prometheus text format (0.0.4)."""
+    with _registry_lock:
+        hists  = list(HISTOGRAMS.values())
+        counts = list(COUNTERS.values())
+    lines: list[str] = []
+    for h in hists:
+        name = METRIC_PREFIX + h.name
+        lines += [f"# HELP {name} {h.description}", f"# TYPE {name} histogram"]
+        for label, series in sorted(h.snapshot().items()):
+            base = {h.label: label} if h.label else {}
+            for bound, cumulative in series["buckets"]:
+                lines.append(f"{name}_bucket{_labels({**base, 'le': _number(bound)})} {cumulative}")
+            lines.append(f"{name}_sum{_labels(base)} {_number(series['sum'])}")
+            lines.append(f"{name}_count{_labels(base)} {series['count']}")
+    for c in counts:
+        name = METRIC_PREFIX + c.name
+        lines += [f"# HELP {name} {c.description}", f"# TYPE {name} counter"]
+        for label, value in sorted(c.snapshot().items()):
+            lines.append(f"{name}{_labels({c.label: label} if c.label else {})} {_number(value)}")
+    for metric, kind, description, values in samples:
+        name = METRIC_PREFIX + metric
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+        lines += [f"{name}{_labels(labels)} {_number(value)}" for labels, value in values]
+    return "\n".join(lines) + "\n"
+
+
+def cache_samples(caches: dict[str, dict]) -> list[Sample]:
+    """Hit / miss counters and, where known, entry counts and sizes of caches given as {name: stats()}."""
+    def series(key: str) -> list:
+        return [({"cache": name}, stats[key]) for name, stats in caches.items() if key in stats]
+
+    return [
+        ("cache_hits_total",   "counter", "Cache lookups answered from the cache",  series("hits")),
+        ("cache_misses_total", "counter", "Cache lookups that had to load",         series("misses")),
+        ("cache_entries",      "gauge",   "Entries currently cached",               series("entries")),
+        ("cache_bytes",        "gauge",   "Estimated bytes currently cached",       series("bytes")),
+    ]
+
+
+async def queue_depth_sample(redis) -> list[Sample]:
+    """The ARQ queue length, or nothing if Redis is unavailable."""
+    if redis is None:
+        return []
+    from arq.constants import default_queue_name    # only the exporters need arq
+
+    try:
+        depth = await redis.zcard(default_queue_name)
+    except Exception as exc:
+        logger.warning("Could not read ARQ queue depth: %s", exc)
+        return []
+    return [("arq_queue_depth", "gauge", "Jobs waiting in the ARQ queue", [({}, depth)])]
@@ -1,6 +1,6 @@
 from __future__ import annotations
+import asyncio
 from datetime import datetime, timezone
-from io import BytesIO
 from uuid import uuid4
 
 import strawberry
@@ -15,16 +15,22 @@ from backend.graphql.analysis.types import (
     PCAResult,
 )
 from backend.core.storage.markerset_reader import resolve_markerset_markers
+from backend.core.storage.upload_parser import upload_text_stream
 from backend.core.analysis.pca_csv import compute_pca as _compute_pca
 
 
+def _compute_pca_from_upload(file: Upload) -> dict:
+    # pandas reads straight from the spooled upload; the raw bytes are never copied into memory.
+    with upload_text_stream(file) as stream:
+        return _compute_pca(stream)
+
+
 @strawberry.type
 class AnalysisMutations:
 
     @strawberry.mutation
     async def compute_pca(self, file: Upload) -> PCAResult:
-        contents = await file.read()
-        result = _compute_pca(BytesIO(contents))
+        result = await asyncio.to_thread(_compute_pca_from_upload, file)
         return PCAResult(
             components=result["components"],
             variance=result["variance"],
@@ -78,13 +84,30 @@ class AnalysisMutations:
 
         if has_markerset:
             # Resolve markerset instance → fully-configured markers with DB zone boundaries
+            await ctx.require_catalog()
             try:
                 resolved_markers = resolve_markerset_markers(
-                    ctx.db_path, input.subject_id, instance_id=input.markerset_id
+                    ctx.db_path, input.subject_id, instance_id=input.markerset_id,
+                    age_aware=input.age_aware_zones,
                 )
             except ValueError as e:
                 raise GraphQLError(str(e))
             use_composite = True
+        elif input.age_aware_zones:
+            # Ad-hoc marker_refs with per-datapoint DB zone boundaries
+            await ctx.require_catalog()
+            try:
+                resolved_markers = resolve_markerset_markers(
+                    ctx.db_path, input.subject_id,
+                    raw_marker_refs=[
+                        {"module_id": m.module_id, "marker_id": m.marker_id}
+                        for m in input.marker_refs  # type: ignore[union-attr]
+                    ],
+                    age_aware=True,
+                )
+            except ValueError as e:
+                raise GraphQLError(str(e))
+            use_composite = len(resolved_markers) > 1
         else:
             # Ad-hoc marker_refs
             resolved_markers = [
@@ -92,6 +115,10 @@ class AnalysisMutations:
                 for m in input.marker_refs  # type: ignore[union-attr]
             ]
             use_composite = len(resolved_markers) > 1
+            # Single-marker direct mode normalizes with these bounds (see trajectory_computer); catch a
+            # zero-width range here instead of failing the job. DB-resolved ranges are checked in the worker.
+            if not use_composite and params.healthy_min == params.healthy_max:
+                raise GraphQLError("healthy_min and healthy_max must differ.")
 
         await ctx.redis_pool.enqueue_job(
             "run_trajectory_analysis",
@@ -1,12 +1,27 @@
 from __future__ import annotations
+from typing import Optional
 
 import strawberry
 
 from backend.startup.database_logistics import get_connection
 from backend.graphql.context import AppContext
+from backend.graphql.pagination import Connection, build_connection, decode_cursor, page_size
 from backend.graphql.analysis.types import AnalysisJob, AnalysisMethodInfo, JobStatus
 
 
+def _report_job(r) -> AnalysisJob:
+    # Historical reports are always COMPLETED. Full result data is not stored
+    # in SQLite — load the report JSON from the filesystem if needed.
+    return AnalysisJob(
+        job_id        = r["report_id"],
+        status        = JobStatus.COMPLETED,
+        progress      = 1.0,
+        created_at    = r["requested_at"],
+        result        = None,
+        error_message = None,
+    )
+
+
 @strawberry.type
 class AnalysisQueries:
 
@@ -45,16 +60,30 @@ class AnalysisQueries:
                 "WHERE subject_id = ? ORDER BY requested_at DESC",
                 (subject_id,),
             ).fetchall()
-        # Historical reports are always COMPLETED. Full result data is not stored
-        # in SQLite — load the report JSON from the filesystem if needed.
-        return [
-            AnalysisJob(
-                job_id        = r["report_id"],
-                status        = JobStatus.COMPLETED,
-                progress      = 1.0,
-                created_at    = r["requested_at"],
-                result        = None,
-                error_message = None,
-            )
-            for r in rows
-        ]
+        return [_report_job(r) for r in rows]
+
+    @strawberry.field(
+        description="Page through a subject's analysis reports, newest first (keyset cursor pagination)."
+    )
+    def analysis_reports_connection(
+        self,
+        info: strawberry.types.Info[AppContext, None],
+        subject_id: str,
+        first: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> Connection[AnalysisJob]:
+        ctx    = info.context
+        size   = page_size(first)
+        query  = "SELECT report_id, requested_at FROM timegraph_reports WHERE subject_id = ?"
+        params: list = [subject_id]
+        if after is not None:
+            # report_id breaks ties between reports requested at the same instant.
+            query += " AND (requested_at, report_id) < (?, ?)"
+            params.extend(decode_cursor(after, 2))
+        query += " ORDER BY requested_at DESC, report_id DESC LIMIT ?"
+        params.append(size + 1)
+        with get_connection(ctx.db_path) as conn:
+            rows = [dict(r) for r in conn.execute(query, params).fetchall()]
+        return build_connection(
+            rows, size, after, lambda r: [r["requested_at"], r["report_id"]], _report_job,
+        )
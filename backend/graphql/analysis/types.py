@@ -146,6 +146,11 @@ class AnalysisInput:
         markerset_id  — use a saved markerset instance (composite mode; zone boundaries from DB)
         marker_refs   — ad-hoc single or multi-marker (single-marker uses trajectory_params
                         zone boundaries; multi-marker uses DB zone boundaries per marker)
+
+    age_aware_zones normalizes each datapoint with the DB zone boundaries for the subject's age
+    at its measured_at instead of their age today (also for single-marker marker_refs, which then
+    ignore trajectory_params' boundaries). Markers without sex/age-specific references keep one
+    fixed set of boundaries.
     """
     subject_id:        str
     method:            AnalysisMethod
@@ -153,6 +158,7 @@ class AnalysisInput:
     markerset_id:      Optional[str]                   = None
     marker_refs:       Optional[list[MarkerRefInput]]  = None
     trajectory_params: Optional[TrajectoryParamsInput] = None
+    age_aware_zones:   bool                            = False
 
 
 # ── Helper: build TrajectoryReport from worker result payload ──────────────────
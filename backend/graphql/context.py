@@ -3,8 +3,12 @@
 # pass through here — both FastAPI Request and WebSocket expose .app.state.
 
 from __future__ import annotations
+from strawberry.exceptions import GraphQLError
 from strawberry.fastapi import BaseContext
 
+from backend.graphql.dataloaders import Loaders
+from backend.startup.sync_state import READY, FAILED
+
 
 class AppContext(BaseContext):
     """
@@ -47,6 +51,57 @@ class AppContext(BaseContext):
         """ARQ redis pool for job enqueueing. None if Redis is not available."""
         return getattr(self.request.app.state, "redis_pool", None)
 
+    @property
+    def ingest_batcher(self):
+        """Group-commit queue for addDatapoint. None unless ASHDT_GROUP_COMMIT is enabled."""
+        return getattr(self.request.app.state, "ingest_batcher", None)
+
+    @property
+    def loaders(self) -> Loaders:
+        """This request's DataLoaders (backend/graphql/dataloaders.py), created on first use."""
+        loaders = getattr(self, "_loaders", None)
+        if loaders is None:
+            loaders = self._loaders = Loaders(self.db_path)
+        return loaders
+
+    @property
+    def sync_state(self):
+        """Background startup sync progress. None when the app was started without it."""
+        return getattr(self.request.app.state, "sync_state", None)
+
+    # ── Startup sync gating ────────────────────────────────────────────────────
+    # Resolvers that read the SQLite mirror await one of these before querying. They wait
+    # briefly for the background sync and otherwise raise a retryable GraphQL error.
+
+    async def require_catalog(self) -> None:
+        """Waits until the subjects / zone_references / modules tables have been synced."""
+        state = self.sync_state
+        if state is None or state.catalog_ready:
+            return
+        if not await state.wait_for_catalog():
+            raise _sync_error("Server is still starting up; subject catalog is not synced yet.", state)
+
+    async def require_subject(self, subject_id: str) -> None:
+        """Waits until subject_id's datapoints have been mirrored into SQLite."""
+        state = self.sync_state
+        if state is None or state.subject_status(subject_id) == READY:
+            return
+        status = await state.wait_for_subject(subject_id)
+        if status == FAILED:
+            raise GraphQLError(
+                f"Startup sync failed for subject '{subject_id}'. Check the server logs.",
+                extensions={"code": "SYNC_FAILED", "retryable": False},
+            )
+        if status != READY:
+            raise _sync_error(f"Subject '{subject_id}' is still being synced.", state)
+
+
+def _sync_error(message: str, state) -> GraphQLError:
+    return GraphQLError(
+        f"{message} Please retry shortly.",
+        extensions={"code": "SYNC_IN_PROGRESS", "retryable": True, "sync_status": state.status},
+    )
+
 
 async def get_context() -> AppContext:
     return AppContext()
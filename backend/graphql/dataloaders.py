@@ -2,17 +2,30 @@
 # into a single database query per request.
 #
 # Usage in resolvers:
-#   subjects = await info.context.subject_loader.load_many(subject_ids)
+#   subjects = await info.context.loaders.subject.load_many(subject_ids)
 #
-# Each DataLoader is instantiated per-request (in AppContext) so batching is scoped
-# to a single request — never leaks data between requests.
+# Each DataLoader is instantiated per-request (Loaders, created lazily by AppContext.loaders) so
+# batching and caching are scoped to a single request — never leaks data between requests.
+# Nested fields (Subject.datasets, Subject.zoneReference, Dataset.marker, MarkersetInstance.subject /
+# .template) load through these, so a query fanning out over many subjects or modules issues one SQL
+# statement per entity type rather than one per field. Batches are capped at MAX_BATCH_SIZE keys to
+# stay under SQLite's host-parameter limit.
 
 from __future__ import annotations
 from typing import Optional
 from strawberry.dataloader import DataLoader
+from backend.core.storage.zone_tables import ZONE_TABLES, age_in_years
 from backend.startup.database_logistics import get_connection
-from backend.graphql.subjects.types import Subject
+from backend.graphql.subjects.types import Subject, ZoneReference
 from backend.graphql.modules.types import Marker
+from backend.graphql.datapoints.types import Dataset
+from backend.graphql.markersets.types import MarkersetTemplate
+
+MAX_BATCH_SIZE = 500
+
+
+def _placeholders(keys: list) -> str:
+    return ",".join("?" * len(keys))
 
 
 # ── Subject loader ─────────────────────────────────────────────────────────────
@@ -23,16 +36,15 @@ def make_subject_loader(db_path: str) -> DataLoader:
     async def load_subjects(subject_ids: list[str]) -> list[Optional[Subject]]:
         if not subject_ids:
             return []
-        placeholders = ",".join("?" * len(subject_ids))
         with get_connection(db_path) as conn:
             rows = conn.execute(
-                f"SELECT * FROM subjects WHERE subject_id IN ({placeholders})",
+                f"SELECT * FROM subjects WHERE subject_id IN ({_placeholders(subject_ids)})",
                 list(subject_ids),
             ).fetchall()
         row_map = {r["subject_id"]: Subject.from_row(dict(r)) for r in rows}
         return [row_map.get(sid) for sid in subject_ids]
 
-    return DataLoader(load_fn=load_subjects)
+    return DataLoader(load_fn=load_subjects, max_batch_size=MAX_BATCH_SIZE)
 
 
 # ── Marker loader ──────────────────────────────────────────────────────────────
@@ -43,10 +55,9 @@ def make_marker_loader(db_path: str) -> DataLoader:
     async def load_markers(module_ids: list[str]) -> list[list[Marker]]:
         if not module_ids:
             return [[] for _ in module_ids]
-        placeholders = ",".join("?" * len(module_ids))
         with get_connection(db_path) as conn:
             rows = conn.execute(
-                f"SELECT * FROM markers WHERE module_id IN ({placeholders}) ORDER BY module_id, marker_id",
+                f"SELECT * FROM markers WHERE module_id IN ({_placeholders(module_ids)}) ORDER BY module_id, marker_id",
                 list(module_ids),
             ).fetchall()
         grouped: dict[str, list[Marker]] = {mid: [] for mid in module_ids}
@@ -56,4 +67,101 @@ def make_marker_loader(db_path: str) -> DataLoader:
                 grouped[mid].append(Marker.from_dict(dict(row)))
         return [grouped[mid] for mid in module_ids]
 
-    return DataLoader(load_fn=load_markers)
+    return DataLoader(load_fn=load_markers, max_batch_size=MAX_BATCH_SIZE)
+
+
+# ── Zone reference loader ──────────────────────────────────────────────────────
+
+def make_zone_reference_loader(db_path: str) -> DataLoader:
+    """
+    Batch-loads ZoneReference objects by (subject_id, module_id, marker_id): one subjects query for
+    every subject in the batch, boundaries from the in-memory zone tables. None if the subject or
+    the marker's zone reference does not exist.
+    """
+
+    async def load_zone_references(
+        keys: list[tuple[str, str, str]],
+    ) -> list[Optional[ZoneReference]]:
+        subject_ids = list(dict.fromkeys(k[0] for k in keys))
+        with get_connection(db_path) as conn:
+            rows = conn.execute(
+                f"SELECT subject_id, sex, dob FROM subjects WHERE subject_id IN ({_placeholders(subject_ids)})",
+                subject_ids,
+            ).fetchall() if subject_ids else []
+            tables = ZONE_TABLES.get(conn)
+        demographics = {r["subject_id"]: (r["sex"], age_in_years(r["dob"])) for r in rows}
+
+        result: list[Optional[ZoneReference]] = []
+        for subject_id, module_id, marker_id in keys:
+            if subject_id not in demographics:
+                result.append(None)
+                continue
+            resolved = tables.resolve(module_id, marker_id, *demographics[subject_id])
+            if resolved is None:
+                result.append(None)
+                continue
+            (h_min, h_max, margin), is_generic = resolved
+            result.append(ZoneReference(
+                healthy_min          = h_min,
+                healthy_max          = h_max,
+                vulnerability_margin = margin,
+                note                 = "No sex/age-specific reference data available; using generic values." if is_generic else None,
+            ))
+        return result
+
+    return DataLoader(load_fn=load_zone_references, max_batch_size=MAX_BATCH_SIZE)
+
+
+# ── Dataset loader ─────────────────────────────────────────────────────────────
+
+def make_dataset_loader(db_path: str) -> DataLoader:
+    """Batch-loads a subject's Dataset summaries (dataset_stats rows) by subject_id."""
+
+    async def load_datasets(subject_ids: list[str]) -> list[list[Dataset]]:
+        if not subject_ids:
+            return []
+        with get_connection(db_path) as conn:
+            rows = conn.execute(
+                f"SELECT * FROM dataset_stats WHERE subject_id IN ({_placeholders(subject_ids)}) "
+                "ORDER BY subject_id, module_id, marker_id",
+                list(subject_ids),
+            ).fetchall()
+        grouped: dict[str, list[Dataset]] = {sid: [] for sid in subject_ids}
+        for row in rows:
+            grouped[row["subject_id"]].append(Dataset.from_row(dict(row)))
+        return [grouped[sid] for sid in subject_ids]
+
+    return DataLoader(load_fn=load_datasets, max_batch_size=MAX_BATCH_SIZE)
+
+
+# ── Markerset template loader ──────────────────────────────────────────────────
+
+def make_markerset_template_loader(db_path: str) -> DataLoader:
+    """Batch-loads MarkersetTemplate objects by markerset_id."""
+
+    async def load_templates(markerset_ids: list[str]) -> list[Optional[MarkersetTemplate]]:
+        if not markerset_ids:
+            return []
+        with get_connection(db_path) as conn:
+            rows = conn.execute(
+                "SELECT markerset_id, name, description, markers_json, created_at "
+                f"FROM markerset_templates WHERE markerset_id IN ({_placeholders(markerset_ids)})",
+                list(markerset_ids),
+            ).fetchall()
+        row_map = {r["markerset_id"]: MarkersetTemplate.from_row(dict(r)) for r in rows}
+        return [row_map.get(mid) for mid in markerset_ids]
+
+    return DataLoader(load_fn=load_templates, max_batch_size=MAX_BATCH_SIZE)
+
+
+# ── Registry ───────────────────────────────────────────────────────────────────
+
+class Loaders:
+    """All DataLoaders of one request."""
+
+    def __init__(self, db_path: str) -> None:
+        self.subject            = make_subject_loader(db_path)
+        self.markers_by_module  = make_marker_loader(db_path)
+        self.zone_reference     = make_zone_reference_loader(db_path)
+        self.datasets           = make_dataset_loader(db_path)
+        self.markerset_template = make_markerset_template_loader(db_path)
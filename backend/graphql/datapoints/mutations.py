@@ -1,8 +1,11 @@
 from __future__ import annotations
+import asyncio
 import json
+import logging
 import os
 import shutil
 from datetime import datetime, timezone
+from typing import Optional
 
 import strawberry
 from strawberry.exceptions import GraphQLError
@@ -12,21 +15,235 @@ from backend.startup.database_logistics import (
     get_connection,
     _datapoint_table,
     _ensure_datapoint_table,
+    add_dataset_stats,
+    refresh_dataset_stats,
+    delete_dataset_stats,
+    add_datapoint_rollups,
+    refresh_datapoint_rollups,
+    delete_datapoint_rollups,
+)
+from backend.core.storage.data_writer import (
+    add_datapoint,
+    update_datapoint,
+    delete_datapoint,
+    write_marker_batch,
+)
+from backend.core.storage.index_cache import INDEX_CACHE
+from backend.core.storage.marker_lock import marker_lock
+from backend.core.storage.upload_parser import (
+    MAX_DATAPOINT_BYTES,
+    detect_upload_format,
+    iter_raw_rows,
+    upload_text_stream,
+    validate_record,
 )
 from backend.graphql.context import AppContext
-from backend.graphql.datapoints.types import Datapoint, DatapointInput
+from backend.graphql.datapoints.types import (
+    Datapoint, DatapointInput, BulkRowError, BulkUploadResult,
+)
 
+logger = logging.getLogger(__name__)
+
+MAX_REPORTED_ERRORS = 1000
+FLUSH_RECORDS       = 20_000  # buffered records before bulk ingest writes them out
+
+
+class UploadInterrupted(Exception):
+    """A bulk upload failed part-way; what was written before the failure stays stored."""
+
+    def __init__(self, inserted: int, markers: list[str], cause: Exception) -> None:
+        super().__init__(str(cause))
+        self.inserted = inserted
+        self.markers  = markers
+        self.cause    = cause
+
+
+def _ingest_upload(
+    db_path:      str,
+    rawdata_root: str,
+    subject_id:   str,
+    file:         Upload,
+    fmt:          str,
+    module_id:    Optional[str],
+    marker_id:    Optional[str],
+) -> tuple[int, list[str], list[BulkRowError], int]:
+    """
+    Streams rows out of an uploaded file and writes them per marker. Runs in a worker thread.
+    At most FLUSH_RECORDS parsed records are held at once; every flush writes each buffered
+    marker once and commits its SQLite rows, so the mirror always matches what was appended.
+    Unparseable rows (invalid CSV, invalid UTF-8, bad values, markers missing from the catalog)
+    are reported per row.
+
+    Anything else that goes wrong part-way (I/O or database errors) does not undo earlier
+    flushes: the records already appended to the segment logs are kept, their SQLite rows are
+    committed as far as possible, and UploadInterrupted reports how many datapoints were stored.
+    Returns (inserted, markers, errors[:MAX_REPORTED_ERRORS], rejected_count).
+    """
+    errors:   list[BulkRowError]          = []
+    rejected: int                         = 0
+    inserted: int                         = 0
+    markers:  list[str]                   = []
+    groups:   dict[tuple[str, str], list] = {}
+    buffered: int                         = 0
+
+    def reject(row: int, message: str) -> None:
+        nonlocal rejected
+        rejected += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append(BulkRowError(row=row, message=message))
+
+    def flush(conn) -> None:
+        nonlocal inserted, buffered
+        while groups:
+            (mod, mk), records = groups.popitem()
+            written, dupes = write_marker_batch(conn, rawdata_root, subject_id, mod, mk, records)
+            inserted += len(written)
+            if written and f"{mod}/{mk}" not in markers:
+                markers.append(f"{mod}/{mk}")
+            for rec, reason in dupes:
+                reject(rec["row"], reason)
+        buffered = 0
+        conn.commit()
+
+    with get_connection(db_path) as conn, upload_text_stream(file) as stream:
+        catalog = {(r["module_id"], r["marker_id"]) for r in conn.execute("SELECT module_id, marker_id FROM markers")}
+        try:
+            for row, raw, error in iter_raw_rows(stream, fmt):
+                if error is None:
+                    try:
+                        rec = validate_record(raw, subject_id, module_id, marker_id, catalog)
+                    except ValueError as e:
+                        error = str(e)
+                if error is not None:
+                    reject(row, error)
+                    continue
+                rec["row"] = row
+                groups.setdefault((rec["module_id"], rec["marker_id"]), []).append(rec)
+                buffered += 1
+                if buffered >= FLUSH_RECORDS:
+                    flush(conn)
+            flush(conn)
+        except Exception as exc:
+            # Markers appended in the failed flush have their rows in the open transaction.
+            try:
+                conn.commit()
+            except Exception:
+                logger.exception("Could not commit the SQLite rows of an interrupted upload")
+            raise UploadInterrupted(inserted, markers, exc) from exc
+
+    errors.sort(key=lambda e: e.row)
+    return inserted, markers, errors, rejected
+
+
+# ── Single-datapoint writes ───────────────────────────────────────────────────
+# Each helper writes the file (under the marker's lock, with fsync and possibly compaction) and then
+# mirrors the change into SQLite. They block, so resolvers run them with asyncio.to_thread like
+# _ingest_upload; ValueErrors from data_writer propagate and become GraphQL errors.
+
+def _store_datapoint(
+    db_path:      str,
+    rawdata_root: str,
+    subject_id:   str,
+    module_id:    str,
+    marker_id:    str,
+    rec:          dict,
+    raw_content:  Optional[bytes] = None,
+) -> None:
+    created_at = add_datapoint(rawdata_root, subject_id, module_id, marker_id, rec, raw_content=raw_content)
+
+    table = _datapoint_table(subject_id, module_id, marker_id)
+    with get_connection(db_path) as conn:
+        _ensure_datapoint_table(conn, table)
+        conn.execute(
+            f'INSERT INTO "{table}" (measured_at, value, unit, data_quality, created_at) '
+            f'VALUES (?, ?, ?, ?, ?) ON CONFLICT(measured_at) DO UPDATE SET '
+            f'value=excluded.value, unit=excluded.unit, data_quality=excluded.data_quality',
+            (rec["measured_at"], rec["value"], rec["unit"], rec["data_quality"], created_at),
+        )
+        add_dataset_stats(conn, subject_id, module_id, marker_id, [(rec["measured_at"], rec["value"])])
+        add_datapoint_rollups(conn, subject_id, module_id, marker_id, [(rec["measured_at"], rec["value"])])
+        conn.commit()
+
+
+def _update_stored_datapoint(
+    db_path:              str,
+    rawdata_root:         str,
+    subject_id:           str,
+    module_id:            str,
+    marker_id:            str,
+    original_measured_at: str,
+    rec:                  dict,
+) -> None:
+    update_datapoint(rawdata_root, subject_id, module_id, marker_id, original_measured_at, rec)
+
+    table = _datapoint_table(subject_id, module_id, marker_id)
+    with get_connection(db_path) as conn:
+        _ensure_datapoint_table(conn, table)
+        conn.execute(
+            f'UPDATE "{table}" SET measured_at=?, value=?, unit=?, data_quality=? '
+            f'WHERE measured_at=?',
+            (rec["measured_at"], rec["value"], rec["unit"], rec["data_quality"], original_measured_at),
+        )
+        refresh_dataset_stats(conn, subject_id, module_id, marker_id)
+        refresh_datapoint_rollups(
+            conn, subject_id, module_id, marker_id, [original_measured_at, rec["measured_at"]],
+        )
+        conn.commit()
+
+
+def _delete_stored_datapoint(
+    db_path:      str,
+    rawdata_root: str,
+    subject_id:   str,
+    module_id:    str,
+    marker_id:    str,
+    measured_at:  str,
+) -> None:
+    delete_datapoint(rawdata_root, subject_id, module_id, marker_id, measured_at)
+
+    table = _datapoint_table(subject_id, module_id, marker_id)
+    with get_connection(db_path) as conn:
+        conn.execute(f'DELETE FROM "{table}" WHERE measured_at=?', (measured_at,))
+        refresh_dataset_stats(conn, subject_id, module_id, marker_id)
+        refresh_datapoint_rollups(conn, subject_id, module_id, marker_id, [measured_at])
+        conn.commit()
+
+
+def _delete_stored_dataset(
+    db_path:      str,
+    rawdata_root: str,
+    subject_id:   str,
+    module_id:    str,
+    marker_id:    str,
+) -> None:
+    marker_dir = os.path.join(rawdata_root, subject_id, module_id, marker_id)
+    if not os.path.isdir(marker_dir):
+        raise ValueError("Dataset not found.")
+
+    silo = os.path.join(
+        os.path.dirname(rawdata_root),
+        "deleted_datasets", subject_id, module_id,
+    )
+    os.makedirs(silo, exist_ok=True)
+    ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    # Under the marker's lock, so an in-flight write finishes before the directory moves.
+    with marker_lock(marker_dir):
+        shutil.move(marker_dir, os.path.join(silo, f"{marker_id}_{ts}"))
+    INDEX_CACHE.invalidate(marker_dir)
 
-def _save_index(index_path: str, data: dict) -> None:
-    with open(index_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    table = _datapoint_table(subject_id, module_id, marker_id)
+    with get_connection(db_path) as conn:
+        conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+        delete_dataset_stats(conn, subject_id, module_id, marker_id)
+        delete_datapoint_rollups(conn, subject_id, module_id, marker_id)
+        conn.commit()
 
 
 @strawberry.type
 class DatapointMutations:
 
     @strawberry.mutation(description="Add a datapoint to a subject's marker dataset.")
-    def add_datapoint(
+    async def add_datapoint(
         self,
         info: strawberry.types.Info[AppContext, None],
         subject_id: str,
@@ -34,57 +251,33 @@ class DatapointMutations:
         marker_id:  str,
         input: DatapointInput,
     ) -> Datapoint:
-        ctx        = info.context
-        marker_dir = os.path.join(ctx.rawdata_root, subject_id, module_id, marker_id)
-        os.makedirs(marker_dir, exist_ok=True)
-        index_path = os.path.join(marker_dir, "index.json")
-
-        if os.path.isfile(index_path):
-            with open(index_path, "r", encoding="utf-8") as f:
-                index = json.load(f)
-        else:
-            index = {
-                "subject_id": subject_id,
-                "module_id":  module_id,
-                "marker_id":  marker_id,
-                "entries":    [],
-            }
-
-        safe_ts  = input.measured_at.replace(":", "-").replace("+", "").rstrip("Z") + "Z"
-        filename = f"{safe_ts}.json"
-
-        if any(e["file"] == filename for e in index["entries"]):
-            raise GraphQLError("A datapoint with this timestamp already exists.")
-
-        created_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
-        dp = {
-            "schema_version": "1.0",
-            "module_id":      module_id,
-            "marker_id":      marker_id,
-            "subject_id":     subject_id,
-            "measured_at":    input.measured_at,
-            "value":          input.value,
-            "unit":           input.unit,
-            "data_quality":   input.data_quality,
-            "created_at":     created_at,
+        ctx = info.context
+        await ctx.require_subject(subject_id)
+        rec = {
+            "measured_at":  input.measured_at,
+            "value":        input.value,
+            "unit":         input.unit,
+            "data_quality": input.data_quality,
         }
-        with open(os.path.join(marker_dir, filename), "w", encoding="utf-8") as f:
-            json.dump(dp, f, indent=2)
-
-        index["entries"].append({"measured_at": input.measured_at, "file": filename})
-        index["entries"].sort(key=lambda e: e["measured_at"])
-        _save_index(index_path, index)
-
-        table = _datapoint_table(subject_id, module_id, marker_id)
-        with get_connection(ctx.db_path) as conn:
-            _ensure_datapoint_table(conn, table)
-            conn.execute(
-                f'INSERT INTO "{table}" (measured_at, value, unit, data_quality, created_at) '
-                f'VALUES (?, ?, ?, ?, ?) ON CONFLICT(measured_at) DO UPDATE SET '
-                f'value=excluded.value, unit=excluded.unit, data_quality=excluded.data_quality',
-                (input.measured_at, input.value, input.unit, input.data_quality, created_at),
+        if ctx.ingest_batcher is not None:
+            # Group commit: written and mirrored into SQLite together with other queued datapoints.
+            try:
+                await ctx.ingest_batcher.submit(subject_id, module_id, marker_id, rec)
+            except ValueError as e:
+                raise GraphQLError(str(e))
+            return Datapoint(
+                measured_at  = input.measured_at,
+                value        = input.value,
+                unit         = input.unit,
+                data_quality = input.data_quality,
+            )
+
+        try:
+            await asyncio.to_thread(
+                _store_datapoint, ctx.db_path, ctx.rawdata_root, subject_id, module_id, marker_id, rec,
             )
-            conn.commit()
+        except ValueError as e:
+            raise GraphQLError(str(e))
 
         return Datapoint(
             measured_at  = input.measured_at,
@@ -107,12 +300,14 @@ class DatapointMutations:
         marker_id:  str,
         file: Upload,
     ) -> Datapoint:
-        ctx        = info.context
-        marker_dir = os.path.join(ctx.rawdata_root, subject_id, module_id, marker_id)
-        os.makedirs(marker_dir, exist_ok=True)
-        index_path = os.path.join(marker_dir, "index.json")
+        ctx = info.context
+        await ctx.require_subject(subject_id)
 
-        content = await file.read()
+        content = await file.read(MAX_DATAPOINT_BYTES + 1)
+        if len(content) > MAX_DATAPOINT_BYTES:
+            raise GraphQLError(
+                "Uploaded file is too large for a single datapoint; use bulkUploadDatapoints instead."
+            )
         try:
             dp = json.loads(content)
         except (json.JSONDecodeError, UnicodeDecodeError):
@@ -122,41 +317,18 @@ class DatapointMutations:
             if key not in dp:
                 raise GraphQLError(f"Missing required field: {key}")
 
-        if os.path.isfile(index_path):
-            with open(index_path, "r", encoding="utf-8") as f:
-                index = json.load(f)
-        else:
-            index = {
-                "subject_id": subject_id,
-                "module_id":  module_id,
-                "marker_id":  marker_id,
-                "entries":    [],
-            }
-
-        safe_ts  = dp["measured_at"].replace(":", "-").replace("+", "").rstrip("Z") + "Z"
-        filename = f"{safe_ts}.json"
-
-        if any(e["file"] == filename for e in index["entries"]):
-            raise GraphQLError("A datapoint with this timestamp already exists.")
-
-        created_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
-        with open(os.path.join(marker_dir, filename), "wb") as f:
-            f.write(content)
-
-        index["entries"].append({"measured_at": dp["measured_at"], "file": filename})
-        index["entries"].sort(key=lambda e: e["measured_at"])
-        _save_index(index_path, index)
-
-        table = _datapoint_table(subject_id, module_id, marker_id)
-        with get_connection(ctx.db_path) as conn:
-            _ensure_datapoint_table(conn, table)
-            conn.execute(
-                f'INSERT INTO "{table}" (measured_at, value, unit, data_quality, created_at) '
-                f'VALUES (?, ?, ?, ?, ?) ON CONFLICT(measured_at) DO UPDATE SET '
-                f'value=excluded.value, unit=excluded.unit, data_quality=excluded.data_quality',
-                (dp["measured_at"], dp["value"], dp.get("unit"), dp.get("data_quality", "good"), created_at),
+        rec = {
+            "measured_at":  dp["measured_at"],
+            "value":        dp["value"],
+            "unit":         dp.get("unit"),
+            "data_quality": dp.get("data_quality", "good"),
+        }
+        try:
+            await asyncio.to_thread(
+                _store_datapoint, ctx.db_path, ctx.rawdata_root, subject_id, module_id, marker_id, rec, content,
             )
-            conn.commit()
+        except ValueError as e:
+            raise GraphQLError(str(e))
 
         return Datapoint(
             measured_at  = dp["measured_at"],
@@ -165,8 +337,51 @@ class DatapointMutations:
             data_quality = dp.get("data_quality", "good"),
         )
 
+    @strawberry.mutation(
+        description=(
+            "Upload a CSV or NDJSON file with many datapoints for one subject. Each row needs "
+            "measured_at and value; module_id/marker_id may be columns or arguments and must name "
+            "a catalogued marker. Valid rows "
+            "are written (one append per marker and one transaction per batch); invalid rows are "
+            "returned as per-row errors. If the upload fails part-way, the rows written so far are "
+            "kept and the error reports how many."
+        )
+    )
+    async def bulk_upload_datapoints(
+        self,
+        info: strawberry.types.Info[AppContext, None],
+        subject_id:  str,
+        file:        Upload,
+        file_format: Optional[str] = None,
+        module_id:   Optional[str] = None,
+        marker_id:   Optional[str] = None,
+    ) -> BulkUploadResult:
+        ctx = info.context
+        await ctx.require_subject(subject_id)
+        try:
+            fmt = detect_upload_format(getattr(file, "filename", None), file_format)
+        except ValueError as e:
+            raise GraphQLError(str(e))
+
+        try:
+            inserted, markers, errors, rejected = await asyncio.to_thread(
+                _ingest_upload, ctx.db_path, ctx.rawdata_root, subject_id, file, fmt, module_id, marker_id,
+            )
+        except UploadInterrupted as e:
+            raise GraphQLError(
+                f"Upload failed after {e.inserted} datapoints were stored: {e.cause}",
+                extensions={"code": "UPLOAD_INTERRUPTED", "inserted": e.inserted, "markers": e.markers},
+            )
+
+        return BulkUploadResult(
+            inserted = inserted,
+            rejected = rejected,
+            markers  = markers,
+            errors   = errors,
+        )
+
     @strawberry.mutation(description="Update an existing datapoint (identified by its original measured_at timestamp).")
-    def update_datapoint(
+    async def update_datapoint(
         self,
         info: strawberry.types.Info[AppContext, None],
         subject_id:          str,
@@ -175,63 +390,21 @@ class DatapointMutations:
         original_measured_at: str,
         input: DatapointInput,
     ) -> Datapoint:
-        ctx        = info.context
-        marker_dir = os.path.join(ctx.rawdata_root, subject_id, module_id, marker_id)
-        index_path = os.path.join(marker_dir, "index.json")
-
-        if not os.path.isfile(index_path):
-            raise GraphQLError("Dataset not found.")
-
-        with open(index_path, "r", encoding="utf-8") as f:
-            index = json.load(f)
-
-        entry = next((e for e in index["entries"] if e["measured_at"] == original_measured_at), None)
-        if entry is None:
-            raise GraphQLError("Datapoint not found.")
-
-        new_safe_ts  = input.measured_at.replace(":", "-").replace("+", "").rstrip("Z") + "Z"
-        new_filename = f"{new_safe_ts}.json"
-
-        if input.measured_at != original_measured_at:
-            if any(e["file"] == new_filename for e in index["entries"]):
-                raise GraphQLError("A datapoint with the new timestamp already exists.")
-
-        old_file_path = os.path.join(marker_dir, entry["file"])
-        with open(old_file_path, "r", encoding="utf-8") as f:
-            existing_dp = json.load(f)
-
-        updated_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
-        new_dp = {
-            **existing_dp,
+        ctx = info.context
+        await ctx.require_subject(subject_id)
+        rec = {
             "measured_at":  input.measured_at,
             "value":        input.value,
             "unit":         input.unit,
             "data_quality": input.data_quality,
-            "updated_at":   updated_at,
         }
-        new_file_path = os.path.join(marker_dir, new_filename)
-        with open(new_file_path, "w", encoding="utf-8") as f:
-            json.dump(new_dp, f, indent=2)
-        if new_filename != entry["file"]:
-            os.remove(old_file_path)
-
-        for e in index["entries"]:
-            if e["measured_at"] == original_measured_at:
-                e["measured_at"] = input.measured_at
-                e["file"]        = new_filename
-                break
-        index["entries"].sort(key=lambda e: e["measured_at"])
-        _save_index(index_path, index)
-
-        table = _datapoint_table(subject_id, module_id, marker_id)
-        with get_connection(ctx.db_path) as conn:
-            _ensure_datapoint_table(conn, table)
-            conn.execute(
-                f'UPDATE "{table}" SET measured_at=?, value=?, unit=?, data_quality=? '
-                f'WHERE measured_at=?',
-                (input.measured_at, input.value, input.unit, input.data_quality, original_measured_at),
+        try:
+            await asyncio.to_thread(
+                _update_stored_datapoint, ctx.db_path, ctx.rawdata_root,
+                subject_id, module_id, marker_id, original_measured_at, rec,
             )
-            conn.commit()
+        except ValueError as e:
+            raise GraphQLError(str(e))
 
         return Datapoint(
             measured_at  = input.measured_at,
@@ -241,9 +414,9 @@ class DatapointMutations:
         )
 
     @strawberry.mutation(
-        description="Soft-delete a single datapoint; moves the file to data/deleted_datapoints/."
+        description="Soft-delete a single datapoint; it is moved to data/deleted_datapoints/."
     )
-    def delete_datapoint(
+    async def delete_datapoint(
         self,
         info: strawberry.types.Info[AppContext, None],
         subject_id:  str,
@@ -251,68 +424,35 @@ class DatapointMutations:
         marker_id:   str,
         measured_at: str,
     ) -> bool:
-        ctx        = info.context
-        marker_dir = os.path.join(ctx.rawdata_root, subject_id, module_id, marker_id)
-        index_path = os.path.join(marker_dir, "index.json")
-
-        if not os.path.isfile(index_path):
-            raise GraphQLError("Dataset not found.")
-
-        with open(index_path, "r", encoding="utf-8") as f:
-            index = json.load(f)
-
-        entry = next((e for e in index["entries"] if e["measured_at"] == measured_at), None)
-        if entry is None:
-            raise GraphQLError("Datapoint not found.")
-
-        file_path = os.path.join(marker_dir, entry["file"])
-        if os.path.isfile(file_path):
-            silo = os.path.join(
-                os.path.dirname(ctx.rawdata_root),
-                "deleted_datapoints", subject_id, module_id, marker_id,
+        ctx = info.context
+        await ctx.require_subject(subject_id)
+        try:
+            await asyncio.to_thread(
+                _delete_stored_datapoint, ctx.db_path, ctx.rawdata_root,
+                subject_id, module_id, marker_id, measured_at,
             )
-            os.makedirs(silo, exist_ok=True)
-            ts        = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
-            silo_name = entry["file"].replace(".json", f"_{ts}.json")
-            shutil.move(file_path, os.path.join(silo, silo_name))
-
-        index["entries"] = [e for e in index["entries"] if e["measured_at"] != measured_at]
-        _save_index(index_path, index)
-
-        table = _datapoint_table(subject_id, module_id, marker_id)
-        with get_connection(ctx.db_path) as conn:
-            conn.execute(f'DELETE FROM "{table}" WHERE measured_at=?', (measured_at,))
-            conn.commit()
+        except ValueError as e:
+            raise GraphQLError(str(e))
 
         return True
 
     @strawberry.mutation(
         description="Soft-delete an entire marker dataset; moves the folder to data/deleted_datasets/."
     )
-    def delete_dataset(
+    async def delete_dataset(
         self,
         info: strawberry.types.Info[AppContext, None],
         subject_id: str,
         module_id:  str,
         marker_id:  str,
     ) -> bool:
-        ctx        = info.context
-        marker_dir = os.path.join(ctx.rawdata_root, subject_id, module_id, marker_id)
-
-        if not os.path.isdir(marker_dir):
-            raise GraphQLError("Dataset not found.")
-
-        silo = os.path.join(
-            os.path.dirname(ctx.rawdata_root),
-            "deleted_datasets", subject_id, module_id,
-        )
-        os.makedirs(silo, exist_ok=True)
-        ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
-        shutil.move(marker_dir, os.path.join(silo, f"{marker_id}_{ts}"))
-
-        table = _datapoint_table(subject_id, module_id, marker_id)
-        with get_connection(ctx.db_path) as conn:
-            conn.execute(f'DROP TABLE IF EXISTS "{table}"')
-            conn.commit()
+        ctx = info.context
+        await ctx.require_subject(subject_id)
+        try:
+            await asyncio.to_thread(
+                _delete_stored_dataset, ctx.db_path, ctx.rawdata_root, subject_id, module_id, marker_id,
+            )
+        except ValueError as e:
+            raise GraphQLError(str(e))
 
         return True
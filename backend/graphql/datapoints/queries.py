@@ -1,58 +1,147 @@
 from __future__ import annotations
-import json
-import os
 from typing import Optional
 
+import numpy as np
 import strawberry
+from strawberry.exceptions import GraphQLError
 
-from backend.startup.database_logistics import get_connection, _datapoint_table
+from backend.startup.database_logistics import get_connection, _datapoint_table, ROLLUP_BUCKETS
+from backend.core.analysis.downsample import lttb_indices
 from backend.graphql.context import AppContext
-from backend.graphql.datapoints.types import Datapoint, Dataset
+from backend.graphql.pagination import Connection, build_connection, decode_cursor, page_size
+from backend.graphql.datapoints.types import Datapoint, Dataset, DatapointResolution
+
+# Finest first: with only maxPoints given, the first series that fits is returned.
+RESOLUTION_ORDER = [
+    DatapointResolution.RAW, DatapointResolution.HOUR, DatapointResolution.DAY, DatapointResolution.WEEK,
+]
+MIN_MAX_POINTS = 3  # LTTB keeps the first and last point plus at least one in between
+
+_EPOCH_MS = "CAST(ROUND((julianday({}) - 2440587.5) * 86400000) AS INTEGER)"
+
+
+def _series_query(
+    resolution: DatapointResolution,
+    table:      str,
+    key:        tuple[str, str, str],
+    from_time:  Optional[str],
+    to_time:    Optional[str],
+    count_only: bool = False,
+) -> tuple[str, list]:
+    """SQL + params selecting (or counting) one marker's raw rows or rollup buckets in a time range."""
+    conditions: list[str] = []
+    params:     list      = []
+    if resolution is DatapointResolution.RAW:
+        if from_time:
+            conditions.append("measured_at >= ?")
+            params.append(from_time)
+        if to_time:
+            conditions.append("measured_at <= ?")
+            params.append(to_time)
+        where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+        if count_only:
+            return f'SELECT COUNT(*) FROM "{table}"{where}', params
+        return (
+            f'SELECT measured_at, value, unit, data_quality, NULL AS min_value, NULL AS max_value, '
+            f'NULL AS count, {_EPOCH_MS.format("measured_at")} AS t FROM "{table}"{where} ORDER BY measured_at',
+            params,
+        )
+
+    bucket, _ = ROLLUP_BUCKETS[resolution.value]
+    conditions = ["subject_id = ?", "module_id = ?", "marker_id = ?", "resolution = ?"]
+    params     = [*key, resolution.value]
+    if from_time:
+        # The bucket holding from_time is included even though it starts before it.
+        conditions.append(f"bucket_start >= {bucket.format('?')}")
+        params.append(from_time)
+    if to_time:
+        conditions.append("bucket_start <= strftime('%Y-%m-%dT%H:%M:%SZ', ?)")
+        params.append(to_time)
+    where = " WHERE " + " AND ".join(conditions)
+    if count_only:
+        return f"SELECT COUNT(*) FROM datapoint_rollups{where}", params
+    return (
+        f"SELECT bucket_start AS measured_at, sum_value / count AS value, NULL AS unit, "
+        f"'aggregated' AS data_quality, min_value, max_value, count, "
+        f"{_EPOCH_MS.format('bucket_start')} AS t FROM datapoint_rollups{where} ORDER BY bucket_start",
+        params,
+    )
+
+
+def _downsampled_rows(
+    conn,
+    table:      str,
+    key:        tuple[str, str, str],
+    from_time:  Optional[str],
+    to_time:    Optional[str],
+    resolution: Optional[DatapointResolution],
+    max_points: Optional[int],
+) -> list:
+    """
+    Rows for a downsampled datapoints query. Without an explicit resolution, the finest of
+    raw/hour/day/week with at most max_points rows in range is used; whatever is chosen is then
+    reduced to max_points with LTTB if it is still longer.
+    """
+    if resolution is None:
+        resolution = RESOLUTION_ORDER[-1]
+        for candidate in RESOLUTION_ORDER:
+            sql, params = _series_query(candidate, table, key, from_time, to_time, count_only=True)
+            if conn.execute(sql, params).fetchone()[0] <= max_points:
+                resolution = candidate
+                break
+
+    sql, params = _series_query(resolution, table, key, from_time, to_time)
+    rows = conn.execute(sql, params).fetchall()
+    if max_points is None or len(rows) <= max_points:
+        return rows
+
+    # LTTB needs time order; measured_at strings with UTC offsets can sort differently.
+    t      = np.array([r["t"] for r in rows], dtype=np.int64)
+    order  = np.argsort(t, kind="stable")
+    values = np.array([rows[i]["value"] for i in order], dtype=np.float64)
+    return [rows[order[i]] for i in lttb_indices(t[order], values, max_points)]
 
 
 @strawberry.type
 class DatapointQueries:
 
-    @strawberry.field(description="List dataset summaries for a subject (entry count per marker).")
-    def datasets(
+    @strawberry.field(
+        description="List dataset summaries for a subject: entry count, first/last timestamp, min/max/mean and last value per marker."
+    )
+    async def datasets(
         self,
         info: strawberry.types.Info[AppContext, None],
         subject_id: str,
     ) -> list[Dataset]:
         ctx = info.context
-        subject_dir = os.path.join(ctx.rawdata_root, subject_id)
-        if not os.path.isdir(subject_dir):
-            return []
-        result = []
-        for module_id in os.listdir(subject_dir):
-            module_dir = os.path.join(subject_dir, module_id)
-            if not os.path.isdir(module_dir):
-                continue
-            for marker_id in os.listdir(module_dir):
-                index_path = os.path.join(module_dir, marker_id, "index.json")
-                if not os.path.isfile(index_path):
-                    continue
-                with open(index_path, "r", encoding="utf-8") as f:
-                    index = json.load(f)
-                result.append(Dataset(
-                    module_id   = module_id,
-                    marker_id   = marker_id,
-                    entry_count = len(index.get("entries", [])),
-                ))
-        return result
-
-    @strawberry.field(description="Fetch datapoints for one subject/module/marker, with optional time filter.")
-    def datapoints(
+        await ctx.require_subject(subject_id)
+        return await ctx.loaders.datasets.load(subject_id)
+
+    @strawberry.field(
+        description=(
+            "Fetch datapoints for one subject/module/marker, with optional time filter. "
+            "resolution returns precomputed hourly/daily/weekly buckets (value = mean, plus min/max/count); "
+            "maxPoints caps the series length — alone it picks the finest resolution that fits, and any "
+            "series still longer is reduced with LTTB."
+        )
+    )
+    async def datapoints(
         self,
         info: strawberry.types.Info[AppContext, None],
         subject_id: str,
         module_id: str,
         marker_id: str,
-        from_time: Optional[str] = None,
-        to_time:   Optional[str] = None,
+        from_time:  Optional[str] = None,
+        to_time:    Optional[str] = None,
+        resolution: Optional[DatapointResolution] = None,
+        max_points: Optional[int] = None,
     ) -> list[Datapoint]:
         ctx = info.context
+        await ctx.require_subject(subject_id)
+        if max_points is not None and max_points < MIN_MAX_POINTS:
+            raise GraphQLError(f"maxPoints must be at least {MIN_MAX_POINTS}.")
         table = _datapoint_table(subject_id, module_id, marker_id)
+        key   = (subject_id, module_id, marker_id)
 
         with get_connection(ctx.db_path) as conn:
             exists = conn.execute(
@@ -61,27 +150,84 @@ class DatapointQueries:
             if not exists:
                 return []
 
-            query      = f'SELECT measured_at, value, unit, data_quality FROM "{table}"'
-            params: list = []
-            conditions: list[str] = []
-            if from_time:
-                conditions.append("measured_at >= ?")
-                params.append(from_time)
-            if to_time:
-                conditions.append("measured_at <= ?")
-                params.append(to_time)
-            if conditions:
-                query += " WHERE " + " AND ".join(conditions)
-            query += " ORDER BY measured_at"
-
-            rows = conn.execute(query, params).fetchall()
+            if resolution is None and max_points is None:
+                sql, params = _series_query(DatapointResolution.RAW, table, key, from_time, to_time)
+                rows = conn.execute(sql, params).fetchall()
+            else:
+                rows = _downsampled_rows(conn, table, key, from_time, to_time, resolution, max_points)
+
+            unit = None
+            if rows and rows[0]["count"] is not None:
+                # Rollup buckets carry no unit; use the marker's most recent one.
+                last = conn.execute(
+                    f'SELECT unit FROM "{table}" ORDER BY measured_at DESC LIMIT 1'
+                ).fetchone()
+                unit = last["unit"] if last else None
 
         return [
             Datapoint(
                 measured_at  = r["measured_at"],
                 value        = r["value"],
-                unit         = r["unit"]         or "",
+                unit         = r["unit"] or unit or "",
                 data_quality = r["data_quality"] or "good",
+                min_value    = r["min_value"],
+                max_value    = r["max_value"],
+                count        = r["count"],
             )
             for r in rows
         ]
+
+    @strawberry.field(
+        description=(
+            "Page through raw datapoints for one subject/module/marker in measured_at order, "
+            "with optional time filter (keyset cursor pagination)."
+        )
+    )
+    async def datapoints_connection(
+        self,
+        info: strawberry.types.Info[AppContext, None],
+        subject_id: str,
+        module_id: str,
+        marker_id: str,
+        from_time: Optional[str] = None,
+        to_time:   Optional[str] = None,
+        first:     Optional[int] = None,
+        after:     Optional[str] = None,
+    ) -> Connection[Datapoint]:
+        ctx = info.context
+        await ctx.require_subject(subject_id)
+        size  = page_size(first)
+        table = _datapoint_table(subject_id, module_id, marker_id)
+
+        conditions: list[str] = []
+        params:     list      = []
+        if from_time:
+            conditions.append("measured_at >= ?")
+            params.append(from_time)
+        if to_time:
+            conditions.append("measured_at <= ?")
+            params.append(to_time)
+        if after is not None:
+            conditions.append("measured_at > ?")
+            params.extend(decode_cursor(after, 1))
+        query = f'SELECT measured_at, value, unit, data_quality FROM "{table}"'
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY measured_at LIMIT ?"
+        params.append(size + 1)
+
+        with get_connection(ctx.db_path) as conn:
+            exists = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table,)
+            ).fetchone()
+            rows = [dict(r) for r in conn.execute(query, params).fetchall()] if exists else []
+
+        return build_connection(
+            rows, size, after, lambda r: [r["measured_at"]],
+            lambda r: Datapoint(
+                measured_at  = r["measured_at"],
+                value        = r["value"],
+                unit         = r["unit"]         or "",
+                data_quality = r["data_quality"] or "good",
+            ),
+        )
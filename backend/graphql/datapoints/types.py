@@ -1,21 +1,66 @@
 from __future__ import annotations
+from enum import Enum
+from typing import Optional
+
 import strawberry
 
+from backend.graphql.modules.types import Marker
+
+
+@strawberry.enum
+class DatapointResolution(Enum):
+    RAW  = "raw"
+    HOUR = "hour"
+    DAY  = "day"
+    WEEK = "week"
+
 
 @strawberry.type
 class Datapoint:
+    """
+    A stored datapoint, or — for downsampled queries — one rollup bucket: measured_at is the bucket
+    start (UTC), value the bucket mean, and min_value/max_value/count describe the bucket.
+    """
     measured_at:  str
     value:        float
     unit:         str
     data_quality: str
+    min_value:    Optional[float] = None
+    max_value:    Optional[float] = None
+    count:        Optional[int]   = None
 
 
 @strawberry.type
 class Dataset:
-    """Summary of a subject's marker dataset (entry count only — no raw data)."""
-    module_id:   str
-    marker_id:   str
-    entry_count: int
+    """Summary of a subject's marker dataset (from the dataset_stats table — no raw data)."""
+    module_id:         str
+    marker_id:         str
+    entry_count:       int
+    first_measured_at: Optional[str]   = None
+    last_measured_at:  Optional[str]   = None
+    min_value:         Optional[float] = None
+    max_value:         Optional[float] = None
+    mean_value:        Optional[float] = None
+    last_value:        Optional[float] = None
+
+    @classmethod
+    def from_row(cls, row: dict) -> "Dataset":
+        return cls(
+            module_id         = row["module_id"],
+            marker_id         = row["marker_id"],
+            entry_count       = row["count"],
+            first_measured_at = row["first_measured_at"],
+            last_measured_at  = row["last_measured_at"],
+            min_value         = row["min_value"],
+            max_value         = row["max_value"],
+            mean_value        = row["mean_value"],
+            last_value        = row["last_value"],
+        )
+
+    @strawberry.field(description="Catalog entry of this dataset's marker (batched per request).")
+    async def marker(self, info: strawberry.Info) -> Optional[Marker]:
+        markers = await info.context.loaders.markers_by_module.load(self.module_id)
+        return next((m for m in markers if m.marker_id == self.marker_id), None)
 
 
 @strawberry.input
@@ -24,3 +69,18 @@ class DatapointInput:
     value:        float
     unit:         str
     data_quality: str = "good"
+
+
+@strawberry.type
+class BulkRowError:
+    """A rejected row of a bulk upload. row is the line number in the uploaded file."""
+    row:     int
+    message: str
+
+
+@strawberry.type
+class BulkUploadResult:
+    inserted: int
+    rejected: int
+    markers:  list[str]            # "module_id/marker_id" of every marker that received data
+    errors:   list[BulkRowError]   # capped at MAX_REPORTED_ERRORS; `rejected` holds the full count
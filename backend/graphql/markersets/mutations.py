@@ -6,6 +6,7 @@ from uuid import uuid4
 import strawberry
 from strawberry.exceptions import GraphQLError
 
+from backend.core.storage.markerset_reader import MARKERSET_CACHE
 from backend.startup.database_logistics import get_connection
 from backend.graphql.context import AppContext
 from backend.graphql.markersets.types import (
@@ -37,6 +38,7 @@ class MarkersetMutations:
                 (markerset_id, input.name, input.description, markers_json, created_at),
             )
             conn.commit()
+            MARKERSET_CACHE.invalidate()
 
         return MarkersetTemplate(
             markerset_id = markerset_id,
@@ -64,6 +66,7 @@ class MarkersetMutations:
                 (input.name, input.description, markers_json, markerset_id),
             )
             conn.commit()
+            MARKERSET_CACHE.invalidate()
             if cur.rowcount == 0:
                 raise GraphQLError(f"Markerset template '{markerset_id}' not found.")
 
@@ -92,6 +95,7 @@ class MarkersetMutations:
                 "DELETE FROM markerset_templates WHERE markerset_id=?", (markerset_id,)
             )
             conn.commit()
+            MARKERSET_CACHE.invalidate()
             if cur.rowcount == 0:
                 raise GraphQLError(f"Markerset template '{markerset_id}' not found.")
         return True
@@ -121,6 +125,7 @@ class MarkersetMutations:
                  overrides_json, created_at),
             )
             conn.commit()
+            MARKERSET_CACHE.invalidate()
 
         return MarkersetInstance(
             instance_id  = instance_id,
@@ -149,6 +154,7 @@ class MarkersetMutations:
                 (input.name, input.markerset_id, overrides_json, instance_id),
             )
             conn.commit()
+            MARKERSET_CACHE.invalidate()
             if cur.rowcount == 0:
                 raise GraphQLError(f"Markerset instance '{instance_id}' not found.")
 
@@ -178,6 +184,7 @@ class MarkersetMutations:
                 "DELETE FROM markerset_instances WHERE instance_id=?", (instance_id,)
             )
             conn.commit()
+            MARKERSET_CACHE.invalidate()
             if cur.rowcount == 0:
                 raise GraphQLError(f"Markerset instance '{instance_id}' not found.")
         return True
@@ -3,9 +3,12 @@
 # analysis methods.
 
 from __future__ import annotations
+import json
 from typing import Optional
 import strawberry
 
+from backend.graphql.subjects.types import Subject
+
 
 # ── Output types ───────────────────────────────────────────────────────────────
 
@@ -29,6 +32,16 @@ class MarkersetTemplate:
     markers:      list[MarkerFeatureConfig]
     created_at:   str
 
+    @classmethod
+    def from_row(cls, row: dict) -> "MarkersetTemplate":
+        return cls(
+            markerset_id = row["markerset_id"],
+            name         = row["name"],
+            description  = row["description"],
+            markers      = [feature_config_from_dict(m) for m in json.loads(row["markers_json"])],
+            created_at   = row["created_at"],
+        )
+
 
 @strawberry.type
 class MarkersetInstance:
@@ -39,6 +52,18 @@ class MarkersetInstance:
     markers:      list[MarkerFeatureConfig]   # resolved template + overrides
     created_at:   str
 
+    # Nested fields batch through the request's DataLoaders (backend/graphql/dataloaders.py).
+
+    @strawberry.field(description="The subject this instance belongs to.")
+    async def subject(self, info: strawberry.Info) -> Optional[Subject]:
+        return await info.context.loaders.subject.load(self.subject_id)
+
+    @strawberry.field(description="The template this instance is based on (None for custom instances).")
+    async def template(self, info: strawberry.Info) -> Optional[MarkersetTemplate]:
+        if self.markerset_id is None:
+            return None
+        return await info.context.loaders.markerset_template.load(self.markerset_id)
+
 
 # ── Input types ────────────────────────────────────────────────────────────────
 
@@ -0,0 +1,38 @@
+# Prometheus metrics of the API process, served at GET /metrics (see backend/main.py).
+#
+# Besides the registered telemetry histograms and counters (backend/core/telemetry.py), a scrape exposes:
+#   graphql_operation_ms{operation}          latency per GraphQL operation; its _count is the request rate
+#   graphql_resolver_ms{field}               latency per resolver
+#   graphql_sql_ms / _sql_queries            SQLite time and statements per operation
+#   graphql_errors_total{operation}          operations that returned errors
+#   graphql_cached_responses_total{operation} requests answered by the response cache (hit or 304)
+#   sqlite_lock_wait_ms                      time to acquire the SQLite write lock
+# and, read at scrape time:
+#   arq_queue_depth                          jobs waiting in the ARQ queue
+#   cache_hits_total / cache_misses_total{cache}  for the response, persisted-query, index, markerset caches
+#   cache_entries{cache}, cache_bytes{cache}, zone_table_loads_total
+# Job wait / run times and datapoints per job are exported by the workers themselves
+# (backend/workers/settings.py), since that is where they are measured.
+
+from __future__ import annotations
+
+from backend.core import telemetry
+from backend.core.storage.index_cache import INDEX_CACHE
+from backend.core.storage.markerset_reader import MARKERSET_CACHE
+from backend.core.storage.zone_tables import ZONE_TABLES
+from backend.core.telemetry import cache_samples, queue_depth_sample
+from backend.graphql.persisted_queries import PERSISTED_QUERIES
+from backend.graphql.response_cache import RESPONSE_CACHE
+
+
+async def render(app_state) -> str:
+    response = RESPONSE_CACHE.stats()
+    samples  = cache_samples({
+        "response":         {**response, "hits": response["hits"] + response["not_modified"]},
+        "persisted_query":  PERSISTED_QUERIES.stats(),
+        "index":            INDEX_CACHE.stats(),
+        "markerset":        MARKERSET_CACHE.stats(),
+    })
+    samples.append(("zone_table_loads_total", "counter", "Zone table rebuilds", [({}, ZONE_TABLES.loads)]))
+    samples += await queue_depth_sample(getattr(app_state, "redis_pool", None))
+    return telemetry.render_prometheus(samples)
@@ -36,12 +36,13 @@ def _write_ref_json(path: str, data: dict) -> None:
 class ModuleMutations:
 
     @strawberry.mutation(description="Create a new module.")
-    def create_module(
+    async def create_module(
         self,
         info: strawberry.types.Info[AppContext, None],
         input: ModuleInput,
     ) -> Module:
         ctx     = info.context
+        await ctx.require_catalog()
         path    = ctx.modules_path
         modules = ctx.modules
 
@@ -70,13 +71,14 @@ class ModuleMutations:
         return Module.from_dict(new_mod)
 
     @strawberry.mutation(description="Update an existing module's name and description.")
-    def update_module(
+    async def update_module(
         self,
         info: strawberry.types.Info[AppContext, None],
         module_id: str,
         input: ModuleUpdateInput,
     ) -> Module:
         ctx     = info.context
+        await ctx.require_catalog()
         path    = ctx.modules_path
         modules = ctx.modules
 
@@ -104,12 +106,13 @@ class ModuleMutations:
             "data/deleted_reference_ranges/."
         )
     )
-    def delete_module(
+    async def delete_module(
         self,
         info: strawberry.types.Info[AppContext, None],
         module_id: str,
     ) -> bool:
         ctx     = info.context
+        await ctx.require_catalog()
         path    = ctx.modules_path
         modules = ctx.modules
 
@@ -137,13 +140,14 @@ class ModuleMutations:
         return True
 
     @strawberry.mutation(description="Add a marker to an existing module.")
-    def create_marker(
+    async def create_marker(
         self,
         info: strawberry.types.Info[AppContext, None],
         module_id: str,
         input: MarkerInput,
     ) -> Marker:
         ctx     = info.context
+        await ctx.require_catalog()
         path    = ctx.modules_path
         modules = ctx.modules
 
@@ -200,7 +204,7 @@ class ModuleMutations:
         return Marker.from_dict(new_marker)
 
     @strawberry.mutation(description="Update an existing marker's metadata.")
-    def update_marker(
+    async def update_marker(
         self,
         info: strawberry.types.Info[AppContext, None],
         module_id: str,
@@ -208,6 +212,7 @@ class ModuleMutations:
         input: MarkerUpdateInput,
     ) -> Marker:
         ctx     = info.context
+        await ctx.require_catalog()
         path    = ctx.modules_path
         modules = ctx.modules
 
@@ -261,13 +266,14 @@ class ModuleMutations:
             "data/deleted_reference_ranges/{module_id}/."
         )
     )
-    def delete_marker(
+    async def delete_marker(
         self,
         info: strawberry.types.Info[AppContext, None],
         module_id: str,
         marker_id: str,
     ) -> bool:
         ctx     = info.context
+        await ctx.require_catalog()
         path    = ctx.modules_path
         modules = ctx.modules
 
@@ -304,7 +310,7 @@ class ModuleMutations:
         return True
 
     @strawberry.mutation(description="Add a sex/age-specific demographic zone row for a marker.")
-    def add_demographic_zone(
+    async def add_demographic_zone(
         self,
         info: strawberry.types.Info[AppContext, None],
         module_id: str,
@@ -312,6 +318,7 @@ class ModuleMutations:
         input: DemographicZoneInput,
     ) -> DemographicZone:
         ctx = info.context
+        await ctx.require_catalog()
 
         with get_connection(ctx.db_path) as conn:
             conn.execute(
@@ -348,7 +355,7 @@ class ModuleMutations:
         )
 
     @strawberry.mutation(description="Update an existing demographic zone row.")
-    def update_demographic_zone(
+    async def update_demographic_zone(
         self,
         info: strawberry.types.Info[AppContext, None],
         module_id: str,
@@ -358,6 +365,7 @@ class ModuleMutations:
         input: ZoneBoundaryInput,
     ) -> DemographicZone:
         ctx = info.context
+        await ctx.require_catalog()
 
         with get_connection(ctx.db_path) as conn:
             cur = conn.execute(
@@ -389,7 +397,7 @@ class ModuleMutations:
         )
 
     @strawberry.mutation(description="Delete a demographic zone row.")
-    def delete_demographic_zone(
+    async def delete_demographic_zone(
         self,
         info: strawberry.types.Info[AppContext, None],
         module_id: str,
@@ -398,6 +406,7 @@ class ModuleMutations:
         age:       int,
     ) -> bool:
         ctx = info.context
+        await ctx.require_catalog()
 
         with get_connection(ctx.db_path) as conn:
             cur = conn.execute(
@@ -27,13 +27,14 @@ class ModuleQueries:
         return Module.from_dict(mod) if mod else None
 
     @strawberry.field(description="List all demographic zone rows for a marker.")
-    def demographic_zones(
+    async def demographic_zones(
         self,
         info: strawberry.types.Info[AppContext, None],
         module_id: str,
         marker_id: str,
     ) -> list[DemographicZone]:
         ctx = info.context
+        await ctx.require_catalog()
         with get_connection(ctx.db_path) as conn:
             rows = conn.execute(
                 "SELECT sex, age, healthy_min, healthy_max, vulnerability_margin "
@@ -0,0 +1,89 @@
+# Relay-style cursor pagination shared by the *Connection list fields.
+#
+# Pages are keyset seeks, not OFFSET: a cursor encodes the sort key of the last row a client has
+# seen, and the next page is `WHERE key > :cursor ORDER BY key LIMIT first + 1` on an indexed
+# column, so page 500 costs the same as page 1. The one extra row only answers hasNextPage.
+#
+# Cursors are opaque to clients: base64url of the JSON-encoded sort key (a list of column values).
+# Only forward pagination (first/after) is supported.
+
+from __future__ import annotations
+import base64
+import binascii
+import json
+from typing import Callable, Generic, Optional, TypeVar
+
+import strawberry
+from strawberry.exceptions import GraphQLError
+
+T = TypeVar("T")
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE     = 1000
+
+
+@strawberry.type
+class PageInfo:
+    has_next_page:     bool
+    has_previous_page: bool
+    start_cursor:      Optional[str]
+    end_cursor:        Optional[str]
+
+
+@strawberry.type
+class Edge(Generic[T]):
+    cursor: str
+    node:   T
+
+
+@strawberry.type
+class Connection(Generic[T]):
+    edges:     list[Edge[T]]
+    page_info: PageInfo
+
+
+def encode_cursor(key: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Returns the sort key a cursor encodes. Raises GraphQLError if it is not one of ours."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        raise GraphQLError("Invalid cursor.")
+    if not isinstance(key, list) or len(key) != size:
+        raise GraphQLError("Invalid cursor.")
+    return key
+
+
+def page_size(first: Optional[int]) -> int:
+    if first is None:
+        return DEFAULT_PAGE_SIZE
+    if first < 0 or first > MAX_PAGE_SIZE:
+        raise GraphQLError(f"first must be between 0 and {MAX_PAGE_SIZE}.")
+    return first
+
+
+def build_connection(
+    rows:  list[dict],
+    size:  int,
+    after: Optional[str],
+    key:   Callable[[dict], list],
+    node:  Callable[[dict], T],
+) -> Connection[T]:
+    """
+    Builds a page from up to size + 1 rows fetched in sort order; `key` gives a row's sort key
+    (what its cursor encodes) and `node` turns a row into the GraphQL object.
+    """
+    page  = rows[:size]
+    edges = [Edge(cursor=encode_cursor(key(r)), node=node(r)) for r in page]
+    return Connection(
+        edges     = edges,
+        page_info = PageInfo(
+            has_next_page     = len(rows) > size,
+            has_previous_page = after is not None,
+            start_cursor      = edges[0].cursor  if edges else None,
+            end_cursor        = edges[-1].cursor if edges else None,
+        ),
+    )
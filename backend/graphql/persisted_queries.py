@@ -0,0 +1,139 @@
+# Persisted (hashed) queries for the GraphQL router, using the automatic persisted query protocol.
+#
+# Instead of the full query text a client sends
+#   {"extensions": {"persistedQuery": {"version": 1, "sha256Hash": "<hex sha256 of the query>"}}, "variables": ...}
+# If the server knows the hash, it runs the stored query. Otherwise it answers with a
+# PERSISTED_QUERY_NOT_FOUND error, and the client repeats the request with both `query` and the hash.
+# The server checks that the hash matches and stores the query for next time. GET requests work the same way (`extensions` as a
+# JSON query parameter). frontend/src/lib/gql.js speaks this protocol for every request.
+#
+# Stored queries live in an in-process LRU (PERSISTED_QUERY_LIMIT entries); a restart or an eviction just
+# costs one extra round trip. Parsing and validation are cached by the schema's ParserCache /
+# ValidationCache extensions (backend/graphql/schema.py), keyed by query text. So a persisted query
+# resolves to the same text, and then to the same parsed and validated document, on every request.
+#
+# Registering a query also allows its operation names as metric labels (telemetry.OPERATION_LABELS),
+# so the operations the frontend persists get their own latency series.
+
+from __future__ import annotations
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from graphql import GraphQLSyntaxError, OperationDefinitionNode, parse
+from strawberry.exceptions import GraphQLError
+from strawberry.fastapi import GraphQLRouter
+from strawberry.http import GraphQLRequestData
+from cross_web import HTTPException
+from strawberry.types import ExecutionResult
+
+from backend.core.telemetry import OPERATION_LABELS
+
+PERSISTED_QUERY_LIMIT = int(os.environ.get("ASHDT_PERSISTED_QUERIES", "1000"))
+
+
+def persisted_hash(extensions: dict | None) -> str | None:
+    """The sha256Hash of a request's persistedQuery extension, or None if it has none."""
+    persisted = (extensions or {}).get("persistedQuery")
+    if not isinstance(persisted, dict):
+        return None
+    sha = persisted.get("sha256Hash")
+    return sha.lower() if isinstance(sha, str) else None
+
+
+def _operation_names(query: str) -> list[str]:
+    try:
+        document = parse(query)
+    except GraphQLSyntaxError:
+        return []
+    return [
+        d.name.value for d in document.definitions
+        if isinstance(d, OperationDefinitionNode) and d.name is not None
+    ]
+
+
+class PersistedQueryStore:
+    """Thread-safe LRU of query texts by sha256 hex digest."""
+
+    def __init__(self, limit: int = PERSISTED_QUERY_LIMIT) -> None:
+        self.limit      = limit
+        self.hits       = 0
+        self.misses     = 0
+        self._queries:  OrderedDict[str, str] = OrderedDict()
+        self._lock      = threading.Lock()
+
+    def get(self, sha: str) -> str | None:
+        with self._lock:
+            query = self._queries.get(sha)
+            if query is None:
+                self.misses += 1
+                return None
+            self._queries.move_to_end(sha)
+            self.hits += 1
+            return query
+
+    def peek(self, sha: str) -> str | None:
+        """Like get(), but without touching the LRU order or the hit/miss counters."""
+        with self._lock:
+            return self._queries.get(sha)
+
+    def register(self, sha: str, query: str) -> None:
+        """
+        Stores query under sha and allows its operation names as metric labels. Raises ValueError
+        if sha is not the query's sha256.
+        """
+        if hashlib.sha256(query.encode("utf-8")).hexdigest() != sha:
+            raise ValueError("provided sha does not match query")
+        with self._lock:
+            self._queries[sha] = query
+            self._queries.move_to_end(sha)
+            while len(self._queries) > self.limit:
+                self._queries.popitem(last=False)
+        for name in _operation_names(query):
+            OPERATION_LABELS.allow(name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._queries), "limit": self.limit, "hits": self.hits, "misses": self.misses}
+
+
+PERSISTED_QUERIES = PersistedQueryStore()
+
+
+class PersistedQueryRouter(GraphQLRouter):
+    """GraphQLRouter that resolves persistedQuery hashes to query text before execution."""
+
+    def should_render_graphql_ide(self, request) -> bool:
+        # A GET without `query` is a persisted query when it carries extensions, not a browser visit.
+        return "extensions" not in request.query_params and super().should_render_graphql_ide(request)
+
+    async def execute_single(
+        self,
+        request,
+        request_adapter,
+        sub_response,
+        context,
+        root_value,
+        request_data: GraphQLRequestData,
+    ) -> ExecutionResult:
+        sha = persisted_hash(request_data.extensions)
+        if sha is not None:
+            if request_data.query is not None:
+                try:
+                    PERSISTED_QUERIES.register(sha, request_data.query)
+                except ValueError as e:
+                    raise HTTPException(400, str(e)) from e
+            else:
+                request_data.query = PERSISTED_QUERIES.get(sha)
+                if request_data.query is None:
+                    return ExecutionResult(
+                        data=None,
+                        errors=[GraphQLError(
+                            "PersistedQueryNotFound",
+                            extensions={"code": "PERSISTED_QUERY_NOT_FOUND"},
+                        )],
+                    )
+        return await super().execute_single(
+            request, request_adapter, sub_response, context, root_value, request_data,
+        )
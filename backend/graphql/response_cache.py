@@ -0,0 +1,361 @@
+# HTTP response cache for GraphQL read operations, with ETag / If-None-Match revalidation.
+#
+# The frontend polls modules, subjects, datasets and analysisReports constantly, and almost every poll
+# returns exactly what the previous one did. This ASGI middleware sits in front of the GraphQL router
+# and answers those repeats from memory — or, when the client already has them, with an empty 304.
+#
+# Only query operations sent as GET or JSON POST are considered (persisted queries are looked up by
+# hash first); mutations, multipart uploads and subscriptions pass straight through. A response is
+# identified by
+#   key  = sha256(normalized document, variables, operationName, today's date)
+#   ETag = hash(key, the data versions the operation depends on)
+# The data versions are counters in catalog_versions (Table 10), bumped by triggers on every write from
+# any process — API, ARQ worker, import scripts, the startup sync and the fs watcher alike:
+#   data:catalog       subjects, modules, markers, zone_references, markerset_templates
+#   data:subject:{id}  that subject's dataset_stats (every datapoint write), reports and markerset instances
+#   data:all           any of the above
+# An operation whose root fields all take a subjectId (subject, datasets, datapoints, analysisReports,
+# markersetInstances, ...) depends on data:catalog plus those subjects' counters, so a write for one
+# subject doesn't invalidate polls for the others; catalog-only roots (modules, markersetTemplates, ...)
+# depend on data:catalog; anything else on data:all. The date is part of the key because zone
+# boundaries follow the subject's age.
+#
+# Responses containing errors, and requests asking for timing (backend/graphql/timing.py), are never cached.
+# Entries live in an LRU bounded by
+# RESPONSE_CACHE_MAX_BYTES. ASHDT_RESPONSE_CACHE=0 disables the middleware.
+
+from __future__ import annotations
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from urllib.parse import parse_qs
+
+from graphql import FieldNode, GraphQLSyntaxError, OperationDefinitionNode, StringValueNode, VariableNode, parse, print_ast
+
+from backend.core.telemetry import OPERATION_LABELS, counter
+from backend.graphql.persisted_queries import PERSISTED_QUERIES, persisted_hash
+from backend.startup.database_logistics import catalog_versions, get_connection
+
+RESPONSE_CACHE_ENABLED   = os.environ.get("ASHDT_RESPONSE_CACHE", "1").lower() not in ("0", "false", "no")
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("ASHDT_RESPONSE_CACHE_MB", "32")) * 1024 * 1024
+
+_DOCUMENT_CACHE_SIZE = 256  # parsed documents kept, by raw query string
+
+# Answered here, so these requests never reach the timing extension's per-operation histograms.
+# Labelled like them, through OPERATION_LABELS (unknown operation names count as "other").
+CACHED_RESPONSES = counter(
+    "graphql_cached_responses_total", "GraphQL requests answered by the response cache (hit or 304)", label="operation",
+)
+
+# Root fields that only read catalog tables (or static registries loaded at startup).
+_CATALOG_ROOTS = frozenset({
+    "modules", "module", "demographicZones", "markersetTemplates", "markersetTemplate",
+    "analysisMethods", "__schema", "__type", "__typename",
+})
+
+
+# ── Operation analysis ─────────────────────────────────────────────────────────
+
+class _Document:
+    """A parsed query string: its normalized text and its operations by name (None for anonymous)."""
+
+    def __init__(self, normalized: str, operations: dict[str | None, OperationDefinitionNode]) -> None:
+        self.normalized = normalized
+        self.operations = operations
+
+
+def _subject_arg(field: FieldNode, variables: dict) -> str | None:
+    for arg in field.arguments or ():
+        if arg.name.value != "subjectId":
+            continue
+        if isinstance(arg.value, StringValueNode):
+            return arg.value.value
+        if isinstance(arg.value, VariableNode):
+            value = variables.get(arg.value.name.value)
+            return value if isinstance(value, str) else None
+    return None
+
+
+def data_scopes(operation: OperationDefinitionNode, variables: dict) -> list[str]:
+    """The catalog_versions names a query operation's result depends on."""
+    roots = operation.selection_set.selections
+    if not roots or not all(isinstance(f, FieldNode) for f in roots):
+        return ["data:all"]  # fragments at the root: don't bother resolving them
+    if all(f.name.value in _CATALOG_ROOTS for f in roots):
+        return ["data:catalog"]
+    subjects = [_subject_arg(f, variables) for f in roots if f.name.value not in _CATALOG_ROOTS]
+    if None in subjects:
+        return ["data:all"]
+    return ["data:catalog"] + [f"data:subject:{sid}" for sid in sorted(set(subjects))]
+
+
+# ── Cache ──────────────────────────────────────────────────────────────────────
+
+class ResponseCache:
+    """Thread-safe LRU of response bodies keyed by request key, each stored with the ETag it was built at."""
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MAX_BYTES) -> None:
+        self.max_bytes     = max_bytes
+        self.bytes         = 0
+        self.hits          = 0
+        self.misses        = 0
+        self.not_modified  = 0
+        self.evictions     = 0
+        self._entries:  OrderedDict[str, tuple[str, bytes]] = OrderedDict()
+        self._documents: OrderedDict[str, _Document | None] = OrderedDict()
+        self._lock      = threading.Lock()
+
+    def document(self, query: str) -> _Document | None:
+        """Parsed form of a query string; None if it does not parse (strawberry reports the error)."""
+        with self._lock:
+            if query in self._documents:
+                self._documents.move_to_end(query)
+                return self._documents[query]
+        try:
+            ast = parse(query)
+        except GraphQLSyntaxError:
+            doc = None
+        else:
+            ops = {
+                (d.name.value if d.name else None): d
+                for d in ast.definitions if isinstance(d, OperationDefinitionNode)
+            }
+            doc = _Document(print_ast(ast), ops)
+        with self._lock:
+            self._documents[query] = doc
+            if len(self._documents) > _DOCUMENT_CACHE_SIZE:
+                self._documents.popitem(last=False)
+        return doc
+
+    def get(self, key: str, etag: str) -> bytes | None:
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == etag:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, etag: str, body: bytes) -> None:
+        with self._lock:
+            self._drop(key)
+            if len(body) > self.max_bytes // 8:
+                return
+            self._entries[key] = (etag, body)
+            self.bytes += len(body)
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes     -= len(evicted)
+                self.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        cached = self._entries.pop(key, None)
+        if cached is not None:
+            self.bytes -= len(cached[1])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries":      len(self._entries),
+                "bytes":        self.bytes,
+                "max_bytes":    self.max_bytes,
+                "hits":         self.hits,
+                "misses":       self.misses,
+                "not_modified": self.not_modified,
+                "evictions":    self.evictions,
+            }
+
+
+RESPONSE_CACHE = ResponseCache()
+
+
+# ── Middleware ─────────────────────────────────────────────────────────────────
+
+class ResponseCacheMiddleware:
+    """Pure ASGI middleware; serves cached / 304 responses for GraphQL queries under `path`."""
+
+    def __init__(self, app, path: str = "/graphql", cache: ResponseCache = RESPONSE_CACHE) -> None:
+        self.app   = app
+        self.path  = path.rstrip("/")
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send) -> None:
+        if (
+            not RESPONSE_CACHE_ENABLED
+            or scope["type"] != "http"
+            or scope["path"].rstrip("/") != self.path
+            or scope["method"] not in ("GET", "POST")
+            or any(k.lower() == b"x-timing" for k, _ in scope["headers"])
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        body    = b""
+        if scope["method"] == "POST":
+            if "application/json" not in headers.get("content-type", ""):
+                await self.app(scope, receive, send)
+                return
+            body, receive = await _buffer_body(receive)
+
+        request = _parse_request(scope, body)
+        request = request and await self._resolve(scope, *request)
+        if request is None:
+            await self.app(scope, receive, send)
+            return
+        key, etag, operation = request
+
+        if etag in _etag_list(headers.get("if-none-match", "")):
+            self.cache.not_modified += 1
+            CACHED_RESPONSES.inc(operation)
+            await _send_response(send, 304, b"", etag, "HIT")
+            return
+        cached = self.cache.get(key, etag)
+        if cached is not None:
+            CACHED_RESPONSES.inc(operation)
+            await _send_response(send, 200, cached, etag, "HIT")
+            return
+
+        # Run the query and buffer its response so it is only cached (and given an ETag) if it succeeded.
+        start:  dict | None = None
+        chunks: list[bytes] = []
+
+        async def capture(message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        if start is None:
+            return
+        payload   = b"".join(chunks)
+        cacheable = (
+            start["status"] == 200
+            and any(k.lower() == b"content-type" and v.startswith(b"application/json") for k, v in start["headers"])
+            and b'"errors":' not in payload
+        )
+        if cacheable:
+            self.cache.put(key, etag, payload)
+            start = {**start, "headers": [
+                *[(k, v) for k, v in start["headers"] if k.lower() not in (b"etag", b"cache-control")],
+                *_cache_headers(etag, "MISS"),
+            ]}
+        await send(start)
+        await send({"type": "http.response.body", "body": payload})
+
+    async def _resolve(self, scope, query: str, variables: dict, operation_name: str | None) -> tuple[str, str, str] | None:
+        """
+        (cache key, current ETag, operation label) for a cacheable query operation, else None.
+        The data versions are read in a worker thread, like every other SQLite access from a request.
+        """
+        doc = self.cache.document(query)
+        if doc is None:
+            return None
+        if operation_name is None and len(doc.operations) == 1:
+            operation = next(iter(doc.operations.values()))
+        else:
+            operation = doc.operations.get(operation_name)
+        if operation is None or operation.operation.value != "query":
+            return None
+
+        scopes = data_scopes(operation, variables)
+        key    = hashlib.sha256(json.dumps(
+            [doc.normalized, variables, operation_name, date.today().isoformat()], sort_keys=True, default=str,
+        ).encode("utf-8")).hexdigest()
+        versions = await asyncio.to_thread(_data_versions, scope["app"].state.db_path, scopes)
+        tag = hashlib.sha256(f"{key}:{versions}".encode("utf-8")).hexdigest()[:32]
+        return key, f'"{tag}"', OPERATION_LABELS.label(operation.name.value if operation.name else None)
+
+
+# ── Helpers ────────────────────────────────────────────────────────────────────
+
+def _data_versions(db_path: str, scopes: list[str]) -> list[int]:
+    with get_connection(db_path) as conn:
+        return catalog_versions(conn, scopes)
+
+
+async def _buffer_body(receive):
+    """Reads the whole request body; returns it and a receive callable that replays it downstream."""
+    chunks    = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        more_body = message.get("more_body", False)
+    body     = b"".join(chunks)
+    replayed = False
+
+    async def replay():
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return body, replay
+
+
+def _parse_request(scope, body: bytes) -> tuple[str, dict, str | None] | None:
+    """(query, variables, operationName) from a GET query string or JSON POST body; None if malformed."""
+    try:
+        if scope["method"] == "GET":
+            params    = {k: v[0] for k, v in parse_qs(scope.get("query_string", b"").decode("latin-1")).items()}
+            variables = json.loads(params["variables"]) if params.get("variables") else {}
+        else:
+            params    = json.loads(body)
+            variables = params.get("variables") or {}
+    except (ValueError, AttributeError):
+        return None
+    query = params.get("query")
+    if isinstance(params.get("extensions"), str):
+        try:
+            params["extensions"] = json.loads(params["extensions"])
+        except ValueError:
+            return None
+    if isinstance(params.get("extensions"), dict) and set(params["extensions"]) - {"persistedQuery"}:
+        return None  # e.g. extensions.timing: the response is specific to this request
+    if isinstance(params.get("extensions"), dict) and (sha := persisted_hash(params["extensions"])):
+        if query is not None:
+            return None  # registration: let the router check the hash
+        query = PERSISTED_QUERIES.peek(sha)  # unknown hash: the router asks for the full query
+    if not isinstance(query, str) or not isinstance(variables, dict):
+        return None
+    operation_name = params.get("operationName") or None
+    return query, variables, operation_name if isinstance(operation_name, str) else None
+
+
+def _etag_list(header: str) -> set[str]:
+    return {t.strip().removeprefix("W/") for t in header.split(",") if t.strip()}
+
+
+def _cache_headers(etag: str, status: str) -> list[tuple[bytes, bytes]]:
+    return [
+        (b"etag",          etag.encode("latin-1")),
+        (b"cache-control", b"no-cache"),  # GET clients may keep the body but must revalidate
+        (b"x-cache",       status.encode("latin-1")),
+    ]
+
+
+async def _send_response(send, status: int, body: bytes, etag: str, cache_status: str) -> None:
+    headers = _cache_headers(etag, cache_status)
+    if status == 200:
+        headers += [
+            (b"content-type",   b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+        ]
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
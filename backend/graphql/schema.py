@@ -1,4 +1,7 @@
+import os
+
 import strawberry
+from strawberry.extensions import ParserCache, ValidationCache
 from strawberry.tools import merge_types
 
 from backend.graphql.subjects.queries      import SubjectQueries
@@ -12,6 +15,7 @@ from backend.graphql.analysis.mutations    import AnalysisMutations
 from backend.graphql.analysis.subscriptions import AnalysisSubscriptions
 from backend.graphql.markersets.queries    import MarkersetQueries
 from backend.graphql.markersets.mutations  import MarkersetMutations
+from backend.graphql.timing                import TimingExtension
 
 Query = merge_types(
     "Query",
@@ -28,8 +32,19 @@ Subscription = merge_types(
     (AnalysisSubscriptions,),
 )
 
+# Parsed and validated documents are reused across requests, keyed by query text. Clients send the same
+# few operations over and over (as persisted queries, see persisted_queries.py), so after the first
+# request each one skips parsing and validation entirely. TimingExtension (timing.py) comes first so its
+# measurements include the cached phases.
+DOCUMENT_CACHE_SIZE = int(os.environ.get("ASHDT_DOCUMENT_CACHE_SIZE", "256"))
+
 schema = strawberry.Schema(
     query=Query,
     mutation=Mutation,
     subscription=Subscription,
+    extensions=[
+        TimingExtension,
+        lambda: ParserCache(maxsize=DOCUMENT_CACHE_SIZE),
+        lambda: ValidationCache(maxsize=DOCUMENT_CACHE_SIZE),
+    ],
 )
@@ -7,6 +7,8 @@ from datetime import datetime, timezone
 import strawberry
 from strawberry.exceptions import GraphQLError
 
+from backend.core.storage.index_cache import INDEX_CACHE
+from backend.startup.bulk_loader import purge_subject
 from backend.startup.database_logistics import get_connection
 from backend.graphql.context import AppContext
 from backend.graphql.subjects.types import Subject, SubjectInput
@@ -16,12 +18,13 @@ from backend.graphql.subjects.types import Subject, SubjectInput
 class SubjectMutations:
 
     @strawberry.mutation(description="Create a new subject. subject_id is auto-generated.")
-    def create_subject(
+    async def create_subject(
         self,
         info: strawberry.types.Info[AppContext, None],
         input: SubjectInput,
     ) -> Subject:
         ctx          = info.context
+        await ctx.require_catalog()
         rawdata_root = ctx.rawdata_root
         db_path      = ctx.db_path
 
@@ -77,13 +80,14 @@ class SubjectMutations:
         )
 
     @strawberry.mutation(description="Update an existing subject's profile.")
-    def update_subject(
+    async def update_subject(
         self,
         info: strawberry.types.Info[AppContext, None],
         subject_id: str,
         input: SubjectInput,
     ) -> Subject:
         ctx          = info.context
+        await ctx.require_catalog()
         rawdata_root = ctx.rawdata_root
         db_path      = ctx.db_path
 
@@ -133,12 +137,13 @@ class SubjectMutations:
     @strawberry.mutation(
         description="Soft-delete a subject: moves directory to data/deleted_subjects/."
     )
-    def delete_subject(
+    async def delete_subject(
         self,
         info: strawberry.types.Info[AppContext, None],
         subject_id: str,
     ) -> bool:
         ctx          = info.context
+        await ctx.require_catalog()
         rawdata_root = ctx.rawdata_root
         db_path      = ctx.db_path
 
@@ -150,8 +155,12 @@ class SubjectMutations:
         os.makedirs(deleted_root, exist_ok=True)
         timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
         shutil.move(subject_dir, os.path.join(deleted_root, f"{subject_id}_{timestamp}"))
+        INDEX_CACHE.invalidate_prefix(subject_dir)
 
+        # Profile row, datapoint tables, stats and rollups go in one transaction; a crash before the
+        # commit is cleaned up by the startup sync (bulk_loader.prune_deleted_subjects).
         with get_connection(db_path) as conn:
+            purge_subject(conn, subject_id)
             conn.execute("DELETE FROM subjects WHERE subject_id = ?", (subject_id,))
             conn.commit()
 
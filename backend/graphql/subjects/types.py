@@ -2,6 +2,8 @@ from __future__ import annotations
 from typing import Optional
 import strawberry
 
+from backend.graphql.datapoints.types import Dataset
+
 
 @strawberry.type
 class Subject:
@@ -29,6 +31,22 @@ class Subject:
             created_at = row.get("created_at") or "",
         )
 
+    # Nested fields batch through the request's DataLoaders (backend/graphql/dataloaders.py).
+
+    @strawberry.field(description="Dataset summaries for this subject.")
+    async def datasets(self, info: strawberry.Info) -> list[Dataset]:
+        await info.context.require_subject(self.subject_id)
+        return await info.context.loaders.datasets.load(self.subject_id)
+
+    @strawberry.field(description="Age/sex-interpolated zone boundaries of a marker for this subject.")
+    async def zone_reference(
+        self,
+        info:      strawberry.Info,
+        module_id: str,
+        marker_id: str,
+    ) -> Optional["ZoneReference"]:
+        return await info.context.loaders.zone_reference.load((self.subject_id, module_id, marker_id))
+
 
 @strawberry.type
 class ZoneReference:
@@ -0,0 +1,146 @@
+# Per-operation and per-resolver timing for the GraphQL schema.
+#
+# TimingExtension runs every operation inside a RequestTrace (backend/core/telemetry.py) and measures:
+#   operation   — total, parse, validate and execute time
+#   resolvers   — every field with a resolver function (root fields, Subject.datasets, Dataset.marker, ...);
+#                 plain attribute fields are not timed. Async resolvers run concurrently, so their times
+#                 overlap and do not add up to execute_ms.
+#   sqlite      — statement count and time, broken down by SQL text (the sqlite_master existence check,
+#                 the range query and the stats lookup of a datapoints call each show up separately)
+#   filesystem  — raw_data file reads and bytes
+# Whatever is left of execute_ms after the resolvers is graphql-core completing and serializing the
+# result.
+#
+# Opt-in per request: send {"extensions": {"timing": true}} with the request, or the header
+# `X-Timing: 1`, and the response carries the breakdown as extensions.timing. Aggregates are always
+# recorded into the telemetry histograms (latency per operation and per resolver, SQL time and query
+# count per operation, filesystem bytes per operation) and counters (operations that returned errors),
+# served as JSON at GET /timing and in the Prometheus format at GET /metrics.
+# operationName comes from the client, so the per-operation series are keyed by
+# telemetry.OPERATION_LABELS.label(): names of registered persisted queries (or the configured
+# allow-list) keep their own series, everything else shares "other".
+
+from __future__ import annotations
+import time
+from inspect import isawaitable
+from typing import Any
+
+from strawberry.extensions import SchemaExtension
+from strawberry.schema.schema_converter import GraphQLCoreConverter
+
+from backend.core.telemetry import (
+    BYTES_BUCKETS, COUNT_BUCKETS, OPERATION_LABELS, counter, histogram, trace_request,
+)
+
+TIMING_STATEMENTS = 20  # slowest SQL statements listed in extensions.timing
+
+OPERATION_MS = histogram("graphql_operation_ms",  "GraphQL operation latency (ms)",              label="operation")
+RESOLVER_MS  = histogram("graphql_resolver_ms",   "GraphQL resolver latency (ms)",               label="field")
+SQL_MS       = histogram("graphql_sql_ms",        "SQLite time per GraphQL operation (ms)",      label="operation")
+SQL_QUERIES  = histogram("graphql_sql_queries",   "SQLite statements per GraphQL operation",     COUNT_BUCKETS, label="operation")
+FS_BYTES     = histogram("graphql_fs_read_bytes", "raw_data bytes read per GraphQL operation",   BYTES_BUCKETS, label="operation")
+ERRORS       = counter("graphql_errors_total",    "GraphQL operations that returned errors",     label="operation")
+
+# (parent type, field) → "Type.field" if the field has a resolver function, else None
+_timed_fields: dict[tuple[str, str], str | None] = {}
+
+
+def _timed_name(info) -> str | None:
+    key = (info.parent_type.name, info.field_name)
+    if key not in _timed_fields:
+        field      = info.parent_type.fields.get(info.field_name)
+        definition = field.extensions.get(GraphQLCoreConverter.DEFINITION_BACKREF) if field and field.extensions else None
+        timed      = definition is not None and definition.base_resolver is not None
+        _timed_fields[key] = f"{key[0]}.{key[1]}" if timed else None
+    return _timed_fields[key]
+
+
+def _ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+
+class TimingExtension(SchemaExtension):
+    """Records timings for every operation; returns them as extensions.timing when requested."""
+
+    def __init__(self, *, execution_context=None) -> None:
+        self.phases: dict[str, float] = {}
+        self.trace  = None
+
+    def on_operation(self):
+        start = time.perf_counter()
+        with trace_request() as trace:
+            self.trace = trace
+            yield
+        self.phases["total_ms"] = _ms(start)
+        operation = OPERATION_LABELS.label(self.execution_context.operation_name)
+        OPERATION_MS.observe(self.phases["total_ms"], operation)
+        SQL_MS.observe(trace.sql_ms, operation)
+        SQL_QUERIES.observe(trace.sql_queries, operation)
+        FS_BYTES.observe(trace.fs_bytes, operation)
+        for field, (_, total, _) in trace.resolvers.items():
+            RESOLVER_MS.observe(total, field)
+        result = self.execution_context.result
+        if self.execution_context.pre_execution_errors or (result is not None and result.errors):
+            ERRORS.inc(operation)
+
+    def on_parse(self):
+        start = time.perf_counter()
+        yield
+        self.phases["parse_ms"] = _ms(start)
+
+    def on_validate(self):
+        start = time.perf_counter()
+        yield
+        self.phases["validate_ms"] = _ms(start)
+
+    def on_execute(self):
+        start = time.perf_counter()
+        yield
+        self.phases["execute_ms"] = _ms(start)
+
+    def resolve(self, _next, root, info, *args, **kwargs) -> Any:
+        name  = _timed_name(info)
+        trace = self.trace
+        if name is None or trace is None:
+            return _next(root, info, *args, **kwargs)
+        start  = time.perf_counter()
+        result = _next(root, info, *args, **kwargs)
+        if isawaitable(result):
+            return self._finish(result, trace, name, start)
+        trace.add_resolver(name, _ms(start))
+        return result
+
+    async def _finish(self, result, trace, name: str, start: float) -> Any:
+        try:
+            return await result
+        finally:
+            trace.add_resolver(name, _ms(start))
+
+    def get_results(self) -> dict[str, Any]:
+        if self.trace is None or not self._requested():
+            return {}
+        trace = self.trace
+        statements = sorted(trace.statements.items(), key=lambda s: s[1][1], reverse=True)[:TIMING_STATEMENTS]
+        resolvers  = sorted(trace.resolvers.items(), key=lambda r: r[1][1], reverse=True)
+        return {"timing": {
+            "operation": self.execution_context.operation_name,
+            **{k: round(v, 3) for k, v in self.phases.items()},
+            "resolvers": [
+                {"field": field, "count": count, "total_ms": round(total, 3), "max_ms": round(worst, 3)}
+                for field, (count, total, worst) in resolvers
+            ],
+            "sqlite": {
+                "queries":    trace.sql_queries,
+                "total_ms":   round(trace.sql_ms, 3),
+                "statements": [
+                    {"sql": sql, "count": count, "total_ms": round(ms, 3)} for sql, (count, ms) in statements
+                ],
+            },
+            "filesystem": {"reads": trace.fs_reads, "bytes": trace.fs_bytes},
+        }}
+
+    def _requested(self) -> bool:
+        if (self.execution_context.operation_extensions or {}).get("timing"):
+            return True
+        request = getattr(self.execution_context.context, "request", None)
+        return request is not None and request.headers.get("x-timing", "") not in ("", "0", "false")
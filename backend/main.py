@@ -3,13 +3,20 @@
 # being imported every time they're needed.
 
 import os
+import asyncio
 import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 
 from backend.startup.module_loader import load_modules
 from backend.startup.analysis_loader import load_analysis_methods
-from backend.startup.database_logistics import init_db, sync_subjects, sync_zone_references, sync_modules, sync_datapoints
+from backend.startup.database_logistics import init_db
+from backend.startup.sync_state import SyncState, run_background_sync
+from backend.startup.fs_watcher import WATCH_ENABLED, watch_data_sources
+from backend.core.storage.ingest_batcher import GROUP_COMMIT_ENABLED, IngestBatcher
+from backend.core import telemetry
+from backend.graphql.response_cache import ResponseCacheMiddleware
 
 logger = logging.getLogger(__name__)
 
@@ -25,32 +32,60 @@ REFERENCES_ROOT = os.path.join(DATA_DIR, "reference_ranges")
 REDIS_URL       = os.environ.get("REDIS_URL", "redis://localhost:6379")
 
 app = FastAPI()
+# Cached / 304 answers for repeated GraphQL queries (see backend/graphql/response_cache.py).
+# Added before CORS so CORS stays the outermost layer and decorates those responses too.
+app.add_middleware(ResponseCacheMiddleware, path="/graphql")
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 # ── GraphQL router ─────────────────────────────────────────────────────────────
 # GraphiQL IDE available at /graphql in browser.
 # Subscriptions (jobStatus) are served over WebSocket at ws://localhost:8000/graphql.
-from strawberry.fastapi import GraphQLRouter
+# Accepts persisted (hashed) queries — see backend/graphql/persisted_queries.py.
 from backend.graphql.schema import schema
 from backend.graphql.context import get_context
+from backend.graphql.persisted_queries import PersistedQueryRouter
+from backend.graphql import metrics as graphql_metrics
 
-graphql_router = GraphQLRouter(schema, context_getter=get_context, multipart_uploads_enabled=True)
+graphql_router = PersistedQueryRouter(schema, context_getter=get_context, multipart_uploads_enabled=True)
 app.include_router(graphql_router, prefix="/graphql")
 
 
+# Readiness probe: 200 once the background startup sync has finished, 503 (with progress) until then.
+@app.get("/ready")
+async def ready():
+    state = app.state.sync_state
+    return JSONResponse(state.snapshot(), status_code=200 if state.is_ready else 503)
+
+
+# Aggregated GraphQL timing histograms (per operation, per resolver, SQL and filesystem) — see backend/graphql/timing.py.
+@app.get("/timing")
+async def timing():
+    return JSONResponse(telemetry.snapshot())
+
+
+# Prometheus scrape endpoint: GraphQL latency/rates, cache hit rates, SQLite lock waits, ARQ queue depth.
+# See backend/graphql/metrics.py; workers export their job metrics themselves (backend/workers/settings.py).
+@app.get("/metrics")
+async def metrics():
+    return Response(await graphql_metrics.render(app.state), media_type=telemetry.CONTENT_TYPE)
+
+
 @app.on_event("startup")
 async def startup():
-    # ── Sync data sources into SQLite ─────────────────────────────────────────
+    # ── Sync data sources into SQLite (in the background) ──────────────────────
+    # Only the schema is created up front; everything else is mirrored by a background
+    # task so the server accepts connections immediately. See backend/startup/sync_state.py.
     init_db(DB_PATH)
-    sync_subjects(DB_PATH, RAWDATA_ROOT)
-    sync_zone_references(DB_PATH, REFERENCES_ROOT)
-    sync_modules(DB_PATH, MODULES_PATH)
-    sync_datapoints(DB_PATH, RAWDATA_ROOT)
+    app.state.sync_state = SyncState()
+    app.state.sync_task  = asyncio.create_task(
+        run_background_sync(app.state.sync_state, DB_PATH, RAWDATA_ROOT, REFERENCES_ROOT, MODULES_PATH)
+    )
 
     # ── Store shared paths and state on app.state ──────────────────────────────
     app.state.modules         = load_modules(MODULES_PATH)
@@ -61,6 +96,20 @@ async def startup():
     app.state.reports_root    = REPORTS_ROOT
     app.state.references_root = REFERENCES_ROOT
 
+    # ── Optional live watcher for changes made outside the API ─────────────────
+    app.state.watch_stop = asyncio.Event()
+    app.state.watch_task = None
+    if WATCH_ENABLED:
+        app.state.watch_task = asyncio.create_task(watch_data_sources(
+            app.state, DB_PATH, RAWDATA_ROOT, REFERENCES_ROOT, MODULES_PATH, app.state.watch_stop,
+        ))
+
+    # ── Optional group commit for addDatapoint (see core/storage/ingest_batcher.py) ─
+    app.state.ingest_batcher = None
+    if GROUP_COMMIT_ENABLED:
+        app.state.ingest_batcher = IngestBatcher(DB_PATH, RAWDATA_ROOT)
+        app.state.ingest_batcher.start()
+
     # ── Create ARQ Redis pool for async job dispatch ───────────────────────────
     # Gracefully degrades if Redis is not running: submitAnalysis mutation will
     # raise a helpful GraphQL error rather than crashing the server at startup.
@@ -78,5 +127,13 @@ async def startup():
 
 @app.on_event("shutdown")
 async def shutdown():
+    sync_task = getattr(app.state, "sync_task", None)
+    if sync_task is not None and not sync_task.done():
+        sync_task.cancel()
+    if getattr(app.state, "watch_task", None) is not None:
+        app.state.watch_stop.set()
+        await app.state.watch_task
+    if getattr(app.state, "ingest_batcher", None) is not None:
+        await app.state.ingest_batcher.close()
     if getattr(app.state, "redis_pool", None) is not None:
         await app.state.redis_pool.aclose()
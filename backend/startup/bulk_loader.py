@@ -0,0 +1,320 @@
+# Bulk loader that mirrors raw_data datapoints into the per-subject-marker SQLite tables.
+# Backs sync_datapoints() at startup and doubles as a CLI for initial imports of historic archives:
+#
+#   python -m backend.startup.bulk_loader                      # whole archive, default paths
+#   python -m backend.startup.bulk_loader --subject subject_001 --workers 16
+#
+# How it works:
+#   1. Every marker directory (subject/module/marker) is read on a thread pool — the work is file I/O
+#      and JSON parsing, so threads overlap the disk/network latency of thousands of tiny files.
+#      Segment-format markers (see core/storage/segment_log.py) are a couple of sequential JSONL reads.
+#   2. Parsed rows are inserted with executemany into a TEMP staging table on a single connection.
+#   3. Once a batch is staged, each target table is merged with one set-based
+#      INSERT ... SELECT ... ON CONFLICT DO UPDATE and its dataset_stats row and rollups are recomputed,
+#      then the staging table is cleared and the batch committed.
+# Throughput (markers, datapoints, points/second) is logged and returned as a stats dict.
+#
+# This replaces the row-by-row sync_subject_datapoints() that the background startup sync first used:
+# per-subject syncs now call sync_datapoints(db_path, rawdata_root, [subject_id]), which lands here.
+
+from __future__ import annotations
+import argparse
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.startup.database_logistics import (
+    get_connection,
+    _datapoint_table,
+    _ensure_datapoint_table,
+    refresh_dataset_stats,
+    refresh_datapoint_rollups,
+)
+from backend.core.storage import segment_log
+from backend.core.storage.data_reader import has_marker_data
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+BATCH_ROWS      = 50_000  # staged rows per merge + commit
+
+
+def _iter_marker_dirs(rawdata_root: str, subject_ids: list[str] | None):
+    """Yields (subject_id, module_id, marker_id, marker_dir) for every marker directory holding a dataset."""
+    if subject_ids is None:
+        subject_ids = sorted(os.listdir(rawdata_root)) if os.path.isdir(rawdata_root) else []
+    for subject_id in subject_ids:
+        subject_dir = os.path.join(rawdata_root, subject_id)
+        if not os.path.isdir(subject_dir):
+            continue
+        for module_id in os.listdir(subject_dir):
+            module_dir = os.path.join(subject_dir, module_id)
+            if not os.path.isdir(module_dir):
+                continue
+            for marker_id in os.listdir(module_dir):
+                marker_dir = os.path.join(module_dir, marker_id)
+                if has_marker_data(marker_dir):
+                    yield subject_id, module_id, marker_id, marker_dir
+
+
+def read_marker_rows(marker_dir: str) -> tuple[list[tuple], int]:
+    """
+    Reads every live datapoint of a marker (segment log or legacy index.json + files).
+    Returns (rows, skipped) where rows are (measured_at, value, unit, data_quality, created_at)
+    and skipped counts legacy index entries whose file was missing or unreadable.
+    """
+    if segment_log.is_segment_marker(marker_dir):
+        rows = [
+            (r["measured_at"], r["value"], r.get("unit"), r.get("data_quality"), r.get("created_at", ""))
+            for r in segment_log.read_records(marker_dir)
+        ]
+        return rows, 0
+
+    with open(os.path.join(marker_dir, "index.json"), "r", encoding="utf-8") as f:
+        index = json.load(f)
+    rows:    list[tuple] = []
+    skipped: int         = 0
+    for entry in index.get("entries", []):
+        file_path = os.path.join(marker_dir, entry["file"])
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                dp = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            skipped += 1
+            continue
+        rows.append((dp["measured_at"], dp["value"], dp.get("unit"), dp.get("data_quality"), dp.get("created_at", "")))
+    return rows, skipped
+
+
+def _create_staging(conn) -> None:
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS datapoint_staging (
+            table_name   TEXT NOT NULL,
+            measured_at  TEXT NOT NULL,
+            value        REAL NOT NULL,
+            unit         TEXT,
+            data_quality TEXT,
+            created_at   TEXT NOT NULL
+        )
+    """)
+    conn.execute("DELETE FROM datapoint_staging")
+
+
+def _merge_staging(conn, tables: dict[str, tuple[str, str, str]]) -> None:
+    """
+    Folds the staged rows into their target tables (table name → (subject, module, marker)),
+    one set-based upsert per table, and recomputes each table's dataset_stats row and rollups.
+    """
+    for table, (subject_id, module_id, marker_id) in tables.items():
+        _ensure_datapoint_table(conn, table)
+        # ORDER BY rowid keeps "last staged row wins" for duplicate measured_at values.
+        conn.execute(
+            f'INSERT INTO "{table}" (measured_at, value, unit, data_quality, created_at) '
+            f'SELECT measured_at, value, unit, data_quality, created_at FROM datapoint_staging '
+            f'WHERE table_name = ? ORDER BY rowid '
+            f'ON CONFLICT(measured_at) DO UPDATE SET '
+            f'value=excluded.value, unit=excluded.unit, data_quality=excluded.data_quality, created_at=excluded.created_at',
+            (table,),
+        )
+        refresh_dataset_stats(conn, subject_id, module_id, marker_id)
+        refresh_datapoint_rollups(conn, subject_id, module_id, marker_id)
+    conn.execute("DELETE FROM datapoint_staging")
+
+
+def load_datapoints_into(
+    conn,
+    rawdata_root: str,
+    subject_ids:  list[str] | None = None,
+    workers:      int              = DEFAULT_WORKERS,
+) -> dict:
+    """
+    Bulk-loads datapoints for the given subjects (all subjects if None) through an open connection.
+    Commits after every batch. Returns throughput stats.
+    """
+    started  = time.perf_counter()
+    stats    = {"markers": 0, "datapoints": 0, "skipped_files": 0, "failed_markers": 0}
+    targets  = _iter_marker_dirs(rawdata_root, subject_ids)  # lazy — directories are walked as the pool drains
+
+    _create_staging(conn)
+    pending_tables: dict[str, tuple[str, str, str]] = {}
+    pending_rows = 0
+
+    # At most 2 × workers markers are read ahead of the writer so memory stays bounded.
+    workers  = max(1, workers)
+    in_flight: deque = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            while len(in_flight) < workers * 2:
+                nxt = next(targets, None)
+                if nxt is None:
+                    break
+                subject_id, module_id, marker_id, marker_dir = nxt
+                in_flight.append((subject_id, module_id, marker_id, pool.submit(read_marker_rows, marker_dir)))
+            if not in_flight:
+                break
+
+            subject_id, module_id, marker_id, future = in_flight.popleft()
+            try:
+                rows, skipped = future.result()
+            except Exception as exc:
+                logger.warning("Skipping marker %s/%s/%s: %s", subject_id, module_id, marker_id, exc)
+                stats["failed_markers"] += 1
+                continue
+            table = _datapoint_table(subject_id, module_id, marker_id)
+            conn.executemany(
+                "INSERT INTO datapoint_staging (table_name, measured_at, value, unit, data_quality, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(table, *row) for row in rows],
+            )
+            pending_tables[table] = (subject_id, module_id, marker_id)
+            pending_rows            += len(rows)
+            stats["markers"]        += 1
+            stats["datapoints"]     += len(rows)
+            stats["skipped_files"]  += skipped
+
+            if pending_rows >= BATCH_ROWS:
+                _merge_staging(conn, pending_tables)
+                conn.commit()
+                pending_tables.clear()
+                pending_rows = 0
+
+    _merge_staging(conn, pending_tables)
+    conn.commit()
+
+    elapsed = time.perf_counter() - started
+    stats["seconds"]           = round(elapsed, 3)
+    stats["points_per_second"] = round(stats["datapoints"] / elapsed, 1) if elapsed > 0 else 0.0
+    return stats
+
+
+def reconcile_marker(conn, rawdata_root: str, subject_id: str, module_id: str, marker_id: str) -> int:
+    """
+    Makes one marker's table mirror its directory exactly: upserts every datapoint on disk and deletes
+    rows that are no longer stored. Drops the table if the marker's data is gone.
+    Used by the filesystem watcher; the caller commits. Returns the number of rows on disk.
+    """
+    table      = _datapoint_table(subject_id, module_id, marker_id)
+    marker_dir = os.path.join(rawdata_root, subject_id, module_id, marker_id)
+    if not has_marker_data(marker_dir):
+        conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+        refresh_dataset_stats(conn, subject_id, module_id, marker_id)
+        refresh_datapoint_rollups(conn, subject_id, module_id, marker_id)
+        return 0
+
+    rows, _ = read_marker_rows(marker_dir)
+    _create_staging(conn)
+    conn.executemany(
+        "INSERT INTO datapoint_staging (table_name, measured_at, value, unit, data_quality, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [(table, *row) for row in rows],
+    )
+    if _table_exists(conn, table):
+        conn.execute(
+            f'DELETE FROM "{table}" WHERE measured_at NOT IN '
+            f'(SELECT measured_at FROM datapoint_staging WHERE table_name = ?)',
+            (table,),
+        )
+    _merge_staging(conn, {table: (subject_id, module_id, marker_id)})
+    return len(rows)
+
+
+def _table_exists(conn, table: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)
+    ).fetchone() is not None
+
+
+def datapoint_tables_with_prefix(conn, prefix: str) -> list[str]:
+    """Names of datapoint tables starting with prefix (e.g. "subject_001__" or "subject_001__fitness__")."""
+    rows = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND substr(name, 1, ?) = ?",
+        (len(prefix), prefix),
+    ).fetchall()
+    return [r["name"] for r in rows]
+
+
+def purge_subject(conn, subject_id: str) -> int:
+    """
+    Removes everything mirrored for a subject: its datapoint tables and its dataset_stats and
+    datapoint_rollups rows. Used by deleteSubject and prune_deleted_subjects; the caller commits,
+    so the purge lands in the same transaction as the subjects row delete. Returns the tables dropped.
+    """
+    tables = datapoint_tables_with_prefix(conn, f"{subject_id}__")
+    for table in tables:
+        conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+    conn.execute("DELETE FROM dataset_stats WHERE subject_id=?", (subject_id,))
+    conn.execute("DELETE FROM datapoint_rollups WHERE subject_id=?", (subject_id,))
+    return len(tables)
+
+
+def prune_deleted_subjects(db_path: str, rawdata_root: str) -> list[str]:
+    """
+    Purges subjects that are mirrored in SQLite but no longer have a directory under rawdata_root,
+    e.g. left behind when deleteSubject moved the directory but the DB cleanup never ran.
+    Called from the background startup sync; returns the subject ids it removed.
+    """
+    on_disk = set(os.listdir(rawdata_root)) if os.path.isdir(rawdata_root) else set()
+    with get_connection(db_path) as conn:
+        mirrored = {
+            r["subject_id"] for r in conn.execute(
+                "SELECT subject_id FROM subjects UNION SELECT subject_id FROM dataset_stats "
+                "UNION SELECT subject_id FROM datapoint_rollups"
+            )
+        }
+        for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND instr(name, '__') > 0"):
+            parts = r["name"].split("__")
+            if len(parts) == 3:
+                mirrored.add(parts[0])
+        removed = sorted(mirrored - on_disk)
+        for subject_id in removed:
+            purge_subject(conn, subject_id)
+            conn.execute("DELETE FROM subjects WHERE subject_id = ?", (subject_id,))
+        conn.commit()
+    if removed:
+        logger.info("Pruned %d deleted subject(s) from SQLite: %s", len(removed), ", ".join(removed))
+    return removed
+
+
+def load_datapoints(
+    db_path:      str,
+    rawdata_root: str,
+    subject_ids:  list[str] | None = None,
+    workers:      int              = DEFAULT_WORKERS,
+) -> dict:
+    """Opens its own connection and bulk-loads datapoints. See load_datapoints_into()."""
+    with get_connection(db_path) as conn:
+        stats = load_datapoints_into(conn, rawdata_root, subject_ids, workers)
+    logger.info(
+        "Bulk-loaded %d datapoints from %d markers in %.2fs (%.0f points/s, %d files skipped).",
+        stats["datapoints"], stats["markers"], stats["seconds"],
+        stats["points_per_second"], stats["skipped_files"],
+    )
+    return stats
+
+
+# ── CLI ────────────────────────────────────────────────────────────────────────
+
+def main(argv: list[str] | None = None) -> None:
+    from backend.startup.database_logistics import init_db
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    data_dir  = os.path.join(repo_root, "data")
+
+    parser = argparse.ArgumentParser(description="Bulk-load raw_data datapoints into the asHDT SQLite mirror.")
+    parser.add_argument("--db",       default=os.path.join(data_dir, "databases", "asHDT.db"), help="SQLite database path")
+    parser.add_argument("--raw-data", default=os.path.join(data_dir, "raw_data"),              help="raw_data archive root")
+    parser.add_argument("--subject",  action="append", dest="subjects",                         help="only load this subject (repeatable)")
+    parser.add_argument("--workers",  type=int, default=DEFAULT_WORKERS,                        help="parallel marker readers")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    init_db(args.db)
+    stats = load_datapoints(args.db, args.raw_data, args.subjects, args.workers)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
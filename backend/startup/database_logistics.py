@@ -4,6 +4,8 @@ import sqlite3
 import os
 import json
 
+from backend.core.telemetry import TimedConnection
+
 def init_db (db_path: str) -> None:
     os.makedirs(os.path.dirname(db_path), exist_ok=True) # safe to call even if dir already exists
     with get_connection(db_path) as conn: # connect to (or create) db file
@@ -38,6 +40,11 @@ def init_db (db_path: str) -> None:
                 vulnerability_margin     REAL NOT NULL
             )
         """)
+        # Keyset pagination of a subject's reports (analysisReportsConnection) seeks on this index.
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_timegraph_reports_subject "
+            "ON timegraph_reports (subject_id, requested_at, report_id)"
+        )
         # Table 3: Zone boundaries
         conn.execute("""
             CREATE TABLE IF NOT EXISTS zone_references (
@@ -96,6 +103,98 @@ def init_db (db_path: str) -> None:
                 FOREIGN KEY (subject_id) REFERENCES subjects(subject_id)
             )
         """)
+        # Table 8: Per-dataset summary (one row per subject/module/marker datapoint table).
+        # Kept in step with the datapoint tables by the datapoint mutations, bulk ingest and sync,
+        # in the same transaction as the datapoint writes — see add_dataset_stats / refresh_dataset_stats.
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS dataset_stats (
+                subject_id        TEXT NOT NULL,
+                module_id         TEXT NOT NULL,
+                marker_id         TEXT NOT NULL,
+                count             INTEGER NOT NULL,
+                first_measured_at TEXT,
+                last_measured_at  TEXT,
+                min_value         REAL,
+                max_value         REAL,
+                sum_value         REAL NOT NULL DEFAULT 0,
+                mean_value        REAL,
+                last_value        REAL,
+                updated_at        TEXT NOT NULL,
+                PRIMARY KEY (subject_id, module_id, marker_id)
+            )
+        """)
+        # Table 9: Precomputed hourly/daily/weekly rollups of every datapoint table (bucket_start is UTC).
+        # Serves the downsampled datapoints query; maintained alongside dataset_stats — see add_datapoint_rollups.
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS datapoint_rollups (
+                subject_id   TEXT NOT NULL,
+                module_id    TEXT NOT NULL,
+                marker_id    TEXT NOT NULL,
+                resolution   TEXT NOT NULL,
+                bucket_start TEXT NOT NULL,
+                count        INTEGER NOT NULL,
+                min_value    REAL NOT NULL,
+                max_value    REAL NOT NULL,
+                sum_value    REAL NOT NULL,
+                PRIMARY KEY (subject_id, module_id, marker_id, resolution, bucket_start)
+            )
+        """)
+        # Table 10: Change counters for catalog tables that processes keep in-memory copies of
+        # (see core/storage/zone_tables.py, core/storage/markerset_reader.py). Bumped by triggers, so
+        # every writer — API mutations, startup sync, the watcher, another process, a hand edit —
+        # invalidates those copies.
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS catalog_versions (
+                name     TEXT PRIMARY KEY,
+                version  INTEGER NOT NULL
+            )
+        """)
+        for table, name in (
+            ("zone_references",     "zone_references"),
+            ("markerset_templates", "markersets"),
+            ("markerset_instances", "markersets"),
+        ):
+            conn.execute("INSERT OR IGNORE INTO catalog_versions (name, version) VALUES (?, 0)", (name,))
+            for op in ("INSERT", "UPDATE", "DELETE"):
+                conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {table}_version_{op.lower()}
+                    AFTER {op} ON {table}
+                    BEGIN
+                        UPDATE catalog_versions SET version = version + 1 WHERE name = '{name}';
+                    END
+                """)
+        # Data versions for the GraphQL response cache (backend/graphql/response_cache.py), in the same
+        # table: 'data:all' changes on every write below, 'data:catalog' on writes to tables shared by all
+        # subjects, and 'data:subject:{id}' on writes to that subject's stats, reports and instances.
+        # dataset_stats is updated in the same transaction as every datapoint write, so it stands in for
+        # the per-marker datapoint tables.
+        for name in ("data:all", "data:catalog"):
+            conn.execute("INSERT OR IGNORE INTO catalog_versions (name, version) VALUES (?, 0)", (name,))
+        bump = "UPDATE catalog_versions SET version = version + 1 WHERE name = '{}';"
+        bump_subject = (
+            "INSERT INTO catalog_versions (name, version) VALUES ('data:subject:' || {}.subject_id, 1) "
+            "ON CONFLICT(name) DO UPDATE SET version = version + 1;"
+        )
+        for table in ("subjects", "modules", "markers", "zone_references", "markerset_templates"):
+            for op in ("INSERT", "UPDATE", "DELETE"):
+                conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {table}_data_version_{op.lower()}
+                    AFTER {op} ON {table}
+                    BEGIN
+                        {bump.format("data:catalog")}
+                        {bump.format("data:all")}
+                    END
+                """)
+        for table in ("dataset_stats", "timegraph_reports", "markerset_instances"):
+            for op, rows in (("INSERT", ("NEW",)), ("UPDATE", ("NEW", "OLD")), ("DELETE", ("OLD",))):
+                conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {table}_data_version_{op.lower()}
+                    AFTER {op} ON {table}
+                    BEGIN
+                        {" ".join(bump_subject.format(row) for row in rows)}
+                        {bump.format("data:all")}
+                    END
+                """)
         # Runtime migrations for existing DBs
         try:
             conn.execute("ALTER TABLE modules ADD COLUMN module_name TEXT")
@@ -108,11 +207,25 @@ def init_db (db_path: str) -> None:
         conn.commit()
 
 # Opens connection to the SQLite db defined at db_path. sqlite.row makes columns accessible by name, not just by index position
+# TimedConnection (backend/core/telemetry.py) times statements inside traced requests and records write-lock waits.
 def get_connection(db_path: str) -> sqlite3.Connection:
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(db_path, factory=TimedConnection)
     conn.row_factory = sqlite3.Row
     return conn
 
+# Current change counter of a catalog table (Table 10); 0 if it has never been written.
+def catalog_version(conn, name: str) -> int:
+    row = conn.execute("SELECT version FROM catalog_versions WHERE name = ?", (name,)).fetchone()
+    return row["version"] if row else 0
+
+# Several Table 10 counters at once, in the order given (0 for names never written).
+def catalog_versions(conn, names: list[str]) -> list[int]:
+    rows = conn.execute(
+        f"SELECT name, version FROM catalog_versions WHERE name IN ({','.join('?' * len(names))})", names
+    ).fetchall()
+    found = {r["name"]: r["version"] for r in rows}
+    return [found.get(name, 0) for name in names]
+
 # Scans all subject directories and upserts individual profile data into the subjects table of asHDT.db
 def sync_subjects(db_path: str, rawdata_root: str):
     with get_connection(db_path) as conn:
@@ -122,33 +235,48 @@ def sync_subjects(db_path: str, rawdata_root: str):
                 continue
             with open(profile_path, "r") as f:
                 p = json.load(f)
-            conn.execute(
-                """
-                INSERT INTO subjects (subject_id, first_name, last_name, sex, dob, email, phone, notes, created_at)
-                VALUES (:subject_id, :first_name, :last_name, :sex, :dob, :email, :phone, :notes, :created_at)
-                ON CONFLICT(subject_id) DO UPDATE SET
-                    first_name = excluded.first_name,
-                    last_name  = excluded.last_name,
-                    sex        = excluded.sex,
-                    dob        = excluded.dob,
-                    email      = excluded.email,
-                    phone      = excluded.phone,
-                    notes      = excluded.notes
-                """,
-                {
-                    "subject_id": p.get("subject_id"),
-                    "first_name": p.get("first_name"),
-                    "last_name":  p.get("last_name"),
-                    "sex":        p.get("sex"),
-                    "dob":        p.get("dob"),
-                    "email":      p.get("email"),
-                    "phone":      p.get("phone"),
-                    "notes":      p.get("notes"),
-                    "created_at": p.get("created_at", ""),
-                },
-            )
+            _upsert_subject_profile(conn, p)
         conn.commit()
 
+def _upsert_subject_profile(conn, p: dict):
+    conn.execute(
+        """
+        INSERT INTO subjects (subject_id, first_name, last_name, sex, dob, email, phone, notes, created_at)
+        VALUES (:subject_id, :first_name, :last_name, :sex, :dob, :email, :phone, :notes, :created_at)
+        ON CONFLICT(subject_id) DO UPDATE SET
+            first_name = excluded.first_name,
+            last_name  = excluded.last_name,
+            sex        = excluded.sex,
+            dob        = excluded.dob,
+            email      = excluded.email,
+            phone      = excluded.phone,
+            notes      = excluded.notes
+        """,
+        {
+            "subject_id": p.get("subject_id"),
+            "first_name": p.get("first_name"),
+            "last_name":  p.get("last_name"),
+            "sex":        p.get("sex"),
+            "dob":        p.get("dob"),
+            "email":      p.get("email"),
+            "phone":      p.get("phone"),
+            "notes":      p.get("notes"),
+            "created_at": p.get("created_at", ""),
+        },
+    )
+
+# Re-syncs one subject's profile row: upserts it if profile.json exists, deletes the row otherwise.
+# Used by the filesystem watcher (backend/startup/fs_watcher.py).
+def reconcile_subject_profile(conn, rawdata_root: str, subject_id: str):
+    profile_path = os.path.join(rawdata_root, subject_id, "profile.json")
+    if not os.path.isfile(profile_path):
+        conn.execute("DELETE FROM subjects WHERE subject_id = ?", (subject_id,))
+        return
+    with open(profile_path, "r", encoding="utf-8") as f:
+        p = json.load(f)
+    p.setdefault("subject_id", subject_id)
+    _upsert_subject_profile(conn, p)
+
 # Reads module_list.json and upserts every module and marker into the modules/markers tables
 def sync_modules(db_path: str, modules_path: str):
     if not os.path.isfile(modules_path):
@@ -171,6 +299,24 @@ def sync_modules(db_path: str, modules_path: str):
                 )
         conn.commit()
 
+# Like sync_modules, but also removes modules/markers that are no longer listed in module_list.json.
+# Used by the filesystem watcher when module_list.json is edited outside the API.
+def reconcile_modules(db_path: str, modules_path: str):
+    if not os.path.isfile(modules_path):
+        return
+    sync_modules(db_path, modules_path)
+    with open(modules_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    listed_modules = [mod["module_id"] for mod in data.get("modules", [])]
+    listed_markers = {(mod["module_id"], mk["marker_id"]) for mod in data.get("modules", []) for mk in mod.get("markers", [])}
+    with get_connection(db_path) as conn:
+        for row in conn.execute("SELECT module_id, marker_id FROM markers").fetchall():
+            if (row["module_id"], row["marker_id"]) not in listed_markers:
+                conn.execute("DELETE FROM markers WHERE module_id=? AND marker_id=?", (row["module_id"], row["marker_id"]))
+        placeholders = ",".join("?" * len(listed_modules))
+        conn.execute(f"DELETE FROM modules WHERE module_id NOT IN ({placeholders})", listed_modules)
+        conn.commit()
+
 def _datapoint_table(subject_id: str, module_id: str, marker_id: str) -> str:
     """Returns the DB table name for a given (subject, module, marker) triple."""
     return f"{subject_id}__{module_id}__{marker_id}"
@@ -188,41 +334,143 @@ def _ensure_datapoint_table(conn, table_name: str):
         )
     """)
 
-# Walks every index.json under rawdata_root and upserts all datapoints into per-subject-marker tables
-def sync_datapoints(db_path: str, rawdata_root: str):
-    if not os.path.isdir(rawdata_root):
+# Folds newly inserted datapoints (rows of (measured_at, value, ...)) into a dataset's stats row.
+# Only valid for rows that did not exist before; updates and deletes use refresh_dataset_stats instead.
+def add_dataset_stats(conn, subject_id: str, module_id: str, marker_id: str, rows: list[tuple]):
+    if not rows:
         return
-    with get_connection(db_path) as conn:
-        for subject_id in os.listdir(rawdata_root):
-            subject_dir = os.path.join(rawdata_root, subject_id)
-            if not os.path.isdir(subject_dir):
-                continue
-            for module_id in os.listdir(subject_dir):
-                module_dir = os.path.join(subject_dir, module_id)
-                if not os.path.isdir(module_dir):
-                    continue
-                for marker_id in os.listdir(module_dir):
-                    marker_dir = os.path.join(module_dir, marker_id)
-                    index_path = os.path.join(marker_dir, "index.json")
-                    if not os.path.isfile(index_path):
-                        continue
-                    with open(index_path, "r", encoding="utf-8") as f:
-                        index = json.load(f)
-                    table = _datapoint_table(subject_id, module_id, marker_id)
-                    _ensure_datapoint_table(conn, table)
-                    for entry in index.get("entries", []):
-                        file_path = os.path.join(marker_dir, entry["file"])
-                        if not os.path.isfile(file_path):
-                            continue
-                        with open(file_path, "r", encoding="utf-8") as f:
-                            dp = json.load(f)
-                        conn.execute(
-                            f'INSERT INTO "{table}" (measured_at, value, unit, data_quality, created_at) '
-                            f'VALUES (?, ?, ?, ?, ?) ON CONFLICT(measured_at) DO UPDATE SET '
-                            f'value=excluded.value, unit=excluded.unit, data_quality=excluded.data_quality, created_at=excluded.created_at',
-                            (dp["measured_at"], dp["value"], dp.get("unit"), dp.get("data_quality"), dp.get("created_at", "")),
-                        )
-        conn.commit()
+    values = [float(r[1]) for r in rows]
+    first  = min(rows, key=lambda r: r[0])
+    last   = max(rows, key=lambda r: r[0])
+    conn.execute(
+        "INSERT INTO dataset_stats (subject_id, module_id, marker_id, count, first_measured_at, last_measured_at, "
+        "min_value, max_value, sum_value, mean_value, last_value, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%fZ', 'now')) "
+        "ON CONFLICT(subject_id, module_id, marker_id) DO UPDATE SET "
+        "count             = count + excluded.count, "
+        "first_measured_at = COALESCE(MIN(first_measured_at, excluded.first_measured_at), excluded.first_measured_at), "
+        "last_measured_at  = COALESCE(MAX(last_measured_at, excluded.last_measured_at), excluded.last_measured_at), "
+        "min_value         = COALESCE(MIN(min_value, excluded.min_value), excluded.min_value), "
+        "max_value         = COALESCE(MAX(max_value, excluded.max_value), excluded.max_value), "
+        "sum_value         = sum_value + excluded.sum_value, "
+        "mean_value        = (sum_value + excluded.sum_value) / (count + excluded.count), "
+        "last_value        = CASE WHEN last_measured_at IS NULL OR excluded.last_measured_at >= last_measured_at "
+        "                         THEN excluded.last_value ELSE last_value END, "
+        "updated_at        = excluded.updated_at",
+        (
+            subject_id, module_id, marker_id, len(rows), first[0], last[0],
+            min(values), max(values), sum(values), sum(values) / len(values), float(last[1]),
+        ),
+    )
+
+# Recomputes a dataset's stats row from its datapoint table (removes the row if the table is gone).
+def refresh_dataset_stats(conn, subject_id: str, module_id: str, marker_id: str):
+    table = _datapoint_table(subject_id, module_id, marker_id)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone() is None:
+        delete_dataset_stats(conn, subject_id, module_id, marker_id)
+        return
+    conn.execute(f"""
+        INSERT OR REPLACE INTO dataset_stats (subject_id, module_id, marker_id, count, first_measured_at,
+            last_measured_at, min_value, max_value, sum_value, mean_value, last_value, updated_at)
+        SELECT ?, ?, ?, COUNT(*), MIN(measured_at), MAX(measured_at), MIN(value), MAX(value),
+               COALESCE(SUM(value), 0), AVG(value),
+               (SELECT value FROM "{table}" ORDER BY measured_at DESC LIMIT 1),
+               strftime('%Y-%m-%dT%H:%M:%fZ', 'now')
+        FROM "{table}"
+    """, (subject_id, module_id, marker_id))
+
+def delete_dataset_stats(conn, subject_id: str, module_id: str, marker_id: str):
+    conn.execute(
+        "DELETE FROM dataset_stats WHERE subject_id=? AND module_id=? AND marker_id=?",
+        (subject_id, module_id, marker_id),
+    )
+
+# SQL expression mapping a measured_at column/parameter to its UTC bucket start, per rollup resolution,
+# and how many days past the bucket start a bucket can reach (used to bound index range scans).
+ROLLUP_BUCKETS = {
+    "hour": ("strftime('%Y-%m-%dT%H:00:00Z', {})",                        1),
+    "day":  ("strftime('%Y-%m-%dT00:00:00Z', {})",                        1),
+    "week": ("strftime('%Y-%m-%dT00:00:00Z', {}, 'weekday 0', '-6 days')", 7),  # weeks start on Monday
+}
+
+# Folds newly inserted datapoints (rows of (measured_at, value, ...)) into a dataset's rollup buckets.
+# Only valid for rows that did not exist before; updates and deletes use refresh_datapoint_rollups instead.
+def add_datapoint_rollups(conn, subject_id: str, module_id: str, marker_id: str, rows: list[tuple]):
+    if not rows:
+        return
+    for resolution, (bucket, _) in ROLLUP_BUCKETS.items():
+        conn.executemany(
+            f"INSERT INTO datapoint_rollups (subject_id, module_id, marker_id, resolution, bucket_start, "
+            f"count, min_value, max_value, sum_value) "
+            f"SELECT ?, ?, ?, ?, b, 1, v, v, v FROM (SELECT {bucket.format('?')} AS b, ? AS v) WHERE b IS NOT NULL "
+            f"ON CONFLICT(subject_id, module_id, marker_id, resolution, bucket_start) DO UPDATE SET "
+            f"count     = count + 1, "
+            f"min_value = MIN(min_value, excluded.min_value), "
+            f"max_value = MAX(max_value, excluded.max_value), "
+            f"sum_value = sum_value + excluded.sum_value",
+            [(subject_id, module_id, marker_id, resolution, r[0], float(r[1])) for r in rows],
+        )
+
+# Recomputes a dataset's rollups from its datapoint table. With measured_ats, only the buckets containing
+# those timestamps are rebuilt (what an update or delete touches); without, every bucket is.
+def refresh_datapoint_rollups(
+    conn, subject_id: str, module_id: str, marker_id: str, measured_ats: list[str] | None = None,
+):
+    table = _datapoint_table(subject_id, module_id, marker_id)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone() is None:
+        delete_datapoint_rollups(conn, subject_id, module_id, marker_id)
+        return
+    key = (subject_id, module_id, marker_id)
+    if measured_ats is None:
+        delete_datapoint_rollups(conn, subject_id, module_id, marker_id)
+        for resolution, (bucket, _) in ROLLUP_BUCKETS.items():
+            expr = bucket.format("measured_at")
+            conn.execute(f"""
+                INSERT INTO datapoint_rollups (subject_id, module_id, marker_id, resolution, bucket_start,
+                    count, min_value, max_value, sum_value)
+                SELECT ?, ?, ?, ?, {expr} AS b, COUNT(*), MIN(value), MAX(value), SUM(value)
+                FROM "{table}" WHERE b IS NOT NULL GROUP BY b
+            """, (*key, resolution))
+        return
+    for resolution, (bucket, span_days) in ROLLUP_BUCKETS.items():
+        starts = {
+            row[0] for row in (
+                conn.execute(f"SELECT {bucket.format('?')}", (m,)).fetchone() for m in measured_ats
+            ) if row[0] is not None
+        }
+        expr = bucket.format("measured_at")
+        for start in starts:
+            conn.execute(
+                "DELETE FROM datapoint_rollups WHERE subject_id=? AND module_id=? AND marker_id=? "
+                "AND resolution=? AND bucket_start=?",
+                (*key, resolution, start),
+            )
+            # measured_at strings may carry UTC offsets, so scan a day either side of the bucket
+            # through the measured_at index and let the bucket expression pick the exact members.
+            conn.execute(f"""
+                INSERT INTO datapoint_rollups (subject_id, module_id, marker_id, resolution, bucket_start,
+                    count, min_value, max_value, sum_value)
+                SELECT ?, ?, ?, ?, ?, COUNT(*), MIN(value), MAX(value), SUM(value)
+                FROM "{table}"
+                WHERE measured_at >= date(?, '-1 day') AND measured_at < date(?, '+{span_days + 1} days')
+                  AND {expr} = ?
+                HAVING COUNT(*) > 0
+            """, (*key, resolution, start, start, start, start))
+
+def delete_datapoint_rollups(conn, subject_id: str, module_id: str, marker_id: str):
+    conn.execute(
+        "DELETE FROM datapoint_rollups WHERE subject_id=? AND module_id=? AND marker_id=?",
+        (subject_id, module_id, marker_id),
+    )
+
+# Walks every marker dataset (segment log or legacy index.json) under rawdata_root and upserts all datapoints into per-subject-marker tables.
+# Delegates to the parallel bulk loader (backend/startup/bulk_loader.py); returns its throughput stats.
+# subject_ids limits the sync to those subjects — the background startup sync passes one at a time.
+def sync_datapoints(db_path: str, rawdata_root: str, subject_ids: list[str] | None = None) -> dict:
+    from backend.startup.bulk_loader import load_datapoints
+    if not os.path.isdir(rawdata_root):
+        return {}
+    return load_datapoints(db_path, rawdata_root, subject_ids)
 
 # Scans marker reference range jsons and upserts into zone_references table on startup
 def sync_zone_references(db_path: str, references_root: str):
@@ -239,32 +487,46 @@ def sync_zone_references(db_path: str, references_root: str):
                 marker_id = filename[:-5]
                 with open(os.path.join(module_dir, filename), "r") as f:
                     data = json.load(f)
-                    if "generic" in data:
-                        g = data["generic"]
-                        # Delete+insert for generic row (NULL sex/age can't use ON CONFLICT)
-                        conn.execute(
-                            "DELETE FROM zone_references WHERE module_id=? AND marker_id=? AND sex IS NULL AND age IS NULL",
-                            (module_id, marker_id),
-                        )
-                        conn.execute(
-                            "INSERT INTO zone_references (module_id, marker_id, sex, age, healthy_min, healthy_max, vulnerability_margin) "
-                            "VALUES (?, ?, NULL, NULL, ?, ?, ?)",
-                            (module_id, marker_id, g["healthy_min"], g["healthy_max"], g["vulnerability_margin"]),
-                        )
-                    # Upsert per-sex per-age rows
-                    for sex, sex_data in data.get("by_sex", {}).items():
-                        for age_str, vals in sex_data.get("by_age", {}).items():
-                            conn.execute(
-                                """
-                                INSERT INTO zone_references (module_id, marker_id, sex, age, healthy_min,
-                                  healthy_max, vulnerability_margin)
-                                VALUES (?, ?, ?, ?, ?, ?, ?)
-                                ON CONFLICT(module_id, marker_id, sex, age) DO UPDATE SET
-                                    healthy_min          = excluded.healthy_min,
-                                    healthy_max          = excluded.healthy_max,
-                                    vulnerability_margin = excluded.vulnerability_margin
-                                """,
-                                (module_id, marker_id, sex, int(age_str), vals["healthy_min"],
-                                 vals["healthy_max"], vals["vulnerability_margin"]),
-                            )
-        conn.commit()
\ No newline at end of file
+                _upsert_zone_reference_data(conn, module_id, marker_id, data)
+        conn.commit()
+
+def _upsert_zone_reference_data(conn, module_id: str, marker_id: str, data: dict):
+    if "generic" in data:
+        g = data["generic"]
+        # Delete+insert for generic row (NULL sex/age can't use ON CONFLICT)
+        conn.execute(
+            "DELETE FROM zone_references WHERE module_id=? AND marker_id=? AND sex IS NULL AND age IS NULL",
+            (module_id, marker_id),
+        )
+        conn.execute(
+            "INSERT INTO zone_references (module_id, marker_id, sex, age, healthy_min, healthy_max, vulnerability_margin) "
+            "VALUES (?, ?, NULL, NULL, ?, ?, ?)",
+            (module_id, marker_id, g["healthy_min"], g["healthy_max"], g["vulnerability_margin"]),
+        )
+    # Upsert per-sex per-age rows
+    for sex, sex_data in data.get("by_sex", {}).items():
+        for age_str, vals in sex_data.get("by_age", {}).items():
+            conn.execute(
+                """
+                INSERT INTO zone_references (module_id, marker_id, sex, age, healthy_min,
+                  healthy_max, vulnerability_margin)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(module_id, marker_id, sex, age) DO UPDATE SET
+                    healthy_min          = excluded.healthy_min,
+                    healthy_max          = excluded.healthy_max,
+                    vulnerability_margin = excluded.vulnerability_margin
+                """,
+                (module_id, marker_id, sex, int(age_str), vals["healthy_min"],
+                 vals["healthy_max"], vals["vulnerability_margin"]),
+            )
+
+# Replaces every zone_references row of one marker with the contents of its reference JSON
+# (or removes them if the file is gone). Used by the filesystem watcher.
+def reconcile_zone_reference(conn, references_root: str, module_id: str, marker_id: str):
+    conn.execute("DELETE FROM zone_references WHERE module_id=? AND marker_id=?", (module_id, marker_id))
+    ref_path = os.path.join(references_root, module_id, f"{marker_id}.json")
+    if not os.path.isfile(ref_path):
+        return
+    with open(ref_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    _upsert_zone_reference_data(conn, module_id, marker_id, data)
@@ -0,0 +1,226 @@
+# Optional watcher that picks up changes made to the data sources outside the API — e.g. instrument
+# export scripts dropping datapoint files into raw_data/, or someone editing a reference range JSON or
+# module_list.json by hand — and applies them incrementally to the SQLite mirror and in-memory state.
+# Without it, such changes stay invisible until the next restart re-runs the full startup sync.
+#
+# Enabled by setting ASHDT_WATCH_DATA=1 before starting the server. Requires the `watchfiles` package
+# (installed with uvicorn[standard]); if it is missing the watcher logs a warning and stays off.
+#
+# Changes are batched by watchfiles (debounced) and reduced to the smallest units that need re-syncing:
+#   raw_data/{subject}/profile.json             → subject row
+#   raw_data/{subject}/{module}/{marker}/...    → that marker's datapoint table (full reconcile)
+#   raw_data/{subject} or /{module} (dir)       → every marker under it, plus the profile row
+#   reference_ranges/{module}/{marker}.json     → that marker's zone_references rows
+#   module_list.json                            → modules/markers tables and app.state.modules
+# Files that only ever change as a side effect of a write are ignored: marker .lock files, temp files
+# (*.tmp, including atomic_write's), segment footers (base.idx.json) and columnar .npy generations.
+# The API's own writes are skipped too: data_writer registers each write with index_cache.MIRRORED,
+# and a marker whose files still have the signature recorded there is already mirrored. Every reconcile
+# is idempotent, so a write that is reconciled anyway (e.g. interleaved with an external change) is
+# harmless. Reconciled markers are also dropped from the in-process index cache
+# (core/storage/index_cache.py), and reconciled reference files drop the in-memory zone tables
+# (core/storage/zone_tables.py).
+
+from __future__ import annotations
+import asyncio
+import logging
+import os
+
+from backend.startup.database_logistics import (
+    get_connection,
+    reconcile_subject_profile,
+    reconcile_zone_reference,
+    reconcile_modules,
+)
+from backend.startup.bulk_loader import reconcile_marker, datapoint_tables_with_prefix
+from backend.core.storage import segment_log
+from backend.core.storage.index_cache import INDEX_CACHE, MIRRORED, marker_signature
+from backend.core.storage.marker_lock import LOCK_FILE
+from backend.startup.module_loader import load_modules
+
+logger = logging.getLogger(__name__)
+
+WATCH_ENABLED  = os.environ.get("ASHDT_WATCH_DATA", "").lower() in ("1", "true", "yes")
+WATCH_DEBOUNCE = int(os.environ.get("ASHDT_WATCH_DEBOUNCE_MS", "500"))
+
+
+def _split(path: str, root: str) -> list[str] | None:
+    """Path components of `path` relative to `root`, or None if it lies outside root."""
+    rel = os.path.relpath(os.path.abspath(path), os.path.abspath(root))
+    if rel == "." or rel.startswith(".."):
+        return None
+    return rel.split(os.sep)
+
+
+def _is_write_artifact(parts: list[str]) -> bool:
+    """Lock, temp and derived files that change as a side effect of writes, not as data changes."""
+    name = parts[-1]
+    if name == LOCK_FILE or any(p.endswith(".tmp") for p in parts):
+        return True
+    return segment_log.SEGMENTS_DIR in parts and (name == segment_log.FOOTER_FILE or name.endswith(".npy"))
+
+
+def is_watched(path: str, rawdata_root: str, references_root: str, modules_path: str) -> bool:
+    """Whether a changed path can affect the mirror (used as the awatch filter and by classify_changes)."""
+    if os.path.abspath(path) == os.path.abspath(modules_path):
+        return True
+    for root in (rawdata_root, references_root):
+        parts = _split(path, root)
+        if parts is not None:
+            return not _is_write_artifact(parts)
+    return False
+
+
+def classify_changes(
+    paths:           set[str],
+    rawdata_root:    str,
+    references_root: str,
+    modules_path:    str,
+) -> dict:
+    """
+    Reduces a batch of changed paths to the units that need re-syncing:
+        {"subjects": {subject_id}, "prefixes": {(subject_id, module_id)}, "markers": {(s, mod, mk)},
+         "references": {(module_id, marker_id)}, "reference_modules": {module_id}, "modules": bool}
+    """
+    work: dict = {
+        "subjects": set(), "prefixes": set(), "markers": set(),
+        "references": set(), "reference_modules": set(), "modules": False,
+    }
+    for path in paths:
+        if not is_watched(path, rawdata_root, references_root, modules_path):
+            continue
+        if os.path.abspath(path) == os.path.abspath(modules_path):
+            work["modules"] = True
+            continue
+
+        parts = _split(path, rawdata_root)
+        if parts is not None:
+            if len(parts) == 1 or parts[1] == "profile.json":
+                work["subjects"].add(parts[0])
+                if len(parts) == 1:
+                    work["prefixes"].add((parts[0], None))
+            elif len(parts) == 2:
+                work["prefixes"].add((parts[0], parts[1]))
+            else:
+                work["markers"].add((parts[0], parts[1], parts[2]))
+            continue
+
+        parts = _split(path, references_root)
+        if parts is not None:
+            if len(parts) == 1:
+                work["reference_modules"].add(parts[0])
+            elif parts[1].endswith(".json"):
+                work["references"].add((parts[0], parts[1][:-5]))
+    return work
+
+
+def _markers_under(conn, rawdata_root: str, subject_id: str, module_id: str | None) -> set[tuple]:
+    """(subject, module, marker) triples found on disk or in the DB under a subject or subject/module."""
+    found: set[tuple] = set()
+    subject_dir = os.path.join(rawdata_root, subject_id)
+    module_ids  = [module_id] if module_id else (os.listdir(subject_dir) if os.path.isdir(subject_dir) else [])
+    for mod in module_ids:
+        module_dir = os.path.join(subject_dir, mod)
+        if os.path.isdir(module_dir):
+            found.update((subject_id, mod, mk) for mk in os.listdir(module_dir))
+
+    prefix = f"{subject_id}__{module_id}__" if module_id else f"{subject_id}__"
+    for table in datapoint_tables_with_prefix(conn, prefix):
+        parts = table.split("__")
+        if len(parts) == 3:
+            found.add(tuple(parts))
+    return found
+
+
+def apply_changes(
+    app_state,
+    work:            dict,
+    db_path:         str,
+    rawdata_root:    str,
+    references_root: str,
+    modules_path:    str,
+) -> None:
+    """Applies a classified batch of changes. Blocking — run it in a worker thread."""
+    with get_connection(db_path) as conn:
+        for subject_id in work["subjects"]:
+            reconcile_subject_profile(conn, rawdata_root, subject_id)
+
+        markers = set(work["markers"])
+        for subject_id, module_id in work["prefixes"]:
+            markers |= _markers_under(conn, rawdata_root, subject_id, module_id)
+        reconciled = 0
+        for subject_id, module_id, marker_id in markers:
+            marker_dir = os.path.join(rawdata_root, subject_id, module_id, marker_id)
+            if MIRRORED.in_sync(marker_dir):
+                continue  # this process wrote it and mirrored it already
+            signature = marker_signature(marker_dir)
+            INDEX_CACHE.invalidate(marker_dir)
+            reconcile_marker(conn, rawdata_root, subject_id, module_id, marker_id)
+            MIRRORED.reconciled(marker_dir, signature)
+            reconciled += 1
+
+        references = set(work["references"])
+        for module_id in work["reference_modules"]:
+            module_dir = os.path.join(references_root, module_id)
+            if os.path.isdir(module_dir):
+                references.update((module_id, f[:-5]) for f in os.listdir(module_dir) if f.endswith(".json"))
+            rows = conn.execute(
+                "SELECT DISTINCT marker_id FROM zone_references WHERE module_id = ?", (module_id,)
+            ).fetchall()
+            references.update((module_id, r["marker_id"]) for r in rows)
+        for module_id, marker_id in references:
+            reconcile_zone_reference(conn, references_root, module_id, marker_id)
+
+        conn.commit()
+
+    if work["modules"]:
+        reconcile_modules(db_path, modules_path)
+        app_state.modules = load_modules(modules_path)
+
+    logger.info(
+        "Applied external data changes: %d subjects, %d markers, %d reference files%s.",
+        len(work["subjects"]), reconciled, len(references),
+        ", module_list.json" if work["modules"] else "",
+    )
+
+
+async def watch_data_sources(
+    app_state,
+    db_path:         str,
+    rawdata_root:    str,
+    references_root: str,
+    modules_path:    str,
+    stop_event:      asyncio.Event,
+) -> None:
+    """
+    Long-running task started from main.startup() when ASHDT_WATCH_DATA is set.
+    Set stop_event to end it cleanly (cancelling would leave the watchfiles thread behind).
+    """
+    try:
+        from watchfiles import awatch
+    except ImportError:
+        logger.warning("ASHDT_WATCH_DATA is set but the 'watchfiles' package is not installed; watcher disabled.")
+        return
+
+    # module_list.json is watched through its directory: editors often replace the file on save,
+    # which would silently end a watch on the file itself. That directory is backend/startup/, so the
+    # filter drops every other file in it (and write artifacts under the data roots) before batching.
+    watch_paths = [p for p in (rawdata_root, references_root, os.path.dirname(modules_path)) if os.path.isdir(p)]
+    logger.info("Watching %s for external changes.", ", ".join(watch_paths))
+
+    def watch_filter(_change, path: str) -> bool:
+        return is_watched(path, rawdata_root, references_root, modules_path)
+
+    async for changes in awatch(
+        *watch_paths, watch_filter=watch_filter, debounce=WATCH_DEBOUNCE, stop_event=stop_event,
+    ):
+        work = classify_changes({path for _, path in changes}, rawdata_root, references_root, modules_path)
+        if not any(work.values()):
+            continue
+        try:
+            await asyncio.to_thread(
+                apply_changes, app_state, work, db_path, rawdata_root, references_root, modules_path
+            )
+        except Exception as exc:
+            # Keep watching — a half-written file usually produces a follow-up event once complete.
+            logger.error("Failed to apply external data changes: %s", exc, exc_info=True)
@@ -0,0 +1,203 @@
+# Runs the startup sync (profiles, zone references, modules, datapoints → SQLite) in the background
+# so the server can accept connections immediately after a deploy instead of blocking until every
+# datapoint file has been read.
+#
+# The sync happens in two phases:
+#   1. catalog   — subjects, zone_references, modules/markers tables. Small and fast. Subjects whose
+#                  directory is gone are purged from SQLite right after the subjects pass. The in-memory
+#                  zone tables (core/storage/zone_tables.py) are built right after zone_references.
+#   2. datapoints — one subject at a time. Each subject is marked "ready" as soon as its own
+#                   per-marker tables are mirrored, so resolvers for that subject can answer
+#                   right away while the rest of the archive is still being synced.
+#
+# Resolvers call AppContext.require_catalog() / require_subject() (see backend/graphql/context.py),
+# which wait up to SYNC_WAIT_TIMEOUT seconds and then fail with a retryable GraphQL error.
+# A subject that somebody is waiting on jumps to the front of the sync queue.
+
+from __future__ import annotations
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+from backend.core.storage.zone_tables import ZONE_TABLES
+from backend.startup.database_logistics import (
+    sync_subjects,
+    sync_zone_references,
+    sync_modules,
+    sync_datapoints,
+)
+from backend.startup.bulk_loader import prune_deleted_subjects
+
+logger = logging.getLogger(__name__)
+
+SYNC_WAIT_TIMEOUT = float(os.environ.get("SYNC_WAIT_TIMEOUT", "5"))  # seconds a resolver waits before giving up
+
+PENDING = "pending"
+SYNCING = "syncing"
+READY   = "ready"
+FAILED  = "failed"
+
+
+class SyncState:
+    """
+    In-memory progress of the background startup sync. Lives on app.state.sync_state.
+    Only touched from the event loop thread — the blocking sync steps run in worker
+    threads but report back here between steps.
+    """
+
+    def __init__(self) -> None:
+        self.status:      str          = PENDING
+        self.error:       str | None   = None
+        self.started_at:  float | None = None
+        self.finished_at: float | None = None
+        self._subjects:   dict[str, str]           = {}
+        self._events:     dict[str, asyncio.Event] = {}
+        self._queue:      deque[str]               = deque()
+        self._catalog     = asyncio.Event()
+        self._done        = asyncio.Event()
+
+    # ── Progress reporting (called by run_background_sync) ─────────────────────
+
+    def start(self) -> None:
+        self.status     = SYNCING
+        self.started_at = time.monotonic()
+
+    def mark_catalog_ready(self, subject_ids: list[str]) -> None:
+        for sid in subject_ids:
+            self._subjects[sid] = PENDING
+            self._events[sid]   = asyncio.Event()
+            self._queue.append(sid)
+        self._catalog.set()
+
+    def next_subject(self) -> str | None:
+        while self._queue:
+            sid = self._queue.popleft()
+            if self._subjects.get(sid) == PENDING:
+                self._subjects[sid] = SYNCING
+                return sid
+        return None
+
+    def mark_subject(self, subject_id: str, status: str) -> None:
+        self._subjects[subject_id] = status
+        if status in (READY, FAILED):
+            self._events[subject_id].set()
+
+    def finish(self, error: str | None = None) -> None:
+        self.error       = error
+        self.status      = FAILED if error else READY
+        self.finished_at = time.monotonic()
+        # Release anyone still waiting; they re-check the per-subject status afterwards.
+        self._catalog.set()
+        for event in self._events.values():
+            event.set()
+        self._done.set()
+
+    # ── Queries (called by resolvers and the /ready endpoint) ──────────────────
+
+    @property
+    def is_ready(self) -> bool:
+        return self.status == READY
+
+    @property
+    def catalog_ready(self) -> bool:
+        return self._catalog.is_set() and self.status != FAILED
+
+    def subject_status(self, subject_id: str) -> str:
+        """
+        Status of one subject. Subjects that were not on disk when the sync started
+        (e.g. created through the API afterwards) are ready once the catalog is.
+        """
+        if subject_id in self._subjects:
+            return self._subjects[subject_id]
+        if self.status == FAILED:
+            return FAILED
+        return READY if self._catalog.is_set() else PENDING
+
+    async def wait_for_catalog(self, timeout: float = SYNC_WAIT_TIMEOUT) -> bool:
+        if not self._catalog.is_set():
+            try:
+                await asyncio.wait_for(self._catalog.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.catalog_ready
+
+    async def wait_for_subject(self, subject_id: str, timeout: float = SYNC_WAIT_TIMEOUT) -> str:
+        """Waits until subject_id is synced (bumping it to the front of the queue). Returns its status."""
+        deadline = time.monotonic() + timeout
+        if not await self.wait_for_catalog(timeout):
+            return self.subject_status(subject_id)
+        event = self._events.get(subject_id)
+        if event is not None and not event.is_set():
+            if self._subjects[subject_id] == PENDING:
+                self._queue.appendleft(subject_id)
+            try:
+                await asyncio.wait_for(event.wait(), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+        return self.subject_status(subject_id)
+
+    def snapshot(self) -> dict:
+        counts: dict[str, int] = {PENDING: 0, SYNCING: 0, READY: 0, FAILED: 0}
+        for status in self._subjects.values():
+            counts[status] += 1
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round((self.finished_at or time.monotonic()) - self.started_at, 3)
+        return {
+            "status":          self.status,
+            "error":           self.error,
+            "catalog_ready":   self._catalog.is_set(),
+            "elapsed_seconds": elapsed,
+            "subject_counts":  counts,
+            "subjects":        dict(self._subjects),
+        }
+
+
+def _list_subject_ids(rawdata_root: str) -> list[str]:
+    if not os.path.isdir(rawdata_root):
+        return []
+    return sorted(
+        name for name in os.listdir(rawdata_root)
+        if os.path.isdir(os.path.join(rawdata_root, name))
+    )
+
+
+async def run_background_sync(
+    state:           SyncState,
+    db_path:         str,
+    rawdata_root:    str,
+    references_root: str,
+    modules_path:    str,
+) -> None:
+    """
+    Mirrors the filesystem into SQLite without blocking the event loop. Started as an
+    asyncio task from main.startup(); progress is reported through `state`.
+    """
+    state.start()
+    try:
+        await asyncio.to_thread(sync_subjects, db_path, rawdata_root)
+        await asyncio.to_thread(prune_deleted_subjects, db_path, rawdata_root)
+        await asyncio.to_thread(sync_zone_references, db_path, references_root)
+        await asyncio.to_thread(ZONE_TABLES.refresh, db_path)
+        await asyncio.to_thread(sync_modules, db_path, modules_path)
+        state.mark_catalog_ready(_list_subject_ids(rawdata_root))
+        logger.info("Catalog sync complete; syncing datapoints in the background.")
+
+        while (subject_id := state.next_subject()) is not None:
+            try:
+                await asyncio.to_thread(sync_datapoints, db_path, rawdata_root, [subject_id])
+            except Exception as exc:
+                logger.error("Datapoint sync failed for %s: %s", subject_id, exc, exc_info=True)
+                state.mark_subject(subject_id, FAILED)
+                continue
+            state.mark_subject(subject_id, READY)
+
+    except Exception as exc:
+        logger.error("Background startup sync failed: %s", exc, exc_info=True)
+        state.finish(error=str(exc))
+        return
+
+    state.finish()
+    logger.info("Background startup sync complete: %s", state.snapshot()["subject_counts"])
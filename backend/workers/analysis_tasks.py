@@ -2,23 +2,39 @@
 #
 # Each function here is a standalone async task that runs in a separate worker
 # process (started with: arq backend.workers.settings.WorkerSettings).
+#
+# Job metrics, by mode ("single" / "composite"), are recorded into the telemetry registry and exported
+# by the worker's metrics endpoint (backend/workers/settings.py):
+#   arq_job_wait_ms        enqueue → start
+#   arq_job_run_ms         start → finished or failed
+#   arq_job_datapoints     datapoints read per job (summed over markers in composite mode)
+#   arq_job_failures_total
 
 from __future__ import annotations
 import json
 import logging
 import os
+import time
 from datetime import datetime, timezone
 from uuid import uuid4
 
+from backend.core.telemetry import JOB_BUCKETS_MS, ROWS_BUCKETS, counter, histogram
+
 logger = logging.getLogger(__name__)
 
+JOB_WAIT_MS    = histogram("arq_job_wait_ms",    "Time from enqueue to job start (ms)", JOB_BUCKETS_MS, label="mode")
+JOB_RUN_MS     = histogram("arq_job_run_ms",     "Job run time (ms)",                   JOB_BUCKETS_MS, label="mode")
+JOB_DATAPOINTS = histogram("arq_job_datapoints", "Datapoints read per job",             ROWS_BUCKETS,   label="mode")
+JOB_FAILURES   = counter("arq_job_failures_total", "Jobs that failed", label="mode")
+
 
 async def run_trajectory_analysis(
     ctx: dict,
     *,
     job_id:            str,
     subject_id:        str,
-    marker_refs:       list[dict],  # [{module_id, marker_id} for single; full config + zone_boundaries for composite]
+    marker_refs:       list[dict],  # [{module_id, marker_id} for single; full config + zone_boundaries for composite
+                                    #  and for age-aware single-marker, plus zone_table when age-aware]
     use_composite:     bool,
     timeframe:         dict,
     trajectory_params: dict,
@@ -32,7 +48,8 @@ async def run_trajectory_analysis(
 
     Two modes selected by use_composite:
         False — single-marker direct flow: reads raw timeseries, uses trajectory_params
-                zone_boundaries for normalisation.
+                zone_boundaries for normalisation (or, for age-aware analyses, the marker's
+                DB boundaries at the subject's age at each datapoint).
         True  — composite flow: reads each marker's timeseries, applies feature
                 transforms, normalises to h, builds weighted composite, then runs
                 trajectory on the composite health score.
@@ -43,6 +60,10 @@ async def run_trajectory_analysis(
         {"status": "failed",    "progress": null, "error": "..."}
     """
     redis = ctx["redis"]
+    mode  = "composite" if use_composite else "single"
+    start = time.perf_counter()
+    if ctx.get("enqueue_time") is not None:
+        JOB_WAIT_MS.observe((datetime.now(timezone.utc) - ctx["enqueue_time"]).total_seconds() * 1000, mode)
 
     async def publish(payload: dict) -> None:
         await redis.publish(f"job:{job_id}", json.dumps(payload))
@@ -59,6 +80,7 @@ async def run_trajectory_analysis(
 
         await publish({"status": "running", "progress": 0.3})
 
+        point_boundaries = None
         if use_composite:
             # ── Composite mode: multi-marker → weighted composite h ────────────
             from backend.core.storage.data_reader import read_multi_marker_timeseries
@@ -70,6 +92,7 @@ async def run_trajectory_analysis(
             marker_timeseries = read_multi_marker_timeseries(
                 rawdata_root, subject_id, marker_refs, from_time, to_time
             )
+            JOB_DATAPOINTS.observe(sum(len(m["epochs"]) for m in marker_timeseries), mode)
 
             await publish({"status": "running", "progress": 0.5})
 
@@ -98,17 +121,28 @@ async def run_trajectory_analysis(
             datapoints = read_timeseries(
                 rawdata_root, subject_id, module_id, marker_id, from_time, to_time
             )
+            JOB_DATAPOINTS.observe(len(datapoints), mode)
             if not datapoints:
                 raise ValueError(
                     f"No datapoints found for {subject_id}/{module_id}/{marker_id} "
                     f"in the requested timeframe."
                 )
 
-            zone_boundaries = {
-                "healthy_min":          trajectory_params["healthy_min"],
-                "healthy_max":          trajectory_params["healthy_max"],
-                "vulnerability_margin": trajectory_params["vulnerability_margin"],
-            }
+            if "zone_boundaries" in marker_refs[0]:
+                # Age-aware: boundaries resolved from the DB by submit_analysis
+                zone_boundaries = marker_refs[0]["zone_boundaries"]
+                zone_table      = marker_refs[0].get("zone_table")
+                if zone_table is not None:
+                    from backend.core.storage.segment_log import to_epoch_ms
+                    from backend.core.storage.zone_tables import boundaries_at
+                    epochs = [to_epoch_ms(dp["parsed_timestamp"]) for dp in datapoints]
+                    point_boundaries = boundaries_at(zone_table, epochs)
+            else:
+                zone_boundaries = {
+                    "healthy_min":          trajectory_params["healthy_min"],
+                    "healthy_max":          trajectory_params["healthy_max"],
+                    "vulnerability_margin": trajectory_params["vulnerability_margin"],
+                }
 
             report_module_id  = module_id
             report_marker_id  = marker_id
@@ -120,6 +154,7 @@ async def run_trajectory_analysis(
             datapoints,
             zone_boundaries,
             trajectory_params["polynomial_degree"],
+            point_boundaries,
         )
 
         await publish({"status": "running", "progress": 0.85})
@@ -160,10 +195,14 @@ async def run_trajectory_analysis(
         return {"report_id": report_id}
 
     except Exception as exc:
+        JOB_FAILURES.inc(mode)
         logger.error("Trajectory analysis failed for job %s: %s", job_id, exc, exc_info=True)
         await publish({
             "status":   "failed",
             "progress": None,
             "error":    str(exc),
         })
-        raise
\ No newline at end of file
+        raise
+
+    finally:
+        JOB_RUN_MS.observe((time.perf_counter() - start) * 1000, mode)
@@ -3,7 +3,16 @@
 #
 # Workers run in a SEPARATE process from the FastAPI server.
 # They have full access to backend.* imports (same PYTHONPATH).
+#
+# Each worker serves its own Prometheus metrics (job wait / run times and datapoints per job by mode,
+# failures, SQLite lock waits, index cache hit rate, ARQ queue depth) on
+# http://ASHDT_WORKER_METRICS_HOST:ASHDT_WORKER_METRICS_PORT/metrics. The host defaults to 127.0.0.1;
+# set it to 0.0.0.0 (or the interface a scraper reaches) to expose the exporter beyond this machine.
+# Set the port to 0 to disable the exporter; with several workers on one host give each its own port.
+# The exporter only imports backend.core, not the GraphQL stack.
 
+import asyncio
+import logging
 import os
 from arq.connections import RedisSettings
 from backend.workers.analysis_tasks import run_trajectory_analysis
@@ -11,6 +20,64 @@ from backend.workers.analysis_tasks import run_trajectory_analysis
 
 REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379")
 
+METRICS_HOST = os.environ.get("ASHDT_WORKER_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("ASHDT_WORKER_METRICS_PORT", "9101"))
+
+logger = logging.getLogger(__name__)
+
+
+# ── Metrics exporter ──────────────────────────────────────────────────────────
+
+async def _render_metrics(ctx: dict) -> str:
+    from backend.core import telemetry
+    from backend.core.storage.index_cache import INDEX_CACHE
+
+    samples  = telemetry.cache_samples({"index": INDEX_CACHE.stats()})
+    samples += await telemetry.queue_depth_sample(ctx.get("redis"))
+    return telemetry.render_prometheus(samples)
+
+
+async def _serve_metrics(ctx: dict, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request_line = await reader.readline()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass    # headers are not needed
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            from backend.core.telemetry import CONTENT_TYPE
+            status, content_type = "200 OK", CONTENT_TYPE
+            body = (await _render_metrics(ctx)).encode("utf-8")
+        else:
+            status, content_type, body = "404 Not Found", "text/plain", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+    except Exception as exc:
+        logger.warning("Metrics request failed: %s", exc)
+    finally:
+        writer.close()
+
+
+async def startup(ctx: dict) -> None:
+    if not METRICS_PORT:
+        return
+    try:
+        ctx["metrics_server"] = await asyncio.start_server(
+            lambda reader, writer: _serve_metrics(ctx, reader, writer), METRICS_HOST, METRICS_PORT,
+        )
+        logger.info("Worker metrics on %s:%d/metrics", METRICS_HOST, METRICS_PORT)
+    except OSError as exc:
+        logger.warning("Worker metrics exporter not started on %s:%d: %s", METRICS_HOST, METRICS_PORT, exc)
+
+
+async def shutdown(ctx: dict) -> None:
+    server = ctx.pop("metrics_server", None)
+    if server is not None:
+        server.close()
+        await server.wait_closed()
+
 
 class WorkerSettings:
     functions = [
@@ -24,6 +91,6 @@ class WorkerSettings:
     # Max concurrent jobs per worker process
     max_jobs = 4
 
-    # Log job lifecycle events
-    on_startup = None
-    on_shutdown = None
+    # Start / stop the metrics exporter
+    on_startup = startup
+    on_shutdown = shutdown
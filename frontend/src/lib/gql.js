@@ -5,15 +5,52 @@
 const GQL_URL    = "http://localhost:8000/graphql";
 const GQL_WS_URL = "ws://localhost:8000/graphql";
 
+// Last successful response per query + variables, with its ETag. Repeated queries (polling) are sent with
+// If-None-Match; when nothing changed the server answers 304 with no body and the stored data is reused.
+const ETAG_CACHE_SIZE = 200;
+const etagCache       = new Map();
+
+// Persisted queries: requests carry the query's sha256 instead of its text. If the server doesn't know
+// the hash yet it answers PERSISTED_QUERY_NOT_FOUND and the request is repeated with the full text
+// (see backend/graphql/persisted_queries.py).
+const queryHashes = new Map();
+
+async function sha256Hex(text) {
+    const digest = await crypto.subtle.digest("SHA-256", new TextEncoder().encode(text));
+    return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, "0")).join("");
+}
+
+async function persistedQuery(query) {
+    let hash = queryHashes.get(query);
+    if (!hash) {
+        hash = await sha256Hex(query);
+        queryHashes.set(query, hash);
+    }
+    return { persistedQuery: { version: 1, sha256Hash: hash } };
+}
+
 /** Send a query or mutation. Returns data or throws with the first GraphQL error message. */
 export async function gql(query, variables = {}) {
-    const res  = await fetch(GQL_URL, {
-        method:  "POST",
-        headers: { "Content-Type": "application/json" },
-        body:    JSON.stringify({ query, variables }),
-    });
-    const json = await res.json();
+    const key     = JSON.stringify({ query, variables });
+    const cached  = etagCache.get(key);
+    const headers = { "Content-Type": "application/json" };
+    if (cached) headers["If-None-Match"] = cached.etag;
+    const extensions = await persistedQuery(query);
+    let res = await fetch(GQL_URL, { method: "POST", headers, body: JSON.stringify({ variables, extensions }) });
+    if (res.status === 304 && cached) return cached.data;
+    let json = await res.json();
+    if (json.errors?.[0]?.extensions?.code === "PERSISTED_QUERY_NOT_FOUND") {
+        res  = await fetch(GQL_URL, { method: "POST", headers, body: JSON.stringify({ query, variables, extensions }) });
+        if (res.status === 304 && cached) return cached.data;
+        json = await res.json();
+    }
     if (json.errors?.length) throw new Error(json.errors[0].message);
+    const etag = res.headers.get("ETag");
+    if (etag) {
+        etagCache.delete(key);
+        etagCache.set(key, { etag, data: json.data });
+        if (etagCache.size > ETAG_CACHE_SIZE) etagCache.delete(etagCache.keys().next().value);
+    }
     return json.data;
 }
 
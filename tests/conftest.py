@@ -0,0 +1,43 @@
+# Shared fixtures for the storage tests. Everything runs against a throwaway data/ tree under tmp_path,
+# laid out like the real one (raw_data/{subject}/{module}/{marker}, deleted_datapoints/ next to it).
+
+import os
+
+import pytest
+
+from backend.core.storage import segment_log
+from backend.core.storage.index_cache import INDEX_CACHE
+from backend.startup.database_logistics import get_connection, init_db
+
+
+@pytest.fixture(autouse=True)
+def _fresh_index_cache():
+    INDEX_CACHE.clear()
+    yield
+    INDEX_CACHE.clear()
+
+
+@pytest.fixture
+def rawdata_root(tmp_path) -> str:
+    root = tmp_path / "data" / "raw_data"
+    root.mkdir(parents=True)
+    return str(root)
+
+
+@pytest.fixture
+def marker_dir(rawdata_root) -> str:
+    path = os.path.join(rawdata_root, "subject_001", "fitness", "vo2max")
+    os.makedirs(path)
+    return path
+
+
+@pytest.fixture
+def conn(tmp_path):
+    db_path = str(tmp_path / "asHDT.db")
+    init_db(db_path)
+    with get_connection(db_path) as connection:
+        yield connection
+
+
+def put(measured_at: str, value: float, created_at: str = "2020-01-01T00:00:00Z") -> dict:
+    return segment_log.put_op(segment_log.make_record(measured_at, value, "mL/kg/min", "good", created_at))
@@ -0,0 +1,54 @@
+import os
+import shutil
+
+from backend.startup.bulk_loader import (
+    datapoint_tables_with_prefix,
+    load_datapoints_into,
+    prune_deleted_subjects,
+    purge_subject,
+)
+from backend.core.storage import segment_log
+
+from conftest import put
+
+
+def _subject_rows(conn, subject_id: str) -> tuple[int, int, int]:
+    return tuple(
+        conn.execute(f"SELECT COUNT(*) FROM {table} WHERE subject_id=?", (subject_id,)).fetchone()[0]
+        for table in ("subjects", "dataset_stats", "datapoint_rollups")
+    )
+
+
+def _load_two_subjects(conn, rawdata_root: str) -> None:
+    for subject_id in ("subject_001", "subject_002"):
+        marker_dir = os.path.join(rawdata_root, subject_id, "fitness", "vo2max")
+        os.makedirs(marker_dir)
+        segment_log.append_ops(marker_dir, [put("2024-01-01T08:00:00Z", 40.0)])
+        conn.execute("INSERT INTO subjects (subject_id, created_at) VALUES (?, '')", (subject_id,))
+    load_datapoints_into(conn, rawdata_root)
+    conn.commit()
+
+
+def test_purge_subject_drops_tables_stats_and_rollups(conn, rawdata_root):
+    _load_two_subjects(conn, rawdata_root)
+    assert _subject_rows(conn, "subject_001")[1:] == (1, 3)
+
+    assert purge_subject(conn, "subject_001") == 1
+    conn.commit()
+
+    assert datapoint_tables_with_prefix(conn, "subject_001__") == []
+    assert _subject_rows(conn, "subject_001") == (1, 0, 0)    # the profile row is the caller's
+    assert datapoint_tables_with_prefix(conn, "subject_002__") == ["subject_002__fitness__vo2max"]
+    assert _subject_rows(conn, "subject_002") == (1, 1, 3)
+
+
+def test_prune_removes_subjects_missing_from_disk(conn, rawdata_root, tmp_path):
+    _load_two_subjects(conn, rawdata_root)
+    shutil.rmtree(os.path.join(rawdata_root, "subject_001"))
+
+    assert prune_deleted_subjects(str(tmp_path / "asHDT.db"), rawdata_root) == ["subject_001"]
+
+    assert datapoint_tables_with_prefix(conn, "subject_001__") == []
+    assert _subject_rows(conn, "subject_001") == (0, 0, 0)
+    assert _subject_rows(conn, "subject_002") == (1, 1, 3)
+    assert prune_deleted_subjects(str(tmp_path / "asHDT.db"), rawdata_root) == []
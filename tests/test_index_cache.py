@@ -0,0 +1,56 @@
+from backend.core.storage import segment_log
+from backend.core.storage.data_writer import add_datapoint
+from backend.core.storage.index_cache import INDEX_CACHE, MIRRORED, MirroredSignatures, marker_signature
+from conftest import put
+
+
+def test_cached_index_follows_changes_from_other_writers(marker_dir):
+    segment_log.append_ops(marker_dir, [put("2024-01-01T08:00:00Z", 1.0)])
+    first = INDEX_CACHE.get(marker_dir)
+    assert INDEX_CACHE.get(marker_dir) is first
+    assert INDEX_CACHE.stats()["hits"] == 1
+
+    # Appended without invalidating, as another process would: the file signature changes.
+    segment_log.append_ops(marker_dir, [put("2024-01-02T08:00:00Z", 2.0)])
+    second = INDEX_CACHE.get(marker_dir)
+    assert second is not first
+    assert second.keys == ["2024-01-01T08:00:00Z", "2024-01-02T08:00:00Z"]
+    assert second.record("2024-01-02T08:00:00Z")["value"] == 2.0
+    assert second.range(segment_log.to_epoch_ms("2024-01-02T00:00:00Z"), segment_log.to_epoch_ms("2024-01-03T00:00:00Z")) == (1, 2)
+
+
+def test_markers_with_archived_months_are_not_cached(marker_dir):
+    segment_log.append_ops(marker_dir, [put("2001-01-01T08:00:00Z", 1.0)])
+    assert INDEX_CACHE.worth_caching(marker_dir)
+    segment_log.archive_marker(marker_dir, older_than_days=30)
+    assert not INDEX_CACHE.worth_caching(marker_dir)
+
+
+def test_mirrored_signatures_only_cover_writes_from_a_known_state(marker_dir):
+    mirrored = MirroredSignatures()
+    segment_log.append_ops(marker_dir, [put("2024-01-01T08:00:00Z", 1.0)])
+
+    # Unknown state before the write: the watcher must still reconcile.
+    with mirrored.writing(marker_dir):
+        segment_log.append_ops(marker_dir, [put("2024-01-02T08:00:00Z", 2.0)])
+    assert not mirrored.in_sync(marker_dir)
+
+    mirrored.reconciled(marker_dir, marker_signature(marker_dir))
+    with mirrored.writing(marker_dir):
+        segment_log.append_ops(marker_dir, [put("2024-01-03T08:00:00Z", 3.0)])
+    assert mirrored.in_sync(marker_dir)
+
+    # An external append afterwards is not covered.
+    segment_log.append_ops(marker_dir, [put("2024-01-04T08:00:00Z", 4.0)])
+    assert not mirrored.in_sync(marker_dir)
+
+
+def test_rejected_writes_keep_the_mirrored_state(rawdata_root, marker_dir):
+    rec = {"measured_at": "2024-01-01T08:00:00Z", "value": 1.0, "unit": "x", "data_quality": "good"}
+    add_datapoint(rawdata_root, "subject_001", "fitness", "vo2max", rec)
+    MIRRORED.reconciled(marker_dir, marker_signature(marker_dir))
+    try:
+        add_datapoint(rawdata_root, "subject_001", "fitness", "vo2max", rec)
+    except ValueError:
+        pass
+    assert MIRRORED.in_sync(marker_dir)
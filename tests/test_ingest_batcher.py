@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from backend.core.storage import segment_log
+from backend.core.storage import ingest_batcher
+from backend.core.storage.ingest_batcher import IngestBatcher
+from backend.startup.database_logistics import _datapoint_table, get_connection, init_db
+
+
+def _rec(measured_at: str, value: float) -> dict:
+    return {"measured_at": measured_at, "value": value, "unit": "x", "data_quality": "good"}
+
+
+def test_group_commit_writes_one_batch_and_rejects_duplicates(tmp_path, rawdata_root):
+    db_path = str(tmp_path / "asHDT.db")
+    init_db(db_path)
+
+    async def run():
+        batcher = IngestBatcher(db_path, rawdata_root, max_delay_ms=20, max_records=100)
+        batcher.start()
+        results = await asyncio.gather(
+            batcher.submit("subject_001", "fitness", "vo2max",  _rec("2024-01-01T08:00:00Z", 1.0)),
+            batcher.submit("subject_001", "fitness", "vo2max",  _rec("2024-01-02T08:00:00Z", 2.0)),
+            batcher.submit("subject_001", "fitness", "vo2max",  _rec("2024-01-01T08:00:00Z", 9.0)),
+            batcher.submit("subject_001", "fitness", "resting", _rec("2024-01-01T08:00:00Z", 60.0)),
+            return_exceptions=True,
+        )
+        await batcher.close()
+        return batcher, results
+
+    batcher, results = asyncio.run(run())
+    assert results[:2] == [None, None] and results[3] is None
+    assert isinstance(results[2], ValueError)
+    assert batcher.batches == 1 and batcher.records == 4
+
+    marker_dir = f"{rawdata_root}/subject_001/fitness/vo2max"
+    assert [r["value"] for r in segment_log.read_records(marker_dir)] == [1.0, 2.0]
+    with get_connection(db_path) as conn:
+        table = _datapoint_table("subject_001", "fitness", "vo2max")
+        assert conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] == 2
+        stats = conn.execute("SELECT count, sum_value FROM dataset_stats WHERE marker_id='vo2max'").fetchone()
+        assert tuple(stats) == (2, 3.0)
+
+
+def test_closed_batcher_refuses_records(tmp_path, rawdata_root):
+    async def run():
+        batcher = IngestBatcher(str(tmp_path / "asHDT.db"), rawdata_root)
+        batcher.start()
+        await batcher.close()
+        with pytest.raises(RuntimeError):
+            await batcher.submit("subject_001", "fitness", "vo2max", _rec("2024-01-01T08:00:00Z", 1.0))
+
+    asyncio.run(run())
+
+
+def test_a_failing_marker_only_fails_its_own_records(tmp_path, rawdata_root, monkeypatch):
+    db_path = str(tmp_path / "asHDT.db")
+    init_db(db_path)
+    real_write = ingest_batcher.write_marker_batch
+
+    def write_marker_batch(conn, root, subject_id, module_id, marker_id, records):
+        if marker_id == "resting":
+            raise OSError("disk full")
+        return real_write(conn, root, subject_id, module_id, marker_id, records)
+
+    monkeypatch.setattr(ingest_batcher, "write_marker_batch", write_marker_batch)
+
+    async def run():
+        batcher = IngestBatcher(db_path, rawdata_root, max_delay_ms=20, max_records=100)
+        batcher.start()
+        results = await asyncio.gather(
+            batcher.submit("subject_001", "fitness", "vo2max",  _rec("2024-01-01T08:00:00Z", 1.0)),
+            batcher.submit("subject_001", "fitness", "resting", _rec("2024-01-01T08:00:00Z", 60.0)),
+            batcher.submit("subject_001", "fitness", "weight",  _rec("2024-01-01T08:00:00Z", 70.0)),
+            return_exceptions=True,
+        )
+        await batcher.close()
+        return results
+
+    results = asyncio.run(run())
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], OSError)
+
+    # The markers around the failure are stored on disk and in SQLite alike.
+    with get_connection(db_path) as conn:
+        for marker_id, value in (("vo2max", 1.0), ("weight", 70.0)):
+            marker_dir = f"{rawdata_root}/subject_001/fitness/{marker_id}"
+            assert [r["value"] for r in segment_log.read_records(marker_dir)] == [value]
+            table = _datapoint_table("subject_001", "fitness", marker_id)
+            assert conn.execute(f'SELECT value FROM "{table}"').fetchall()[0][0] == value
+        assert conn.execute("SELECT COUNT(*) FROM dataset_stats").fetchone()[0] == 2
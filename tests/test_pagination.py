@@ -0,0 +1,158 @@
+import asyncio
+import base64
+import json
+
+import pytest
+import strawberry
+from strawberry.exceptions import GraphQLError
+from strawberry.tools import merge_types
+
+from backend.graphql.analysis.queries import AnalysisQueries
+from backend.graphql.datapoints.queries import DatapointQueries
+from backend.graphql.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from backend.graphql.subjects.queries import SubjectQueries
+from backend.startup.database_logistics import _datapoint_table, _ensure_datapoint_table
+
+SCHEMA = strawberry.Schema(query=merge_types("Query", (SubjectQueries, DatapointQueries, AnalysisQueries)))
+
+
+class Context:
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+
+    async def require_catalog(self) -> None:
+        pass
+
+    async def require_subject(self, subject_id: str) -> None:
+        pass
+
+
+@pytest.fixture
+def run(conn, tmp_path):
+    context = Context(str(tmp_path / "asHDT.db"))
+
+    def execute(query: str, **variables) -> dict:
+        result = asyncio.run(SCHEMA.execute(query, variable_values=variables, context_value=context))
+        if result.errors:
+            raise result.errors[0]
+        return result.data
+
+    return execute
+
+
+def _pages(run, query: str, field: str, first: int, node_key: str, **variables) -> tuple[list, list]:
+    """Follows endCursor until hasNextPage is false; returns (node keys, hasNextPage per page)."""
+    keys, has_next, after = [], [], None
+    while True:
+        page = run(query, first=first, after=after, **variables)[field]
+        keys.extend(edge["node"][node_key] for edge in page["edges"])
+        has_next.append(page["pageInfo"]["hasNextPage"])
+        assert page["pageInfo"]["hasPreviousPage"] == (after is not None)
+        if not page["pageInfo"]["hasNextPage"]:
+            return keys, has_next
+        after = page["pageInfo"]["endCursor"]
+
+
+SUBJECTS = """
+query($first: Int, $after: String) {
+  subjectsConnection(first: $first, after: $after) {
+    edges { cursor node { subjectId } }
+    pageInfo { hasNextPage hasPreviousPage startCursor endCursor }
+  }
+}
+"""
+
+REPORTS = """
+query($first: Int, $after: String) {
+  analysisReportsConnection(subjectId: "subject_001", first: $first, after: $after) {
+    edges { node { jobId createdAt } }
+    pageInfo { hasNextPage hasPreviousPage endCursor }
+  }
+}
+"""
+
+DATAPOINTS = """
+query($first: Int, $after: String, $from: String) {
+  datapointsConnection(subjectId: "subject_001", moduleId: "fitness", markerId: "vo2max",
+                       fromTime: $from, first: $first, after: $after) {
+    edges { node { measuredAt } }
+    pageInfo { hasNextPage hasPreviousPage endCursor }
+  }
+}
+"""
+
+
+def test_cursor_round_trip():
+    key = ["2024-01-01T08:00:00Z", "subject_001-2024-01-01-abcd"]
+    assert decode_cursor(encode_cursor(key), 2) == key
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"{not json").decode(),
+    base64.urlsafe_b64encode(json.dumps({"subject_id": "x"}).encode()).decode(),  # not a list
+    encode_cursor(["a", "b"]),                                                     # wrong key size
+])
+def test_tampered_cursors_are_rejected(cursor):
+    with pytest.raises(GraphQLError, match="Invalid cursor."):
+        decode_cursor(cursor, 1)
+
+
+def test_subjects_page_through_in_order(run, conn):
+    ids = [f"subject_{i:03d}" for i in (4, 1, 5, 3, 2)]
+    conn.executemany("INSERT INTO subjects (subject_id) VALUES (?)", [(i,) for i in ids])
+    conn.commit()
+
+    keys, has_next = _pages(run, SUBJECTS, "subjectsConnection", 2, "subjectId")
+    assert keys == sorted(ids)
+    assert has_next == [True, True, False]
+
+    first_page = run(SUBJECTS, first=2, after=None)["subjectsConnection"]
+    assert first_page["pageInfo"]["startCursor"] == first_page["edges"][0]["cursor"]
+    assert run(SUBJECTS, first=5, after=None)["subjectsConnection"]["pageInfo"]["hasNextPage"] is False
+    assert run(SUBJECTS, first=0, after=None)["subjectsConnection"]["edges"] == []
+
+
+def test_reports_with_equal_timestamps_are_neither_skipped_nor_repeated(run, conn):
+    reports = [
+        ("r-a", "2024-01-02T00:00:00Z"),
+        ("r-b", "2024-01-01T00:00:00Z"),
+        ("r-c", "2024-01-02T00:00:00Z"),
+        ("r-d", "2024-01-02T00:00:00Z"),
+        ("r-e", "2023-12-31T00:00:00Z"),
+    ]
+    conn.executemany(
+        "INSERT INTO timegraph_reports (report_id, subject_id, module_id, marker_id, requested_at, "
+        "timeframe_from, timeframe_to, polynomial_degree, healthy_min, healthy_max, vulnerability_margin) "
+        "VALUES (?, 'subject_001', 'fitness', 'vo2max', ?, '', '', 2, 0, 1, 0.1)",
+        reports,
+    )
+    conn.commit()
+
+    keys, has_next = _pages(run, REPORTS, "analysisReportsConnection", 1, "jobId")
+    assert keys == ["r-d", "r-c", "r-a", "r-b", "r-e"]    # requested_at DESC, then report_id DESC
+    assert has_next == [True] * 4 + [False]
+
+
+def test_datapoint_cursors_combine_with_the_time_filter(run, conn):
+    table = _datapoint_table("subject_001", "fitness", "vo2max")
+    _ensure_datapoint_table(conn, table)
+    stamps = [f"2024-01-0{d}T08:00:00Z" for d in range(1, 8)]
+    conn.executemany(
+        f'INSERT INTO "{table}" (measured_at, value, unit, data_quality, created_at) VALUES (?, 1, "x", "good", "")',
+        [(s,) for s in stamps],
+    )
+    conn.commit()
+
+    keys, has_next = _pages(run, DATAPOINTS, "datapointsConnection", 2, "measuredAt", **{"from": stamps[2]})
+    assert keys == stamps[2:]
+    assert has_next == [True, True, False]
+
+
+def test_invalid_arguments_are_graphql_errors(run):
+    with pytest.raises(Exception, match="Invalid cursor."):
+        run(SUBJECTS, first=2, after="garbage")
+    with pytest.raises(Exception, match="Invalid cursor."):
+        run(REPORTS, first=2, after=encode_cursor(["2024-01-01T00:00:00Z"]))   # reports need two keys
+    with pytest.raises(Exception, match="first must be between"):
+        run(SUBJECTS, first=MAX_PAGE_SIZE + 1, after=None)
@@ -0,0 +1,85 @@
+import hashlib
+import json
+
+import pytest
+import strawberry
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.graphql import persisted_queries
+from backend.graphql.persisted_queries import PersistedQueryRouter, PersistedQueryStore
+
+QUERY = "query Hello { hello }"
+SHA   = hashlib.sha256(QUERY.encode("utf-8")).hexdigest()
+
+
+@strawberry.type
+class Query:
+    @strawberry.field
+    def hello(self) -> str:
+        return "hi"
+
+
+@pytest.fixture
+def store(monkeypatch) -> PersistedQueryStore:
+    store = PersistedQueryStore(limit=10)
+    monkeypatch.setattr(persisted_queries, "PERSISTED_QUERIES", store)
+    return store
+
+
+@pytest.fixture
+def client(store):
+    app = FastAPI()
+    app.include_router(PersistedQueryRouter(strawberry.Schema(query=Query)), prefix="/graphql")
+    with TestClient(app) as c:
+        yield c
+
+
+def _extensions(sha: str) -> dict:
+    return {"persistedQuery": {"version": 1, "sha256Hash": sha}}
+
+
+def test_unknown_hash_asks_for_the_query(client, store):
+    response = client.post("/graphql", json={"extensions": _extensions(SHA)})
+    assert response.status_code == 200
+    error, = response.json()["errors"]
+    assert error["message"] == "PersistedQueryNotFound"
+    assert error["extensions"]["code"] == "PERSISTED_QUERY_NOT_FOUND"
+    assert store.stats()["misses"] == 1
+
+
+def test_register_then_hit_by_hash(client, store):
+    registered = client.post("/graphql", json={"query": QUERY, "extensions": _extensions(SHA)})
+    assert registered.json() == {"data": {"hello": "hi"}}
+    assert store.peek(SHA) == QUERY
+
+    hit = client.post("/graphql", json={"extensions": _extensions(SHA.upper())})
+    assert hit.json() == {"data": {"hello": "hi"}}
+    assert store.stats()["hits"] == 1
+
+
+def test_get_with_extensions_runs_the_stored_query(client, store):
+    store.register(SHA, QUERY)
+    response = client.get("/graphql", params={"extensions": json.dumps(_extensions(SHA))})
+    assert response.status_code == 200
+    assert response.json() == {"data": {"hello": "hi"}}
+
+
+def test_mismatched_hash_is_rejected(client, store):
+    wrong = hashlib.sha256(b"query Other { hello }").hexdigest()
+    response = client.post("/graphql", json={"query": QUERY, "extensions": _extensions(wrong)})
+    assert response.status_code == 400
+    assert "does not match" in response.text
+    assert store.peek(wrong) is None
+
+
+def test_store_evicts_least_recently_used():
+    store = PersistedQueryStore(limit=2)
+    queries = [f"query Q{i} {{ hello }}" for i in range(3)]
+    hashes  = [hashlib.sha256(q.encode("utf-8")).hexdigest() for q in queries]
+    store.register(hashes[0], queries[0])
+    store.register(hashes[1], queries[1])
+    assert store.get(hashes[0]) == queries[0]    # Q1 is now least recently used
+    store.register(hashes[2], queries[2])
+    assert store.peek(hashes[1]) is None
+    assert store.peek(hashes[0]) == queries[0] and store.peek(hashes[2]) == queries[2]
@@ -0,0 +1,135 @@
+import pytest
+import strawberry
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from graphql import OperationDefinitionNode, parse
+from strawberry.fastapi import GraphQLRouter
+
+from backend.graphql.response_cache import ResponseCache, ResponseCacheMiddleware, data_scopes
+from backend.startup.database_logistics import get_connection, init_db
+
+CALLS = {"subject": 0, "broken": 0}
+
+
+@strawberry.type
+class Query:
+    @strawberry.field
+    def modules(self) -> list[str]:
+        return ["fitness"]
+
+    @strawberry.field
+    def subject(self, subject_id: str) -> str:
+        CALLS["subject"] += 1
+        return subject_id
+
+    @strawberry.field
+    def broken(self) -> str:
+        CALLS["broken"] += 1
+        raise ValueError("boom")
+
+
+def _operation(query: str) -> OperationDefinitionNode:
+    return next(d for d in parse(query).definitions if isinstance(d, OperationDefinitionNode))
+
+
+@pytest.fixture
+def db_path(tmp_path) -> str:
+    path = str(tmp_path / "asHDT.db")
+    init_db(path)
+    return path
+
+
+@pytest.fixture
+def client(db_path):
+    app = FastAPI()
+    app.state.db_path = db_path
+    app.include_router(GraphQLRouter(strawberry.Schema(query=Query)), prefix="/graphql")
+    app.add_middleware(ResponseCacheMiddleware, path="/graphql", cache=ResponseCache())
+    CALLS.update(subject=0, broken=0)
+    with TestClient(app) as c:
+        yield c
+
+
+def _post(client, query: str, variables: dict | None = None, etag: str | None = None):
+    headers = {"If-None-Match": etag} if etag else {}
+    return client.post("/graphql", json={"query": query, "variables": variables or {}}, headers=headers)
+
+
+def _write(db_path: str, sql: str, params: tuple) -> None:
+    with get_connection(db_path) as conn:
+        conn.execute(sql, params)
+        conn.commit()
+
+
+def _stats_write(db_path: str, subject_id: str) -> None:
+    _write(
+        db_path,
+        "INSERT INTO dataset_stats (subject_id, module_id, marker_id, count, updated_at) VALUES (?, 'fitness', 'vo2max', 1, '')",
+        (subject_id,),
+    )
+
+
+SUBJECT_QUERY = "query S($id: String!) { subject(subjectId: $id) }"
+
+
+def test_data_scopes():
+    assert data_scopes(_operation("{ modules }"), {}) == ["data:catalog"]
+    assert data_scopes(_operation('{ modules subject(subjectId: "subject_002") }'), {}) == [
+        "data:catalog", "data:subject:subject_002",
+    ]
+    assert data_scopes(_operation(SUBJECT_QUERY), {"id": "subject_001"}) == [
+        "data:catalog", "data:subject:subject_001",
+    ]
+    assert data_scopes(_operation(SUBJECT_QUERY), {}) == ["data:all"]          # subject unknown
+    assert data_scopes(_operation("{ subjects { subjectId } }"), {}) == ["data:all"]
+    assert data_scopes(_operation("{ ...F } fragment F on Query { modules }"), {}) == ["data:all"]
+
+
+def test_repeats_are_served_from_the_cache_and_revalidated_with_304(client):
+    first = _post(client, SUBJECT_QUERY, {"id": "subject_001"})
+    assert first.status_code == 200 and first.headers["x-cache"] == "MISS"
+    etag = first.headers["etag"]
+
+    again = _post(client, SUBJECT_QUERY, {"id": "subject_001"})
+    assert again.headers["x-cache"] == "HIT" and again.headers["etag"] == etag
+    assert again.json() == first.json()
+
+    revalidated = _post(client, SUBJECT_QUERY, {"id": "subject_001"}, etag=etag)
+    assert revalidated.status_code == 304 and revalidated.content == b""
+    assert CALLS["subject"] == 1
+
+
+def test_subject_writes_only_change_that_subjects_etag(client, db_path):
+    one = _post(client, SUBJECT_QUERY, {"id": "subject_001"}).headers["etag"]
+    two = _post(client, SUBJECT_QUERY, {"id": "subject_002"}).headers["etag"]
+    catalog = _post(client, "{ modules }").headers["etag"]
+
+    _stats_write(db_path, "subject_001")
+
+    changed = _post(client, SUBJECT_QUERY, {"id": "subject_001"}, etag=one)
+    assert changed.status_code == 200 and changed.headers["etag"] != one
+    assert _post(client, SUBJECT_QUERY, {"id": "subject_002"}, etag=two).status_code == 304
+    assert _post(client, "{ modules }", etag=catalog).status_code == 304
+
+
+def test_catalog_writes_change_every_etag(client, db_path):
+    subject = _post(client, SUBJECT_QUERY, {"id": "subject_001"}).headers["etag"]
+    catalog = _post(client, "{ modules }").headers["etag"]
+
+    _write(db_path, "INSERT INTO modules (module_id, module_name) VALUES (?, ?)", ("sleep", "Sleep"))
+
+    assert _post(client, SUBJECT_QUERY, {"id": "subject_001"}, etag=subject).status_code == 200
+    assert _post(client, "{ modules }", etag=catalog).status_code == 200
+
+
+def test_responses_with_errors_are_not_cached(client):
+    for _ in range(2):
+        response = _post(client, "{ broken }")
+        assert response.json()["errors"]
+        assert "etag" not in response.headers
+    assert CALLS["broken"] == 2
+
+
+def test_mutations_pass_through(client):
+    response = _post(client, "mutation { nothing }")
+    assert "etag" not in response.headers and "x-cache" not in response.headers
@@ -0,0 +1,67 @@
+from backend.startup.database_logistics import (
+    _datapoint_table,
+    _ensure_datapoint_table,
+    add_datapoint_rollups,
+    refresh_datapoint_rollups,
+)
+
+KEY = ("subject_001", "fitness", "vo2max")
+
+
+def _rollups(conn) -> dict:
+    rows = conn.execute(
+        "SELECT resolution, bucket_start, count, min_value, max_value, sum_value FROM datapoint_rollups "
+        "WHERE subject_id=? AND module_id=? AND marker_id=?",
+        KEY,
+    ).fetchall()
+    return {(r[0], r[1]): tuple(r[2:]) for r in rows}
+
+
+def _insert(conn, table: str, rows: list[tuple]) -> None:
+    conn.executemany(
+        f'INSERT INTO "{table}" (measured_at, value, unit, data_quality, created_at) VALUES (?, ?, "x", "good", "")',
+        rows,
+    )
+    add_datapoint_rollups(conn, *KEY, rows)
+
+
+def test_refresh_after_an_update_moves_a_point_between_buckets(conn):
+    table = _datapoint_table(*KEY)
+    _ensure_datapoint_table(conn, table)
+    _insert(conn, table, [
+        ("2024-01-01T08:00:00Z", 10.0),  # Monday
+        ("2024-01-01T09:30:00Z", 20.0),
+        ("2024-01-02T08:00:00Z", 30.0),
+    ])
+    assert _rollups(conn)[("day", "2024-01-01T00:00:00Z")] == (2, 10.0, 20.0, 30.0)
+
+    # Move the 09:30 point into the next week, as updateDatapoint does.
+    conn.execute(f'UPDATE "{table}" SET measured_at=?, value=? WHERE measured_at=?',
+                 ("2024-01-08T09:30:00Z", 25.0, "2024-01-01T09:30:00Z"))
+    refresh_datapoint_rollups(conn, *KEY, ["2024-01-01T09:30:00Z", "2024-01-08T09:30:00Z"])
+    incremental = _rollups(conn)
+
+    assert incremental[("hour", "2024-01-01T08:00:00Z")] == (1, 10.0, 10.0, 10.0)
+    assert ("hour", "2024-01-01T09:00:00Z") not in incremental
+    assert incremental[("hour", "2024-01-08T09:00:00Z")] == (1, 25.0, 25.0, 25.0)
+    assert incremental[("day", "2024-01-01T00:00:00Z")] == (1, 10.0, 10.0, 10.0)
+    assert incremental[("day", "2024-01-08T00:00:00Z")] == (1, 25.0, 25.0, 25.0)
+    assert incremental[("week", "2024-01-01T00:00:00Z")] == (2, 10.0, 30.0, 40.0)
+    assert incremental[("week", "2024-01-08T00:00:00Z")] == (1, 25.0, 25.0, 25.0)
+
+    # Same result as rebuilding every bucket from the table.
+    refresh_datapoint_rollups(conn, *KEY)
+    assert _rollups(conn) == incremental
+
+
+def test_refresh_after_a_delete_drops_empty_buckets(conn):
+    table = _datapoint_table(*KEY)
+    _ensure_datapoint_table(conn, table)
+    _insert(conn, table, [("2024-01-01T08:00:00Z", 10.0), ("2024-01-03T08:00:00Z", 30.0)])
+
+    conn.execute(f'DELETE FROM "{table}" WHERE measured_at=?', ("2024-01-03T08:00:00Z",))
+    refresh_datapoint_rollups(conn, *KEY, ["2024-01-03T08:00:00Z"])
+
+    rollups = _rollups(conn)
+    assert ("day", "2024-01-03T00:00:00Z") not in rollups
+    assert rollups[("week", "2024-01-01T00:00:00Z")] == (1, 10.0, 10.0, 10.0)
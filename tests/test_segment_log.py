@@ -0,0 +1,191 @@
+import glob
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from backend.core.storage import segment_log
+from backend.core.storage.data_reader import read_timeseries
+from backend.core.storage.data_writer import COMPACTOR, add_datapoint, datapoint_filename
+from conftest import put
+
+FAR_PAST   = datetime(2000, 1, 1, tzinfo=timezone.utc)
+FAR_FUTURE = datetime(2100, 1, 1, tzinfo=timezone.utc)
+
+
+def _values(records: list[dict]) -> list[tuple]:
+    return [(r["measured_at"], r["value"]) for r in records]
+
+
+def _iso(d: datetime) -> str:
+    return d.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+# ── Append / lookup / compact ──────────────────────────────────────────────────
+
+def test_append_lookup_compact_round_trip_with_tombstones(marker_dir):
+    segment_log.append_ops(marker_dir, [
+        put("2024-01-01T08:00:00Z", 40.0),
+        put("2024-01-02T08:00:00Z", 41.0),
+        put("2024-01-03T08:00:00Z", 42.0),
+    ])
+    segment_log.compact(marker_dir)
+
+    # Tail ops over the base: a tombstone for a base record, an update, and a put deleted again in the tail.
+    segment_log.append_ops(marker_dir, [
+        segment_log.del_op("2024-01-01T08:00:00Z"),
+        put("2024-01-02T08:00:00Z", 45.5),
+        put("2024-01-04T08:00:00Z", 43.0),
+        segment_log.del_op("2024-01-04T08:00:00Z"),
+        put("2024-01-05T08:00:00Z", 44.0),
+    ])
+    expected = [("2024-01-02T08:00:00Z", 45.5), ("2024-01-03T08:00:00Z", 42.0), ("2024-01-05T08:00:00Z", 44.0)]
+
+    def check():
+        assert _values(segment_log.read_records(marker_dir)) == expected
+        assert segment_log.lookup(marker_dir, "2024-01-01T08:00:00Z") is None
+        assert segment_log.lookup(marker_dir, "2024-01-04T08:00:00Z") is None
+        assert segment_log.lookup(marker_dir, "2024-01-02T08:00:00Z")["value"] == 45.5
+        assert segment_log.live_keys(marker_dir) == {m for m, _ in expected}
+
+    check()
+    assert segment_log.compact(marker_dir) == 3
+    check()
+
+    seg_dir = segment_log.segments_dir(marker_dir)
+    assert os.path.getsize(os.path.join(seg_dir, segment_log.TAIL_FILE)) == 0
+    assert segment_log.read_footer(seg_dir)["count"] == 3
+
+    # Both deleted versions are kept in the deleted_datapoints silo.
+    silo    = segment_log.deleted_datapoints_dir(marker_dir)
+    dropped = [json.loads(line) for path in glob.glob(os.path.join(silo, "*.jsonl")) for line in open(path)]
+    assert sorted(r["measured_at"] for r in dropped) == ["2024-01-01T08:00:00Z", "2024-01-04T08:00:00Z"]
+    assert all(r["deleted_at"] for r in dropped)
+
+
+def test_range_reads_seek_through_the_footer(marker_dir, monkeypatch):
+    monkeypatch.setattr(segment_log, "SPARSE_EVERY", 4)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    segment_log.append_ops(marker_dir, [put(_iso(start + timedelta(hours=h)), float(h)) for h in range(50)])
+    segment_log.compact(marker_dir)
+
+    from_t = segment_log.to_epoch_ms(start + timedelta(hours=10))
+    to_t   = segment_log.to_epoch_ms(start + timedelta(hours=20))
+    assert [r["value"] for r in segment_log.read_records(marker_dir, from_t, to_t)] == [float(h) for h in range(10, 21)]
+
+
+def test_footer_of_a_replaced_base_is_not_applied(marker_dir):
+    segment_log.append_ops(marker_dir, [put("2024-01-01T08:00:00Z", 1.0)])
+    segment_log.compact(marker_dir)
+    seg_dir   = segment_log.segments_dir(marker_dir)
+    base_path = os.path.join(seg_dir, segment_log.BASE_FILE)
+
+    with open(base_path, "rb") as old_base:
+        # Same size, different file: a compaction that only changed a value.
+        segment_log.append_ops(marker_dir, [put("2024-01-01T08:00:00Z", 2.0)])
+        segment_log.compact(marker_dir)
+        footer = segment_log.read_footer(seg_dir)
+        assert footer["bytes"] == os.fstat(old_base.fileno()).st_size
+        assert not segment_log._describes(footer, os.fstat(old_base.fileno()))
+    assert segment_log._describes(footer, os.stat(base_path))
+
+
+def test_appends_leave_compaction_to_the_background(rawdata_root, marker_dir, monkeypatch):
+    monkeypatch.setattr(segment_log, "COMPACT_MIN_TAIL", 0)
+    monkeypatch.setattr(segment_log, "COMPACT_MAX_TAIL", 0)
+    before = COMPACTOR.compactions
+
+    for day in range(1, 4):
+        add_datapoint(rawdata_root, "subject_001", "fitness", "vo2max", {
+            "measured_at": f"2024-01-0{day}T08:00:00Z", "value": float(day), "unit": "x", "data_quality": "good",
+        })
+    COMPACTOR.wait()
+
+    assert COMPACTOR.compactions > before
+    tail = os.path.join(segment_log.segments_dir(marker_dir), segment_log.TAIL_FILE)
+    assert os.path.getsize(tail) == 0
+    assert [r["value"] for r in segment_log.read_records(marker_dir)] == [1.0, 2.0, 3.0]
+
+
+# ── Migration ──────────────────────────────────────────────────────────────────
+
+def _write_legacy_marker(marker_dir: str, datapoints: list[dict]) -> None:
+    entries = []
+    for dp in datapoints:
+        filename = datapoint_filename(dp["measured_at"])
+        with open(os.path.join(marker_dir, filename), "w", encoding="utf-8") as f:
+            json.dump({
+                "schema_version": "1.0", "subject_id": "subject_001", "module_id": "fitness",
+                "marker_id": "vo2max", "created_at": "2024-06-01T00:00:00Z", **dp,
+            }, f)
+        entries.append({"measured_at": dp["measured_at"], "file": filename})
+    with open(os.path.join(marker_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump({"subject_id": "subject_001", "module_id": "fitness", "marker_id": "vo2max",
+                   "entries": sorted(entries, key=lambda e: e["measured_at"])}, f)
+
+
+def test_migrate_marker_matches_legacy_reads(rawdata_root, marker_dir):
+    _write_legacy_marker(marker_dir, [
+        {"measured_at": "2024-03-01T07:30:00Z",      "value": 48.1, "unit": "mL/kg/min", "data_quality": "good"},
+        {"measured_at": "2024-01-15T07:30:00+02:00", "value": 47.0, "unit": "mL/kg/min", "data_quality": "fair"},
+        {"measured_at": "2024-02-10T07:30:00.000Z",  "value": 47.6, "unit": "mL/kg/min", "data_quality": "good"},
+    ])
+    fields = ("measured_at", "value", "unit", "data_quality", "created_at", "parsed_timestamp")
+
+    def read():
+        datapoints = read_timeseries(rawdata_root, "subject_001", "fitness", "vo2max", FAR_PAST, FAR_FUTURE)
+        return [{k: dp.get(k) for k in fields} for dp in datapoints]
+
+    legacy = read()
+    assert segment_log.migrate_marker(marker_dir) == 3
+    assert segment_log.is_segment_marker(marker_dir)
+    assert not os.path.exists(os.path.join(marker_dir, "index.json"))
+    assert read() == legacy
+    assert [dp["value"] for dp in legacy] == [47.0, 47.6, 48.1]
+
+
+def test_migrate_marker_keep_legacy(marker_dir):
+    _write_legacy_marker(marker_dir, [{"measured_at": "2024-01-01T00:00:00Z", "value": 1.0, "unit": "x"}])
+    assert segment_log.migrate_marker(marker_dir, keep_legacy=True) == 1
+    assert sorted(os.listdir(os.path.join(marker_dir, "legacy"))) == ["2024-01-01T00-00-00Z.json", "index.json"]
+    assert segment_log.migrate_marker(marker_dir) == 0  # already migrated
+
+
+# ── Cold tier ──────────────────────────────────────────────────────────────────
+
+def test_archive_and_column_reads_across_the_archive_boundary(marker_dir):
+    old    = [datetime(2020, month, day, 12, tzinfo=timezone.utc) for month in (1, 2, 3) for day in (5, 20)]
+    recent = [datetime.now(timezone.utc).replace(microsecond=0) - timedelta(days=d) for d in (20, 10, 5)]
+    segment_log.append_ops(marker_dir, [put(_iso(d), float(i)) for i, d in enumerate(old + recent)])
+    segment_log.compact(marker_dir)
+    everything = _values(segment_log.read_records(marker_dir))
+
+    assert segment_log.archive_marker(marker_dir, older_than_days=365) == len(old)
+    seg_dir = segment_log.segments_dir(marker_dir)
+    assert sorted(os.listdir(os.path.join(seg_dir, segment_log.ARCHIVE_DIR))) == [
+        "2020-01.jsonl.gz", "2020-02.jsonl.gz", "2020-03.jsonl.gz",
+    ]
+    assert segment_log.read_footer(seg_dir)["count"] == len(recent)
+    assert _values(segment_log.read_records(marker_dir)) == everything
+
+    # Entirely in the hot base: served from the memory-mapped columns.
+    hot_from = segment_log.to_epoch_ms(recent[0] - timedelta(days=1))
+    hot_to   = segment_log.to_epoch_ms(recent[-1])
+    epochs, values = segment_log.read_range_columns(marker_dir, hot_from, hot_to)
+    assert epochs.tolist() == [segment_log.to_epoch_ms(d) for d in recent]
+    assert values.tolist() == [6.0, 7.0, 8.0]
+    assert isinstance(epochs, np.memmap)
+
+    # Across the boundary: the columns can't answer, the record path merges archive and base.
+    cross_from = segment_log.to_epoch_ms(datetime(2020, 3, 1, tzinfo=timezone.utc))
+    assert segment_log.read_range_columns(marker_dir, cross_from, hot_to) is None
+    crossed = segment_log.read_records(marker_dir, cross_from, hot_to)
+    assert _values(crossed) == everything[4:]
+
+    # Ops on an archived month are folded back into that month's file.
+    segment_log.append_ops(marker_dir, [put(_iso(old[0]), 99.0), segment_log.del_op(_iso(old[1]))])
+    segment_log.compact(marker_dir)
+    assert segment_log.lookup(marker_dir, _iso(old[0]))["value"] == 99.0
+    assert segment_log.lookup(marker_dir, _iso(old[1])) is None
+    assert segment_log.read_footer(seg_dir)["count"] == len(recent)
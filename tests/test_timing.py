@@ -0,0 +1,47 @@
+import asyncio
+import hashlib
+
+import strawberry
+
+from backend.core.telemetry import OperationLabels
+from backend.graphql.persisted_queries import PERSISTED_QUERIES
+from backend.graphql.timing import OPERATION_MS, TimingExtension
+
+
+@strawberry.type
+class Query:
+    @strawberry.field
+    def hello(self) -> str:
+        return "hi"
+
+
+SCHEMA = strawberry.Schema(query=Query, extensions=[TimingExtension])
+
+
+def _run(query: str, operation_name: str | None = None) -> None:
+    result = asyncio.run(SCHEMA.execute(query, operation_name=operation_name))
+    assert result.errors is None
+
+
+def test_client_chosen_operation_names_share_one_series():
+    for i in range(3):
+        _run(f"query TimingProbe{i} {{ hello }}", f"TimingProbe{i}")
+    series = OPERATION_MS.snapshot()
+    assert not any(name.startswith("TimingProbe") for name in series)
+    assert series["other"]["count"] >= 3
+
+
+def test_persisted_query_names_get_their_own_series():
+    query = "query TimingPersisted { hello }"
+    PERSISTED_QUERIES.register(hashlib.sha256(query.encode()).hexdigest(), query)
+    _run(query, "TimingPersisted")
+    assert OPERATION_MS.snapshot()["TimingPersisted"]["count"] == 1
+
+
+def test_operation_labels_are_bounded():
+    labels = OperationLabels(limit=2, names=("Configured",))
+    for name in ("A", "B", "C"):
+        labels.allow(name)
+    assert [labels.label(n) for n in ("A", "B", "C", "Configured", None)] == [
+        "A", "B", "other", "Configured", "anonymous",
+    ]
@@ -0,0 +1,119 @@
+import csv
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from backend.core.storage.upload_parser import (
+    detect_upload_format,
+    iter_raw_rows,
+    upload_text_stream,
+    validate_record,
+)
+
+CATALOG = {("fitness", "vo2max"), ("fitness", "100m_sprint")}
+
+
+def _rows(data: bytes, fmt: str) -> list[tuple]:
+    with upload_text_stream(SimpleNamespace(file=io.BytesIO(data))) as stream:
+        return list(iter_raw_rows(stream, fmt))
+
+
+def _validate(raw: dict, module_id=None, marker_id=None) -> dict:
+    return validate_record(raw, "subject_001", module_id, marker_id, CATALOG)
+
+
+def test_detect_upload_format():
+    assert detect_upload_format("export.CSV") == "csv"
+    assert detect_upload_format("export.jsonl") == "ndjson"
+    assert detect_upload_format(None, "JSONL") == "ndjson"
+    with pytest.raises(ValueError):
+        detect_upload_format("export.xlsx")
+    with pytest.raises(ValueError):
+        detect_upload_format("export.csv", "xml")
+
+
+def test_csv_rows_and_a_bad_utf8_row_mid_file():
+    data = (
+        b"\xef\xbb\xbfmeasured_at,value,unit\n"
+        b"2024-01-01T08:00:00Z,40,ml\n"
+        b"2024-01-02T08:00:00Z,41,m\xffl\n"
+        b",,\n"
+        b"2024-01-03T08:00:00Z,42,ml\n"
+    )
+    rows = _rows(data, "csv")
+    assert [(n, raw and raw["value"], err) for n, raw, err in rows] == [
+        (2, "40", None),
+        (3, None, "Row is not valid UTF-8 text."),
+        (5, "42", None),                         # the blank row 4 is skipped
+    ]
+
+
+def test_csv_error_mid_file_is_reported_and_parsing_continues():
+    data = (
+        b"measured_at,value\n"
+        b"2024-01-01T08:00:00Z,1\n"
+        b"2024-01-02T08:00:00Z," + b"9" * 40 + b"\n"     # longer than the lowered field limit
+        b"2024-01-03T08:00:00Z,3\n"
+    )
+    old = csv.field_size_limit(25)
+    try:
+        rows = _rows(data, "csv")
+    finally:
+        csv.field_size_limit(old)
+    assert rows[0][:2] == (2, {"measured_at": "2024-01-01T08:00:00Z", "value": "1"})
+    assert rows[1][0] == 3 and rows[1][2].startswith("Invalid CSV")
+    assert rows[2][0] == 4 and rows[2][1]["value"] == "3"
+
+
+def test_ndjson_rows():
+    data = (
+        b'{"measured_at": "2024-01-01T08:00:00Z", "value": 1}\n'
+        b"\n"
+        b"{not json\n"
+        b"[1, 2]\n"
+        b'{"measured_at": "2024-01-02T08:00:00Z", "unit": "m\xffl", "value": 2}\n'
+        b'{"measured_at": "2024-01-03T08:00:00Z", "value": 3}\n'
+    )
+    rows = _rows(data, "ndjson")
+    assert [n for n, _, _ in rows] == [1, 3, 4, 5, 6]
+    assert rows[0][1]["value"] == 1 and rows[4][1]["value"] == 3
+    assert rows[1][2].startswith("Invalid JSON")
+    assert rows[2][2] == "Each line must be a JSON object."
+    assert rows[3][2] == "Row is not valid UTF-8 text."
+
+
+def test_validate_record_normalises_a_row():
+    rec = _validate({"measured_at": " 2024-01-01T08:00:00Z ", "value": "40.5"}, "fitness", "vo2max")
+    assert rec == {
+        "module_id": "fitness", "marker_id": "vo2max", "measured_at": "2024-01-01T08:00:00Z",
+        "value": 40.5, "unit": "", "data_quality": "good",
+    }
+    # Row columns take precedence over the mutation arguments.
+    rec = _validate({"measured_at": "2024-01-01", "value": 9, "marker_id": "100m_sprint"}, "fitness", "vo2max")
+    assert rec["marker_id"] == "100m_sprint"
+
+
+@pytest.mark.parametrize("raw, message", [
+    ({"marker_id": "../../subject_002/fitness/vo2max"}, "not a valid id"),
+    ({"module_id": "fitness/../..", "marker_id": "vo2max"}, "not a valid id"),
+    ({"marker_id": "x__y\"; DROP TABLE subjects; --"}, "not a valid id"),
+    ({"marker_id": "resting_hr"}, "Unknown marker 'fitness/resting_hr'"),
+    ({"subject_id": "subject_002"}, "does not match"),
+    ({"measured_at": "yesterday"}, "not a valid ISO 8601"),
+    ({"value": "abc"}, "not a number"),
+    ({"value": "nan"}, "finite"),
+    ({"value": ""}, "Missing required field: value"),
+])
+def test_validate_record_rejects(raw, message):
+    row = {"measured_at": "2024-01-01T08:00:00Z", "value": 1, **raw}
+    with pytest.raises(ValueError, match=message):
+        _validate(row, "fitness", "vo2max")
+
+
+def test_ids_are_checked_without_a_catalog_too():
+    row = {"measured_at": "2024-01-01T08:00:00Z", "value": 1, "marker_id": ".."}
+    with pytest.raises(ValueError, match="not a valid id"):
+        validate_record(row, "subject_001", "fitness", None)
+    row["marker_id"] = "anything_new"
+    assert validate_record(row, "subject_001", "fitness", None)["marker_id"] == "anything_new"
@@ -0,0 +1,47 @@
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+
+from backend.workers import settings
+
+
+class Redis:
+    async def zcard(self, key: str) -> int:
+        return 3
+
+
+def test_exporter_binds_to_localhost_and_serves_metrics():
+    async def scrape() -> tuple[str, bytes]:
+        ctx = {"redis": Redis()}
+        server = await asyncio.start_server(
+            lambda r, w: settings._serve_metrics(ctx, r, w), settings.METRICS_HOST, 0,
+        )
+        host, port = server.sockets[0].getsockname()[:2]
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(b"GET /metrics HTTP/1.1\r\nHost: x\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return host, response
+
+    host, response = asyncio.run(scrape())
+    assert host == "127.0.0.1"
+    assert response.startswith(b"HTTP/1.1 200 OK")
+    assert b"ashdt_arq_queue_depth 3.0" in response
+    assert b'ashdt_cache_hits_total{cache="index"}' in response
+
+
+def test_exporter_does_not_import_the_graphql_stack():
+    code = (
+        "import asyncio, sys\n"
+        "from backend.workers import settings\n"
+        "asyncio.run(settings._render_metrics({}))\n"
+        "print(sorted(m for m in sys.modules if m.startswith(('backend.graphql', 'strawberry'))))\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+        cwd=Path(__file__).resolve().parents[1],
+    )
+    assert out.stdout.strip() == "[]"
@@ -0,0 +1,131 @@
+from datetime import date, datetime, timezone
+
+import numpy as np
+import pytest
+
+from backend.core.storage.zone_tables import (
+    ZONE_TABLES,
+    age_in_years,
+    age_indices,
+    boundaries_at,
+    load_zone_tables,
+    zone_boundary_matrix,
+)
+
+# vo2max for men is tabulated at 20, 30 and 50; women only have the generic row.
+TABULATED = [(20, 40.0, 60.0, 0.10), (30, 36.0, 56.0, 0.20), (50, 30.0, 48.0, 0.15)]
+GENERIC   = (35.0, 55.0, 0.12)
+TODAY     = date(2026, 6, 15)
+
+
+def _baseline(sex: str | None, age: int | None) -> tuple[float, float, float] | None:
+    """The per-lookup interpolation the tables replaced (markerset_reader before the in-memory tables)."""
+    rows = TABULATED if sex == "M" else []
+    if rows and age is not None:
+        ages = [r[0] for r in rows]
+        if age <= ages[0]:
+            return rows[0][1:]
+        if age >= ages[-1]:
+            return rows[-1][1:]
+        for lo, hi in zip(rows, rows[1:]):
+            if lo[0] <= age <= hi[0]:
+                t = (age - lo[0]) / (hi[0] - lo[0])
+                return tuple(a + t * (b - a) for a, b in zip(lo[1:], hi[1:]))
+    return GENERIC
+
+
+@pytest.fixture
+def tables(conn):
+    conn.executemany(
+        "INSERT INTO zone_references (module_id, marker_id, sex, age, healthy_min, healthy_max, vulnerability_margin) "
+        "VALUES ('fitness', 'vo2max', ?, ?, ?, ?, ?)",
+        [("M", *row) for row in TABULATED] + [(None, None, *GENERIC)],
+    )
+    conn.commit()
+    return load_zone_tables(conn)
+
+
+@pytest.mark.parametrize("age", [0, 10, 19, 20, 21, 25, 29, 30, 37, 49, 50, 51, 80, 130])
+def test_per_age_tables_match_the_baseline_interpolation(tables, age):
+    resolved, used_generic = tables.resolve("fitness", "vo2max", "M", age)
+    assert resolved == pytest.approx(_baseline("M", age))
+    assert not used_generic
+
+
+@pytest.mark.parametrize("sex, age", [(None, 40), ("M", None), ("F", 40)])
+def test_generic_row_without_a_usable_age_table(tables, sex, age):
+    assert tables.resolve("fitness", "vo2max", sex, age) == (GENERIC, True)
+    assert tables.resolve("fitness", "unknown", sex, age) is None
+
+
+def test_age_indices_step_on_birthdays():
+    def ms(*args) -> int:
+        return int(datetime(*args, tzinfo=timezone.utc).timestamp() * 1000)
+
+    epochs = [
+        ms(1989, 1, 1),              # before birth: clamped to 0
+        ms(1990, 5, 10),             # born
+        ms(2020, 5, 9, 23, 59, 59),  # last second at 29
+        ms(2020, 5, 10),             # 30th birthday
+        ms(2090, 1, 1),              # past the table: clamped to the last row
+    ]
+    assert age_indices("1990-05-10", np.array(epochs), 51).tolist() == [0, 0, 29, 30, 50]
+
+    # Born on 29 February: the birthday counts from 1 March in non-leap years, as in age_in_years().
+    leap = [ms(2001, 2, 28), ms(2001, 3, 1), ms(2004, 2, 29)]
+    assert age_indices("2000-02-29", np.array(leap), 10).tolist() == [0, 1, 4]
+    assert [age_in_years("2000-02-29", d) for d in (date(2001, 2, 28), date(2001, 3, 1))] == [0, 1]
+
+
+def test_boundaries_at_uses_the_age_at_each_measurement(tables):
+    table  = tables.age_table("fitness", "vo2max", "M")
+    dob    = "1980-03-01"
+    dates  = [date(1995, 1, 1), date(2000, 2, 29), date(2000, 3, 1), date(2014, 7, 1), date(2040, 1, 1)]
+    epochs = np.array([int(datetime(d.year, d.month, d.day, 12, tzinfo=timezone.utc).timestamp() * 1000) for d in dates])
+
+    result = boundaries_at({"dob": dob, "rows": table.tolist()}, epochs)
+
+    assert result.shape == (len(dates), 3)
+    for d, row in zip(dates, result):
+        assert tuple(row) == pytest.approx(_baseline("M", age_in_years(dob, d)))
+
+
+def test_zone_boundary_matrix_matches_per_subject_resolution(tables, conn, tmp_path):
+    subjects = [
+        ("s_young", "M", "2010-01-01"),   # 16: below the first tabulated age
+        ("s_mid",   "M", "1990-09-01"),   # 35: interpolated
+        ("s_old",   "M", "1940-01-01"),   # 86: past the last tabulated age
+        ("s_female", "F", "1990-01-01"),  # no table for F: generic
+        ("s_nodob", "M", None),           # no age: generic
+    ]
+    conn.executemany("INSERT INTO subjects (subject_id, sex, dob) VALUES (?, ?, ?)", subjects)
+    conn.commit()
+    ZONE_TABLES.invalidate()
+
+    ids    = [s[0] for s in subjects] + ["s_mid"]       # repeats are fine
+    matrix = zone_boundary_matrix(
+        str(tmp_path / "asHDT.db"), ids, [("fitness", "vo2max"), ("fitness", "unknown")], on=TODAY,
+    )
+    by_id = {s[0]: s for s in subjects}
+    for i, subject_id in enumerate(ids):
+        _, sex, dob = by_id[subject_id]
+        expected = _baseline(sex, age_in_years(dob, TODAY))
+        got      = [matrix[f][i, 0] for f in ("healthy_min", "healthy_max", "vulnerability_margin")]
+        assert got == pytest.approx(expected)
+        assert matrix["generic"][i, 0] == (expected == GENERIC)
+    assert np.isnan(matrix["healthy_min"][:, 1]).all() and not matrix["generic"][:, 1].any()
+
+    with pytest.raises(ValueError, match="s_missing"):
+        zone_boundary_matrix(str(tmp_path / "asHDT.db"), ["s_missing"], [("fitness", "vo2max")], on=TODAY)
+
+
+def test_tables_follow_writes_from_any_connection(tables, conn):
+    ZONE_TABLES.invalidate()
+    before = ZONE_TABLES.get(conn)
+    assert ZONE_TABLES.get(conn) is before
+
+    conn.execute("UPDATE zone_references SET healthy_min = 41.0 WHERE sex = 'M' AND age = 20")
+    conn.commit()
+    after = ZONE_TABLES.get(conn)
+    assert after is not before
+    assert after.resolve("fitness", "vo2max", "M", 20)[0][0] == 41.0